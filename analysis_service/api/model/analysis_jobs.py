@@ -0,0 +1,272 @@
+import time
+import uuid
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from api.model.financial_analysis import analysis_events
+from api.model.graph.tools.run_files import remove_run_files
+from config.settings import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (COMPLETED, FAILED, CANCELLED)
+
+# graph nodes whose start/end are published as progress
+PROGRESS_NODES = {
+    "action_plan", "execute_tasks", "run_team", "merge_teams",
+    "junior_analysis", "senior_analysis", "supervisor_review", "send_to_pdf",
+}
+# nodes that run one team: their runs (and the tool calls under them) belong to that team
+TEAM_NODES = {"run_team", "junior_analysis", "senior_analysis"}
+MAX_TEXT = 2000
+
+
+def _get(value: Any, name: str, default=None):
+    """Node inputs/outputs are AnalysisState objects or plain dicts of updates"""
+    if isinstance(value, dict):
+        return value.get(name, default)
+    return getattr(value, name, default)
+
+
+def _clip(value: Any, limit: int = MAX_TEXT) -> str:
+    text = value if isinstance(value, str) else str(value)
+    return text if len(text) <= limit else f"{text[:limit]}... [{len(text) - limit} more characters]"
+
+
+def _current_team(state: Any):
+    teams, index = _get(state, "teams") or [], _get(state, "current_team_index") or 0
+    return teams[index] if index < len(teams) else None
+
+
+
+@dataclass
+class AnalysisJob:
+    id: str
+    query: str
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    result: Optional[Dict[str, Any]] = None
+    figures: Dict[str, bytes] = field(default_factory=dict)
+    error: Optional[str] = None
+    task: Optional[asyncio.Task] = None
+    changed: asyncio.Condition = field(default_factory=asyncio.Condition)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "query": self.query,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "events": len(self.events),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+
+###RUNS ANALYSES IN THE BACKGROUND AND KEEPS THEIR PROGRESS EVENTS FOR STREAMING
+class AnalysisJobs:
+    """
+    A job outlives the request that started it: clients follow its events over SSE (and can
+    reconnect with Last-Event-ID), and the run finishes whether or not anyone is listening.
+    At most ANALYSIS_MAX_CONCURRENT_JOBS run at once; finished jobs are kept for ANALYSIS_JOB_TTL_S.
+    """
+
+    def __init__(self):
+        self.jobs: Dict[str, AnalysisJob] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._reaper: Optional[asyncio.Task] = None
+
+    def start(self, query: str) -> AnalysisJob:
+        self._expire()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(settings.ANALYSIS_MAX_CONCURRENT_JOBS)
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap())
+        job = AnalysisJob(id=uuid.uuid4().hex, query=query)
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job))
+        return job
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        self._expire()
+        return self.jobs.get(job_id)
+
+    async def cancel(self, job_id: str) -> Optional[AnalysisJob]:
+        job = self.jobs.get(job_id)
+        if job is not None and job.task is not None and not job.task.done():
+            job.task.cancel()
+            await asyncio.gather(job.task, return_exceptions=True)
+        return job
+
+    async def shutdown(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+        for job in list(self.jobs.values()):
+            await self.cancel(job.id)
+
+    async def _reap(self):
+        """Drop expired jobs (and their figures and event logs) even while no requests come in"""
+        while True:
+            await asyncio.sleep(min(settings.ANALYSIS_JOB_TTL_S, 60.0))
+            self._expire()
+
+    def _expire(self):
+        cutoff = time.time() - settings.ANALYSIS_JOB_TTL_S
+        for job_id in [j.id for j in self.jobs.values() if j.status in FINISHED and j.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    @staticmethod
+    def _append(job: AnalysisJob, type: str, **data):
+        """Add an event; the caller holds job.changed and notifies"""
+        job.events.append({"id": len(job.events) + 1, "type": type, "time": time.time(), "data": data})
+
+    async def _publish(self, job: AnalysisJob, type: str, **data):
+        async with job.changed:
+            self._append(job, type, **data)
+            job.changed.notify_all()
+
+    async def _finish(self, job: AnalysisJob, status: str, **data):
+        # status and final event change together: a follower that sees the job finished
+        # also sees the event carrying its result or error
+        async with job.changed:
+            job.status, job.finished_at = status, time.time()
+            self._append(job, "status", status=status, **data)
+            job.changed.notify_all()
+
+    async def _run(self, job: AnalysisJob):
+        try:
+            await self._publish(job, "status", status=QUEUED)
+            async with self._slots:
+                job.status, job.started_at = RUNNING, time.time()
+                await self._publish(job, "status", status=RUNNING)
+                final_state = await self._follow_graph(job)
+            job.result = self._result(job, final_state)
+            await self._finish(job, COMPLETED, result=job.result)
+        except asyncio.CancelledError:
+            await self._finish(job, CANCELLED)
+            raise
+        except Exception as e:
+            logger.error(f"Analysis job {job.id} failed: {str(e)}")
+            job.error = str(e)
+            await self._finish(job, FAILED, error=job.error)
+        finally:
+            # the datasets were only for the run's agents; figures are kept in the job
+            remove_run_files(job.id)
+
+    async def _follow_graph(self, job: AnalysisJob):
+        """Translate the run's callback events into progress events; returns the final state"""
+        teams: Dict[str, int] = {}  # run id of a team node -> team id
+        actions: Dict[Optional[int], Any] = {}  # team -> the ReAct agent's latest AgentAction
+        final_state = None
+
+        def team_of(event) -> Optional[int]:
+            for run_id in [event["run_id"], *reversed(event.get("parent_ids", []))]:
+                if run_id in teams:
+                    return teams[run_id]
+            return None
+
+        async for event in analysis_events(job.query, run_id=job.id):
+            kind, name, data = event["event"], event["name"], event.get("data", {})
+
+            if not event.get("parent_ids") and kind == "on_chain_end":
+                final_state = data.get("output")
+
+            elif name in PROGRESS_NODES and name == event.get("metadata", {}).get("langgraph_node"):
+                if kind == "on_chain_start":
+                    state = data.get("input")
+                    if name in TEAM_NODES:
+                        team = (_get(state, "teams") or [None])[0] if name == "run_team" else _current_team(state)
+                        if team is not None:
+                            teams[event["run_id"]] = team.id
+                    await self._publish(job, "node", node=name, phase="start", team=team_of(event))
+                elif kind == "on_chain_end":
+                    await self._node_end(job, name, team_of(event), data.get("output"))
+
+            elif kind == "on_chain_end" and hasattr(data.get("output"), "tool_input"):
+                # string tool inputs are not in on_tool_start; the agent's action carries them
+                actions[team_of(event)] = data["output"]
+
+            elif kind in ("on_tool_start", "on_tool_end"):
+                payload = {"tool": name, "team": team_of(event)}
+                if kind == "on_tool_start":
+                    action = actions.pop(payload["team"], None)
+                    if action is not None and action.tool == name:
+                        payload.update(input=_clip(action.tool_input), thought=_clip(action.log.split("Action:")[0].strip()))
+                    else:
+                        payload.update(input=_clip(data["input"]) if data.get("input") else None)
+                    payload.update(phase="start")
+                else:
+                    payload.update(phase="end", output=_clip(data.get("output")))
+                await self._publish(job, "tool", **payload)
+
+        return final_state
+
+    async def _node_end(self, job: AnalysisJob, name: str, team: Optional[int], output: Any):
+        await self._publish(job, "node", node=name, phase="end", team=team)
+        if name == "action_plan":
+            await self._publish(job, "plan", teams=[
+                {"id": t.id, "focus_area": t.focus_area, "junior_task": t.junior_task, "senior_task": t.senior_task}
+                for t in _get(output, "teams") or []
+            ])
+        elif name == "junior_analysis" and team is not None:
+            plan = _current_team(output)
+            datasets = dict(plan.shared_data) if plan is not None else {}
+            await self._publish(job, "team_output", team=team, role="junior", datasets=datasets)
+        elif name == "senior_analysis" and team is not None:
+            analysis = (_get(output, "team_outputs") or {}).get(team)
+            await self._publish(job, "team_output", team=team, role="senior", output=analysis)
+
+    def _result(self, job: AnalysisJob, state: Any) -> Dict[str, Any]:
+        for name, figure in (_get(state, "shared_figures") or {}).items():
+            job.figures[name] = figure.getvalue() if isinstance(figure, BytesIO) else bytes(figure)
+        return {
+            "teams": [team.model_dump() for team in _get(state, "teams") or []],
+            "team_outputs": _get(state, "team_outputs") or {},
+            "figures": sorted(job.figures),
+        }
+
+    async def follow(self, job: AnalysisJob, after: int = 0,
+                     keepalive_s: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Events after id `after`, then new ones as they are published, until the job finishes.
+        Yields None when nothing happened for `keepalive_s` (an SSE keep-alive comment).
+        """
+        while True:
+            async with job.changed:
+                try:
+                    await asyncio.wait_for(
+                        job.changed.wait_for(lambda: len(job.events) > after or job.status in FINISHED),
+                        keepalive_s,
+                    )
+                except asyncio.TimeoutError:
+                    pending = None
+                else:
+                    pending = job.events[after:]
+            if pending is None:
+                yield None
+                continue
+            for event in pending:
+                yield event
+            after += len(pending)
+            if job.status in FINISHED and after >= len(job.events):
+                return
+
+
+analysis_jobs = AnalysisJobs()
@@ -3,11 +3,22 @@ from api.model.graph.state import AnalysisState
 from api.model.graph.nodes.action_plan import plan_teams
 from api.model.graph.nodes.supervisor import execute_supervisor_review
 from api.model.graph.nodes.send_to_pdf import generate_pdf
-from api.model.graph.nodes.execute_tasks import execute_tasks
+from api.model.graph.nodes.execute_tasks import execute_tasks, merge_teams, route_teams, run_team, team_app
+from api.model.graph.tools.run_files import remove_run_files
+from config.settings import settings
 
 from langgraph.graph import StateGraph, START, END
 # from .graph.nodes.check_hallucinations import grade_hallucination_node
+from functools import lru_cache
 import asyncio
+import logging
+import uuid
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# the model clients read OPENAI_API_KEY etc. from the environment: export the service's .env (if any)
+load_dotenv()
 
 
 def check_teams(state: AnalysisState) -> AnalysisState:
@@ -15,27 +26,29 @@ def check_teams(state: AnalysisState) -> AnalysisState:
 
     if index < len(state.teams):
         return "NEXT TEAM"
-    
-    else: return "SUPERVISOR"
-
 
+    else: return "SUPERVISOR"
 
 
-async def get_financial_analysis(query: str):
-    load_dotenv("/Users/metedibi/Desktop/LLM_STUDIES/financial_rag/analysis_service/.env")
-    
+def build_analysis_graph():
+    """Main workflow graph; compiled once when the service starts and reused by every run"""
     workflow = StateGraph(AnalysisState)
 
 
     workflow.add_node("action_plan", plan_teams)
     workflow.add_node("execute_tasks", execute_tasks)
-    workflow.add_node("supervisor_review", execute_supervisor_review) 
-    workflow.add_node("send_to_pdf", generate_pdf)  
+    workflow.add_node("run_team", run_team)
+    workflow.add_node("merge_teams", merge_teams)
+    workflow.add_node("supervisor_review", execute_supervisor_review)
+    workflow.add_node("send_to_pdf", generate_pdf)
 
-    
-    workflow.set_entry_point("action_plan")    
-    
-    workflow.add_edge("action_plan", "execute_tasks")
+
+    workflow.set_entry_point("action_plan")
+
+    # ANALYSIS_PARALLEL_TEAMS: action_plan -> run_team x N -> merge_teams, otherwise the execute_tasks loop
+    workflow.add_conditional_edges("action_plan", route_teams, ["execute_tasks", "run_team", "supervisor_review"])
+    workflow.add_edge("run_team", "merge_teams")
+    workflow.add_edge("merge_teams", "supervisor_review")
     workflow.add_edge("supervisor_review", "send_to_pdf")
     workflow.add_edge("send_to_pdf", END)
 
@@ -47,22 +60,69 @@ async def get_financial_analysis(query: str):
             "SUPERVISOR": "supervisor_review",
         },
     )
-    
-    
-    app = workflow.compile()
 
-    app.get_graph().draw_mermaid_png(output_file_path="graph.png")
+    return workflow.compile()
+
+
+analysis_app = build_analysis_graph()
+
+GRAPHS = {"main": analysis_app, "team": team_app}
+
+
+@lru_cache(maxsize=None)
+def render_graph(name: str, format: str = "png"):
+    """
+    Mermaid source or PNG of a compiled graph, rendered on first request only.
+    PNG rendering goes through the mermaid.ink API, so it is kept off the analysis path.
+    """
+    graph = GRAPHS[name].get_graph()
+    if format == "mermaid":
+        return graph.draw_mermaid()
+    return graph.draw_mermaid_png()
+
+
+def analysis_input(query: str, run_id: str = None) -> dict:
+    # the run id is set explicitly: every node (and team branch) must see the same one
+    return {"query": query, "run_id": run_id or uuid.uuid4().hex}
+
+
+async def stream_financial_analysis(query: str, run_id: str = None):
+    """
+    Async graph entry point: yields (namespace, update) as every node (and team subgraph node)
+    finishes. Runs on the caller's event loop, so one process can serve many analyses at once.
+    """
+    # max_concurrency caps how many team branches run at once
+    config = {"max_concurrency": settings.ANALYSIS_MAX_PARALLEL_TEAMS}
+    async for update in analysis_app.astream(analysis_input(query, run_id), config, subgraphs=True):
+        yield update
+
+
+def analysis_events(query: str, run_id: str = None):
+    """
+    The run as LangChain stream events (v2): start/end of every node, tool call and model call,
+    including those inside the team subgraphs. Analysis jobs turn these into progress events.
+    """
+    config = {"max_concurrency": settings.ANALYSIS_MAX_PARALLEL_TEAMS}
+    return analysis_app.astream_events(analysis_input(query, run_id), config, version="v2")
+
+
+async def get_financial_analysis(query: str):
+    """Runs an analysis to the end and returns every update; the run's dataset files are removed afterwards"""
+    logger.info(f"Executing financial analysis for query: {query}")
+    run_id = uuid.uuid4().hex
+
+    results = []
+    try:
+        async for state in stream_financial_analysis(query, run_id):
+            logger.debug(f"Analysis update: {state}")
+            results.append(state)
+    finally:
+        remove_run_files(run_id)
+
+    return results
 
-    print(f"Executing financial analysis for query: {query}")
-    
-    stream = app.stream({"query": query}, subgraphs=True)
-    
-    results = await asyncio.to_thread(list, stream)
-    
-    for state in results:
-        print(state)
-        print("----")
 
-query = "Today is January 6th, 2025. I need a forecast comparison of both Apple and Microsoft stock for next week, purely based on previous year's stock movements."
+if __name__ == "__main__":
+    query = "Today is January 6th, 2025. I need a forecast comparison of both Apple and Microsoft stock for next week, purely based on previous year's stock movements."
 
-asyncio.run(get_financial_analysis(query))
\ No newline at end of file
+    asyncio.run(get_financial_analysis(query))
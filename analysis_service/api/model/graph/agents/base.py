@@ -4,6 +4,7 @@ from langchain.agents import create_react_agent
 from langchain_core.prompts import PromptTemplate
 from langchain.agents.agent import AgentExecutor
 from api.model.graph.state import TeamPlan, AnalysisState
+from api.model.graph.llm_cache import llm_cache
 from langchain_openai import ChatOpenAI
 
 from config.settings import Settings
@@ -18,10 +19,13 @@ class BaseAnalyst:
     def __init__(
         self,
         team_plan: TeamPlan,
-        model_config: dict):
+        model_config: dict,
+        cache_name: str = None):
 
         self.team_plan = team_plan
-        self.llm = ChatOpenAI(**model_config)
+        # every ReAct step is one cached call: a rerun replays steps until a tool result differs
+        self.cache = llm_cache(cache_name, model_config.get("temperature")) if cache_name else False
+        self.llm = ChatOpenAI(**model_config, cache=self.cache)
         self.agent_executor = None
         self.tools = None
 
@@ -55,7 +59,9 @@ class BaseAnalyst:
             verbose=True,
             handle_parsing_errors=True,
             max_iterations=20,
-            return_intermediate_steps=True
+            return_intermediate_steps=True,
+            # streaming the agent's model calls would skip the cache lookup
+            stream_runnable=not self.cache
         )
 
 
@@ -69,5 +75,12 @@ class BaseAnalyst:
             "analysis_state": analysis_state
         })
         return result
+
+    async def aexecute(self, input_query: str, analysis_state: AnalysisState) -> Dict[str, Any]:
+        """Async execute: LLM calls and tools are awaited, so many agents share one event loop"""
+        return await self.agent_executor.ainvoke({
+            "input": input_query,
+            "analysis_state": analysis_state
+        })
     
 
@@ -3,6 +3,7 @@ from api.model.graph.state import TeamPlan, AnalysisState
 from typing import Dict, Any
 from api.model.graph.tools.python_tool_junior import junior_analysis_tool
 from api.model.graph.tools.sql_tool import create_enhanced_sql_toolkit
+from api.model.graph.tools.run_files import run_dir
 from api.model.graph.tools.semantic_search_tool import create_news_search_tool
 from config.settings import Settings
 settings = Settings()
@@ -30,10 +31,10 @@ You have access to the following tools:
 IMPORTANT NOTES ON TOOL USAGE
 1. NUMERICAL DATA:
    1.1 For historical data (stock prices, financial statements, metrics), ALWAYS use sql_tools first
-   1.2 The sql_db_query should return a message including a “SQL Results saved to: /tmp/sql_results_xxxx.csv”
+   1.2 The sql_db_query should return a message including a “SQL Results saved to: /tmp/sql_results_xxxx.arrow”
        - You MUST parse that file path to the python tool later when manipulating data
    1.3 After collecting data from sql_tools, ALWAYS USE THE "python_repl" tool to:
-       - Load the CSV file with `df = pd.read_csv("<the_path_from_sql_results>")`
+       - Load the Arrow file with `df = load_dataset("<the_path_from_sql_results>")`
        - Manipulate or analyze df
        - If you want to store the final dataset for others, use `mark_final_dataset(df, 'some_description')`
 ---------------
@@ -58,9 +59,9 @@ Thought:{agent_scratchpad}
 JUNIOR_ANALYST_PYTHON_DESCRIPTION="""
 Python REPL for data analysis and calculations. Input should be valid Python code.
 IMPORTANT when working with SQL results:
-  1. Parse the CSV file path from the sql_tools output (e.g. '/tmp/sql_results_xxxx.csv').
-  2. Load the data by:
-       df = pd.read_csv("/tmp/sql_results_xxxx.csv")
+  1. Parse the Arrow file path from the sql_tools output (e.g. '/tmp/analysis_runs/<run id>/sql_results_xxxx.arrow').
+  2. Load the data (memory-mapped, no parsing) by:
+       df = load_dataset("/tmp/sql_results_xxxx.arrow")
   3. Use mark_final_dataset(df, 'short_description') to store your final DataFrame in team_plan.shared_data.
 """
 
@@ -70,7 +71,7 @@ class JuniorAnalyst(BaseAnalyst):
     """Junior Financial Analyst agent responsible for data collection and organization."""
     
     def __init__(self, team_plan: TeamPlan, model_config: dict,  state: AnalysisState):
-        super().__init__(team_plan, model_config)
+        super().__init__(team_plan, model_config, cache_name="junior_analyst")
         
         self.task = team_plan.junior_task
         self.data_needs = team_plan.junior_data_needs
@@ -82,7 +83,8 @@ class JuniorAnalyst(BaseAnalyst):
        
         self.sql_tools = create_enhanced_sql_toolkit(
             endpoint_url=f"{settings.GATEWAY_URI}/sql/search",
-            llm=self.llm
+            llm=self.llm,
+            data_dir=run_dir(state.run_id)
         )       
         self.state = state
        
@@ -95,7 +97,8 @@ class JuniorAnalyst(BaseAnalyst):
                 func=lambda x: self.python_repl.__call__(
                 x, 
                 team_plan=self.team_plan
-    )
+    ),
+                coroutine=lambda x: self.python_repl.acall(x, team_plan=self.team_plan)
            ),
 
            self.news_tool
@@ -118,6 +121,9 @@ class JuniorAnalyst(BaseAnalyst):
     def execute(self, input_query: str) -> Dict[str, Any]:
         """Execute the junior analyst's task using parent's execution method."""
         return super().execute(input_query, self.state)
+
+    async def aexecute(self, input_query: str) -> Dict[str, Any]:
+        return await super().aexecute(input_query, self.state)
     
 
 
@@ -49,7 +49,7 @@ template = """
 
 class SeniorAnalyst(BaseAnalyst):
     def __init__(self, team_plan: TeamPlan, model_config: dict, state):
-        super().__init__(team_plan, model_config)
+        super().__init__(team_plan, model_config, cache_name="senior_analyst")
         self.task = team_plan.senior_task
         self.available_data = team_plan.shared_data
         self.expected_output = team_plan.senior_expected_output
@@ -66,7 +66,8 @@ class SeniorAnalyst(BaseAnalyst):
                 x, 
                 state=self.state,
                 team_plan=self.team_plan
-    )
+    ),
+                coroutine=lambda x: self.python_repl.acall(x, state=self.state, team_plan=self.team_plan)
             )
         ]
 
@@ -85,8 +86,15 @@ class SeniorAnalyst(BaseAnalyst):
     def execute(self, input_query: str) -> Dict[str, Any]:
         result = super().execute(input_query, self.state)
         self.state.team_outputs[self.team_plan.id] = {
-            "analysis": result.get("Final Answer", "")
+            "analysis": result.get("output", "")
         }
         return 
+
+    async def aexecute(self, input_query: str) -> Dict[str, Any]:
+        result = await super().aexecute(input_query, self.state)
+        self.state.team_outputs[self.team_plan.id] = {
+            "analysis": result.get("output", "")
+        }
+        return result
     
 
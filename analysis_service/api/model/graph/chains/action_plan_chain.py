@@ -4,9 +4,10 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.pydantic_v1 import BaseModel, Field
 from langchain_openai import ChatOpenAI
 from api.model.graph.state import TeamPlans
+from api.model.graph.llm_cache import llm_cache
 
 
-llm = ChatOpenAI(temperature=0, model="gpt-4o")
+llm = ChatOpenAI(temperature=0, model="gpt-4o", cache=llm_cache("planning"))
 structured_planner = llm.with_structured_output(TeamPlans)
 
 system = """Today is January 6th, 2025.
@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional, Sequence, Union
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+from config.settings import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# chains and agents that can use the cache (LLM_CACHE_CHAINS selects among them)
+CHAINS = ("planning", "hallucination_grader", "answer_grader", "junior_analyst", "senior_analyst")
+
+
+
+###DISK-BACKED LLM RESPONSES, KEYED ON MODEL + PARAMETERS + EXACT PROMPT MESSAGES
+class LLMCacheStore:
+    """
+    One SQLite file shared by every chain. Entries expire after `ttl_s` (0: never) and the
+    least recently used ones are evicted once the stored responses exceed `max_bytes`.
+    Hits and misses are counted per chain.
+    """
+
+    def __init__(self, path: str, ttl_s: float, max_bytes: int):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                chain TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+            CREATE TABLE IF NOT EXISTS stats (
+                chain TEXT PRIMARY KEY,
+                hits INTEGER NOT NULL DEFAULT 0,
+                misses INTEGER NOT NULL DEFAULT 0,
+                writes INTEGER NOT NULL DEFAULT 0
+            );
+            """
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self._bytes = self._conn.execute("SELECT coalesce(sum(size), 0) FROM entries").fetchone()[0]
+
+    @staticmethod
+    def key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def _count(self, chain: str, column: str):
+        self._conn.execute(
+            f"INSERT INTO stats (chain, {column}) VALUES (?, 1) "
+            f"ON CONFLICT(chain) DO UPDATE SET {column} = {column} + 1",
+            (chain,),
+        )
+
+    def get(self, key: str, chain: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at, size FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl_s and now - row[1] > self.ttl_s:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._bytes -= row[2]
+                row = None
+            if row is None:
+                self._count(chain, "misses")
+            else:
+                self._conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key))
+                self._count(chain, "hits")
+            self._conn.commit()
+        return row[0] if row is not None else None
+
+    def put(self, key: str, chain: str, value: str):
+        now, size = time.time(), len(value.encode("utf-8"))
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, chain, value, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, chain, value, size, now, now),
+            )
+            self._bytes += size - (old[0] if old else 0)
+            self._count(chain, "writes")
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the store is back under max_bytes"""
+        while self.max_bytes and self._bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM entries ORDER BY last_used LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self._bytes <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._bytes -= size
+                self.evictions += 1
+
+    def clear(self, chain: Optional[str] = None):
+        with self._lock:
+            if chain:
+                self._conn.execute("DELETE FROM entries WHERE chain = ?", (chain,))
+            else:
+                self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+            self._bytes = self._conn.execute("SELECT coalesce(sum(size), 0) FROM entries").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = dict(self._conn.execute("SELECT chain, count(*) FROM entries GROUP BY chain").fetchall())
+            rows = self._conn.execute("SELECT chain, hits, misses, writes FROM stats").fetchall()
+        chains = {}
+        for chain, hits, misses, writes in rows:
+            lookups = hits + misses
+            chains[chain] = {
+                "hits": hits, "misses": misses, "writes": writes,
+                "hit_rate": round(hits / lookups, 4) if lookups else None,
+                "entries": entries.get(chain, 0),
+            }
+        return {
+            "path": self.path,
+            "entries": sum(entries.values()),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_s": self.ttl_s,
+            "evictions_since_start": self.evictions,
+            "enabled_chains": sorted(enabled_chains()),
+            "chains": chains,
+        }
+
+
+
+class LLMCache(BaseCache):
+    """
+    LangChain cache view for one chain: shares the store, counts hits and misses as `chain`.
+    The store is opened on the first lookup; while it cannot be opened every call misses.
+    """
+
+    def __init__(self, chain: str):
+        self.chain = chain
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        store = get_store()
+        if store is None:
+            return None
+        value = store.get(store.key(prompt, llm_string), self.chain)
+        if value is None:
+            return None
+        try:
+            return [loads(generation) for generation in json.loads(value)]
+        except Exception as e:
+            logger.warning(f"Discarding unreadable LLM cache entry: {str(e)}")
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        store = get_store()
+        if store is None:
+            return
+        value = json.dumps([dumps(generation) for generation in return_val])
+        store.put(store.key(prompt, llm_string), self.chain, value)
+
+    def clear(self, **kwargs: Any) -> None:
+        store = get_store()
+        if store is not None:
+            store.clear(self.chain)
+
+    # local SQLite reads/writes take well under a millisecond: no executor thread per lookup
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        return self.lookup(prompt, llm_string)
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self.update(prompt, llm_string, return_val)
+
+    async def aclear(self, **kwargs: Any) -> None:
+        self.clear(**kwargs)
+
+
+_store: Optional[LLMCacheStore] = None
+_store_error: Optional[str] = None
+_store_lock = threading.Lock()
+_views: Dict[str, LLMCache] = {}
+
+
+def enabled_chains() -> Sequence[str]:
+    if not settings.LLM_CACHE_ENABLED:
+        return []
+    selected = settings.LLM_CACHE_CHAINS.strip()
+    if selected in ("", "*", "all"):
+        return list(CHAINS)
+    return [chain.strip() for chain in selected.split(",") if chain.strip()]
+
+
+def get_store() -> Optional[LLMCacheStore]:
+    """
+    The shared store, opened on first use (not at import, so the package imports anywhere).
+    None when LLM_CACHE_PATH cannot be created or opened: caching is then off for this process.
+    """
+    global _store, _store_error
+    if _store is None and _store_error is None:
+        with _store_lock:
+            if _store is None and _store_error is None:
+                try:
+                    _store = LLMCacheStore(
+                        settings.LLM_CACHE_PATH, settings.LLM_CACHE_TTL_S, int(settings.LLM_CACHE_MAX_MB * 1024 * 1024)
+                    )
+                except (OSError, sqlite3.Error) as e:
+                    _store_error = str(e)
+                    logger.warning(f"LLM cache disabled: cannot open {settings.LLM_CACHE_PATH}: {_store_error}")
+    return _store
+
+
+def store_error() -> Optional[str]:
+    return _store_error
+
+
+def llm_cache(chain: str, temperature: Optional[float] = 0.0) -> Union[LLMCache, bool]:
+    """
+    The `cache=` argument for a chain's chat model: the shared disk cache when caching is on for
+    `chain`, otherwise False (never cached). Only deterministic (temperature 0) models are cached
+    unless LLM_CACHE_NONDETERMINISTIC is set, since a sampled answer is not the answer.
+    """
+    if chain not in enabled_chains():
+        return False
+    if temperature and not settings.LLM_CACHE_NONDETERMINISTIC:
+        return False
+    if _store_error is not None:
+        return False
+    if chain not in _views:
+        _views[chain] = LLMCache(chain)
+    return _views[chain]
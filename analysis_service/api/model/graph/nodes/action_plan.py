@@ -1,9 +1,9 @@
 from api.model.graph.state import AnalysisState, TeamPlan
 from api.model.graph.chains.action_plan_chain import planning_chain 
 
-def plan_teams(state: AnalysisState) -> AnalysisState:
+async def plan_teams(state: AnalysisState) -> AnalysisState:
     """Node for planning team configurations"""
-    result = planning_chain.invoke({"query": state.query})
+    result = await planning_chain.ainvoke({"query": state.query})
     print("Team Plans:")
     
     team_configs = [
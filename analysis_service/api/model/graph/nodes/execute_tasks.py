@@ -3,6 +3,8 @@ from api.model.graph.chains.check_hallucinations_chain import hallucination_grad
 from api.model.graph.nodes.junior_analyst import execute_junior_analysis
 from api.model.graph.nodes.senior_analyst import execute_senior_analysis
 from langgraph.graph import StateGraph, END
+from langgraph.types import Send
+from config.settings import settings
 
 
 
@@ -50,7 +52,8 @@ from langgraph.graph import StateGraph, END
 
 
 
-def execute_tasks(state: AnalysisState) -> AnalysisState:    
+def build_team_graph():
+    """Junior -> senior subgraph that every team runs; compiled once at import"""
     team_workflow = StateGraph(AnalysisState)
     
     team_workflow.add_node("junior_analysis", execute_junior_analysis)
@@ -70,18 +73,57 @@ def execute_tasks(state: AnalysisState) -> AnalysisState:
     #     },
     # )
     
-    sub_app = team_workflow.compile()
+    return team_workflow.compile()
 
-    sub_app.get_graph().draw_mermaid_png(output_file_path="graph_sub.png")
 
-    stream = sub_app.stream(state)
-    all_states = list(stream)  
+team_app = build_team_graph()
 
-    final_sub_state = all_states[-1] 
 
-    final_sub_state.current_team_index += 1
+async def execute_tasks(state: AnalysisState) -> AnalysisState:    
+    """Sequential mode: runs the team at current_team_index, then moves to the next one"""
+    # the team's nodes fill team_plan.shared_data, team_outputs and shared_figures in place
+    await team_app.ainvoke(state)
+
+    state.current_team_index += 1
 
     return state
 
 
-    
+
+### PARALLEL MODE: ONE BRANCH PER TEAM, MERGED BY merge_teams
+def route_teams(state: AnalysisState):
+    """After planning: fan out one run_team branch per team, or run them one by one"""
+    if not state.teams:
+        return "supervisor_review"
+    if not settings.ANALYSIS_PARALLEL_TEAMS:
+        return "execute_tasks"
+    # every branch gets its own slice of the state (its team, its own outputs and figures),
+    # so concurrent teams never write to the same objects; the agents build their own REPLs
+    return [
+        Send("run_team", AnalysisState(query=state.query, run_id=state.run_id, teams=[team.model_copy(deep=True)]))
+        for team in state.teams
+    ]
+
+
+async def run_team(team_state: AnalysisState) -> dict:
+    """One team's junior -> senior run on its own state slice"""
+    await team_app.ainvoke(team_state)
+    return {"team_results": [team_state]}
+
+
+async def merge_teams(state: AnalysisState) -> dict:
+    """Fan-in: fold every team's slice back into the shared state"""
+    teams = {team.id: team for team in state.teams}
+    team_outputs, shared_figures = dict(state.team_outputs), dict(state.shared_figures)
+    for result in sorted(state.team_results, key=lambda r: r.teams[0].id):
+        team = result.teams[0]
+        teams[team.id] = team  # carries the junior's shared_data
+        team_outputs.update(result.team_outputs)
+        shared_figures.update(result.shared_figures)
+
+    return {
+        "teams": list(teams.values()),
+        "team_outputs": team_outputs,
+        "shared_figures": shared_figures,
+        "current_team_index": len(teams),
+    }
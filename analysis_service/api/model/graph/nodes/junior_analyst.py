@@ -1,7 +1,7 @@
 from api.model.graph.state import AnalysisState
 from api.model.graph.agents.junior import JuniorAnalyst
 
-def execute_junior_analysis(state: AnalysisState) -> AnalysisState:
+async def execute_junior_analysis(state: AnalysisState) -> AnalysisState:
     """Node for executing junior analyst tasks"""
     current_team = state.teams[state.current_team_index]
     junior_analyst = JuniorAnalyst(
@@ -12,7 +12,7 @@ def execute_junior_analysis(state: AnalysisState) -> AnalysisState:
             "temperature": 0.0
         }, state=state)
 
-    junior_analyst.execute(
+    await junior_analyst.aexecute(
         input_query=state.query
         )   
      
@@ -2,5 +2,5 @@
 
 from api.model.graph.state import AnalysisState
 
-def generate_pdf(state: AnalysisState) -> AnalysisState:
+async def generate_pdf(state: AnalysisState) -> AnalysisState:
     return state
\ No newline at end of file
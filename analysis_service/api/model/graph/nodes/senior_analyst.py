@@ -2,7 +2,7 @@ from typing import Dict
 from api.model.graph.state import AnalysisState
 from api.model.graph.agents.senior import SeniorAnalyst
 
-def execute_senior_analysis(state: AnalysisState) -> AnalysisState:
+async def execute_senior_analysis(state: AnalysisState) -> AnalysisState:
     """Node for executing senior analyst tasks"""
     current_team = state.teams[state.current_team_index]
     senior_analyst = SeniorAnalyst(
@@ -13,7 +13,7 @@ def execute_senior_analysis(state: AnalysisState) -> AnalysisState:
             "temperature": 0.0
         }, state=state)
  
-    senior_analyst.execute(
+    await senior_analyst.aexecute(
         input_query=state.query
         )
         
@@ -1,5 +1,5 @@
 ### define logic here
 from api.model.graph.state import AnalysisState
 
-def execute_supervisor_review(state: AnalysisState) -> AnalysisState:
+async def execute_supervisor_review(state: AnalysisState) -> AnalysisState:
     return state
\ No newline at end of file
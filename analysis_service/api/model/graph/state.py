@@ -1,4 +1,5 @@
-from typing import List, Dict
+import uuid
+from typing import Annotated, List, Dict
 from dataclasses import dataclass, field
 from pydantic import BaseModel, Field
 from io import BytesIO
@@ -33,12 +34,19 @@ class TeamPlans(BaseModel):
         arbitrary_types_allowed = True
 
 
+def add_team_results(existing: List["AnalysisState"], new: List["AnalysisState"]) -> List["AnalysisState"]:
+    """Collects finished team slices; nodes returning the whole state write the same objects back"""
+    return existing + [result for result in new if not any(result is seen for seen in existing)]
+
+
 @dataclass
 class AnalysisState:
     """Maintains the state of the financial analysis workflow"""
     query: str  ###user query
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex)  ###names the run's working files (see tools/run_files.py)
     teams: List[TeamPlan] = field(default_factory=list)   ###list of teams along with their own action plans
     current_team_index: int = 0  ###which team is currently working on the task
     team_outputs: Dict[int, str] = field(default_factory=dict)  # stores output of each team, contains the final analysis by the senior
     shared_figures: Dict[str, BytesIO] = field(default_factory=dict) ## stores plots of each team
+    team_results: Annotated[List["AnalysisState"], add_team_results] = field(default_factory=list) ## finished per-team slices in parallel mode, merged by merge_teams
 
@@ -0,0 +1,28 @@
+"""Pooled async HTTP clients shared by the tools of every analysis running in this process"""
+from typing import Dict
+
+import httpx
+
+from config.settings import settings
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def shared_client(name: str) -> httpx.AsyncClient:
+    """One keep-alive connection pool per backend ('sql', 'news'), created on first use"""
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _clients[name] = httpx.AsyncClient(
+            timeout=settings.TOOLS_HTTP_TIMEOUT_S,
+            limits=httpx.Limits(
+                max_connections=settings.TOOLS_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.TOOLS_HTTP_MAX_CONNECTIONS,
+            ),
+        )
+    return client
+
+
+async def close_shared_clients():
+    for client in _clients.values():
+        await client.aclose()
+    _clients.clear()
@@ -0,0 +1,71 @@
+"""PythonREPL for agents whose snippets run concurrently, in worker threads of one process"""
+import sys
+import threading
+from contextlib import contextmanager
+from io import StringIO
+from typing import Dict, Optional
+
+from langchain_experimental.utilities import PythonREPL
+
+# pyplot keeps one process-wide registry of open figures: code that draws and then collects
+# "its" figures (the senior analysts) holds this lock from the first draw to the last capture
+PLOT_LOCK = threading.RLock()
+
+_capture = threading.local()
+_install_lock = threading.Lock()
+
+
+class _ThreadStdout:
+    """sys.stdout stand-in: writes go to the calling thread's capture buffer, if it has one"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def _target(self):
+        return getattr(_capture, "buffer", None) or self._stream
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        return self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+@contextmanager
+def captured_stdout():
+    if not isinstance(sys.stdout, _ThreadStdout):
+        with _install_lock:
+            if not isinstance(sys.stdout, _ThreadStdout):
+                sys.stdout = _ThreadStdout(sys.stdout)
+    buffer = StringIO()
+    _capture.buffer = buffer
+    try:
+        yield buffer
+    finally:
+        _capture.buffer = None
+
+
+class ConcurrentPythonREPL(PythonREPL):
+    """
+    PythonREPL.run swaps sys.stdout for the whole process while a snippet executes, so two
+    snippets running at once steal (and can permanently replace) each other's output.
+    This one captures print output per thread, and runs with one namespace for globals and
+    locals, so functions and comprehensions in a snippet see its imports and variables.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.locals = self.globals
+
+    @classmethod
+    def worker(cls, command: str, globals: Optional[Dict], locals: Optional[Dict], queue) -> None:
+        with captured_stdout() as output:
+            try:
+                exec(cls.sanitize_input(command), globals, locals)
+            except Exception as e:
+                queue.put(repr(e))
+                return
+        queue.put(output.getvalue())
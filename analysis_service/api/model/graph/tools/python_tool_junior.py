@@ -1,23 +1,27 @@
 from api.model.graph.state import TeamPlan, AnalysisState
-from langchain_experimental.utilities import PythonREPL
 from typing import List, Dict, Any, Optional
 
 
 import os
+import asyncio
 import tempfile
+import threading
 import pandas as pd
 
-def store_data(data: Any, dataset_id: str) -> str:
+from api.model.graph.tools.python_repl import ConcurrentPythonREPL
+from api.model.graph.tools.run_files import run_dir, write_arrow
+
+def store_data(data: Any, dataset_id: str, directory: Optional[str] = None) -> str:
     """
-    Stores either a DataFrame (as CSV) or a text string (as .txt).
+    Stores a DataFrame as an uncompressed Arrow file so it can be memory-mapped.
     Returns the file path.
     """
     file_path = ""
     if isinstance(data, pd.DataFrame):
         if data.empty:
             raise ValueError("Cannot store empty DataFrame")
-        file_path = os.path.join(tempfile.gettempdir(), f"{dataset_id}.csv")
-        data.to_csv(file_path, index=False)
+        file_path = os.path.join(directory or tempfile.gettempdir(), f"{dataset_id}.arrow")
+        write_arrow(data.reset_index(drop=True), file_path)
     else:
         raise TypeError(f"Unsupported data type: {type(data)}. Must be DataFrame.")
     return file_path
@@ -27,47 +31,67 @@ def store_data(data: Any, dataset_id: str) -> str:
 
 class junior_analysis_tool:
     def __init__(self, state: AnalysisState):
-        self.python_repl = PythonREPL()
+        # one namespace per tool (the helpers below see the setup imports, `global final_dataset`
+        # lands where it is read back); snippets of other teams and runs execute concurrently
+        self.python_repl = ConcurrentPythonREPL()
+        self._lock = threading.RLock()
         self.state = state
         
-        setup_code = """
-        import matplotlib.pyplot as plt
-        import numpy as np
-        import pandas as pd
-
-        final_dataset = None
-        final_dataset_description = None
-
-        def mark_final_dataset(df, description):
-            global final_dataset, final_dataset_description
-            if not isinstance(df, pd.DataFrame):
-                raise TypeError("Input must be a pandas DataFrame")
-            final_dataset = df
-            final_dataset_description = description
+        self.setup_code = """
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+final_dataset = None
+final_dataset_description = None
+
+def load_dataset(path):
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return feather.read_feather(path, memory_map=True)
+
+def mark_final_dataset(df, description):
+    global final_dataset, final_dataset_description
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError("Input must be a pandas DataFrame")
+    final_dataset = df
+    final_dataset_description = description
 """
-        # we run this setup code once at initialization
-        self.python_repl.run(setup_code)
+        # the setup code runs once, on first use, under this tool's lock
+        self._ready = False
+
+    def _setup(self):
+        if not self._ready:
+            self._ready = True
+            self.python_repl.run(self.setup_code)
 
     def __call__(self, input_code: str, team_plan: TeamPlan = None):
         try:
-            result = self.python_repl.run(input_code)
-            
-            # check if a final dataset was marked
-            if team_plan:
-                final_df = self.python_repl.locals.get('final_dataset')
-                df_desc = self.python_repl.locals.get('final_dataset_description')
+            with self._lock:
+                self._setup()
+                result = self.python_repl.run(input_code)
 
-                if final_df is not None and df_desc is not None:
-                    file_path = store_data(final_df, f"team_{team_plan.id}_{df_desc}")
-                    team_plan.shared_data[df_desc] = file_path
+                # check if a final dataset was marked
+                if team_plan:
+                    final_df = self.python_repl.globals.get('final_dataset')
+                    df_desc = self.python_repl.globals.get('final_dataset_description')
 
-                    # reset them in the REPL in case the tool is used again
-                    self.python_repl.run("final_dataset = None; final_dataset_description = None")
+                    if final_df is not None and df_desc is not None:
+                        directory = run_dir(self.state.run_id) if self.state is not None else None
+                        file_path = store_data(final_df, f"team_{team_plan.id}_{df_desc}", directory)
+                        team_plan.shared_data[df_desc] = file_path
+
+                        # reset them in the REPL in case the tool is used again
+                        self.python_repl.run("final_dataset = None; final_dataset_description = None")
 
             return str(result)
 
         except Exception as e:
             return f"Execution failed: {repr(e)}"
 
-
- 
\ No newline at end of file
+    async def acall(self, input_code: str, team_plan: TeamPlan = None):
+        """Runs the snippet in a worker thread so the event loop keeps serving other analyses"""
+        return await asyncio.to_thread(self, input_code, team_plan=team_plan)
@@ -1,32 +1,40 @@
 import os
+import asyncio
 import pandas as pd
+import pyarrow.feather as feather
 import matplotlib as plt
 from io import BytesIO
-from langchain_experimental.utilities import PythonREPL
 
 from api.model.graph.state import TeamPlan, AnalysisState
+from api.model.graph.tools.python_repl import PLOT_LOCK, ConcurrentPythonREPL
 
 
 def load_dataset(file_path: str) -> pd.DataFrame:
-    """Loads a DataFrame from a CSV file (if you need it directly in Python)."""
-    return pd.read_csv(file_path)
+    """Loads a DataFrame from an Arrow file, memory-mapped (if you need it directly in Python)."""
+    return feather.read_feather(file_path, memory_map=True)
 
 
 class senior_analysis_tool:
     def __init__(self, state: AnalysisState):
         plt.use('Agg')
-        self.python_repl = PythonREPL()
+        self.python_repl = ConcurrentPythonREPL()
         self.state = state
         
-        setup_code = """
+        self.setup_code = """
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd   ###need to extend further!!
 """
-        try:
-            self.python_repl.run(setup_code)
-        except Exception as e:
-            print(f"Setup failed: {repr(e)}")
+        # the setup code runs once, on first use, under PLOT_LOCK
+        self._ready = False
+
+    def _setup(self):
+        if not self._ready:
+            self._ready = True
+            try:
+                self.python_repl.run(self.setup_code)
+            except Exception as e:
+                print(f"Setup failed: {repr(e)}")
 
     def __call__(
         self,
@@ -38,47 +46,68 @@ import pandas as pd   ###need to extend further!!
         Executes Python code within this REPL context.
         
         1. Auto-load each file in team_plan.shared_data into the REPL:
-           - If it's .csv, load as a DataFrame (dataset_1, dataset_2, ...)
+           - If it's .arrow (memory-mapped), .parquet or .csv, load as a DataFrame (dataset_1, dataset_2, ...)
         2. Execute the given code (input_code) in the REPL.
         3. Capture any new figures in state.shared_figures.
         """
         try:
-            if team_plan:
-                for idx, (desc, file_path) in enumerate(team_plan.shared_data.items(), start=1):
-                    ext = os.path.splitext(file_path)[1].lower() 
-                    if ext == ".csv":
-                        var_name = f"dataset_{idx}"
-                        load_code = (
-                            f"import pandas as pd\n"
-                            f"{var_name} = pd.read_csv(r'{file_path}')\n"
-                            f'print("Loaded dataset for {desc} as {var_name}")'
-                        )
-                    else:
-                        var_name = f"file_{idx}"
-                        load_code = (
-                            f"import os\n"
-                            f"with open(r'{file_path}', 'rb') as f:\n"
-                            f"    {var_name} = f.read()\n"
-                            f'print("Loaded unknown file for {desc} as {var_name}")'
-                        )
+            # the datasets load, the code runs and its figures are collected under the pyplot lock,
+            # so figures from another senior's REPL are never picked up here
+            with PLOT_LOCK:
+                self._setup()
+                if team_plan:
+                    for idx, (desc, file_path) in enumerate(team_plan.shared_data.items(), start=1):
+                        ext = os.path.splitext(file_path)[1].lower() 
+                        if ext in (".arrow", ".feather"):
+                            var_name = f"dataset_{idx}"
+                            load_code = (
+                                f"import pyarrow.feather as feather\n"
+                                f"{var_name} = feather.read_feather(r'{file_path}', memory_map=True)\n"
+                                f'print("Loaded dataset for {desc} as {var_name}")'
+                            )
+                        elif ext == ".parquet":
+                            var_name = f"dataset_{idx}"
+                            load_code = (
+                                f"import pandas as pd\n"
+                                f"{var_name} = pd.read_parquet(r'{file_path}')\n"
+                                f'print("Loaded dataset for {desc} as {var_name}")'
+                            )
+                        elif ext == ".csv":
+                            var_name = f"dataset_{idx}"
+                            load_code = (
+                                f"import pandas as pd\n"
+                                f"{var_name} = pd.read_csv(r'{file_path}')\n"
+                                f'print("Loaded dataset for {desc} as {var_name}")'
+                            )
+                        else:
+                            var_name = f"file_{idx}"
+                            load_code = (
+                                f"import os\n"
+                                f"with open(r'{file_path}', 'rb') as f:\n"
+                                f"    {var_name} = f.read()\n"
+                                f'print("Loaded unknown file for {desc} as {var_name}")'
+                            )
 
-                    # run the load code in the REPL (need to carry this over to initialisation)
-                    self.python_repl.run(load_code)
+                        # run the load code in the REPL (need to carry this over to initialisation)
+                        self.python_repl.run(load_code)
 
-            result = self.python_repl.run(input_code)
+                result = self.python_repl.run(input_code)
             
-            # capture any new figures
-            if state and team_plan:
-                for fig in [plt.figure(n) for n in plt.get_fignums()]:
-                    buf = BytesIO()
-                    fig.savefig(buf, format='png')
-                    buf.seek(0)
-                    state.shared_figures[
-                        f"team_{self.state.current_team_index}_fig_{len(self.state.shared_figures)}"
-                    ] = buf
-                    plt.close(fig)
+                # capture any new figures
+                if state and team_plan:
+                    for fig in [plt.figure(n) for n in plt.get_fignums()]:
+                        buf = BytesIO()
+                        fig.savefig(buf, format='png')
+                        buf.seek(0)
+                        state.shared_figures[
+                            f"team_{team_plan.id}_fig_{len(state.shared_figures)}"
+                        ] = buf
+                        plt.close(fig)
             
-            return str(result)
+                return str(result)
         except Exception as e:
             return f"Execution failed: {repr(e)}"
 
+    async def acall(self, input_code: str, state: AnalysisState = None, team_plan: TeamPlan = None):
+        """Runs the snippet in a worker thread so the event loop keeps serving other analyses"""
+        return await asyncio.to_thread(self, input_code, state=state, team_plan=team_plan)
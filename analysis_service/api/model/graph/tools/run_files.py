@@ -0,0 +1,39 @@
+"""Working files (Arrow datasets) of one analysis run, kept apart from every other run's"""
+import os
+import shutil
+import tempfile
+from typing import Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+RUNS_DIR = os.path.join(tempfile.gettempdir(), "analysis_runs")
+
+
+def run_dir(run_id: str) -> str:
+    """Directory of a run's datasets, created on first use"""
+    path = os.path.join(RUNS_DIR, run_id)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def write_arrow(data: Union[pa.Table, pd.DataFrame], file_path: str) -> str:
+    """
+    Writes an uncompressed Arrow file next to `file_path` and renames it into place.
+    REPLs may have the previous file memory-mapped: they keep reading the old contents
+    instead of seeing a half-written file (or losing the pages under them).
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path), suffix=".tmp")
+    os.close(fd)
+    try:
+        feather.write_feather(data, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return file_path
+
+
+def remove_run_files(run_id: str):
+    shutil.rmtree(os.path.join(RUNS_DIR, run_id), ignore_errors=True)
@@ -1,64 +1,147 @@
 from langchain.tools import Tool
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 import httpx
+import json
+from api.model.graph.tools.http_clients import shared_client
 
 NEWS_SEARCH_DESCRIPTION = """
 Useful for searching news articles and content using semantic similarity.
 Input should be a search query string and optionally specify top_k for number of results.
 Use this when you need to find news articles related to a specific topic or query.
 Format: 'query' or 'query|top_k' where top_k is optional number of results to return.
-Example: "AI developments" or "AI developments|5" for top 5 results.
+Filters can be appended as key=value segments and are applied before ranking, so prefer them
+over fetching many results and filtering yourself:
+  ticker=AAPL, days=30, start_date=2024-01-01, end_date=2024-03-31,
+  sources=Reuters,Benzinga, min_sentiment=0.15, max_sentiment=-0.15
+Example: "AI developments" or "AI developments|5" for top 5 results,
+"earnings outlook|5|ticker=AAPL|days=30" for AAPL news from the last 30 days.
+To run several related searches at once, pass a JSON list of such strings, e.g.
+'["Apple earnings outlook|5|ticker=AAPL", "iPhone demand China|5|days=90"]'
+- they are answered in one call and results come back grouped by query.
 """
 
+FILTER_KEYS = {"ticker", "days", "start_date", "end_date", "sources", "min_sentiment", "max_sentiment"}
+
 class NewsSearchTool:
-    def __init__(self, endpoint_url: str):
+    def __init__(self, endpoint_url: str, batch_url: Optional[str] = None):
         self.endpoint_url = endpoint_url
+        self.batch_url = batch_url or f"{endpoint_url.rstrip('/')}/batch"
+        # one pooled client per tool, instead of a new connection for every search;
+        # the async path (asearch) shares one pool across every tool in the process
+        self.client = httpx.Client(timeout=30.0)
+
+    @staticmethod
+    def parse_query(query_input: str) -> Dict:
+        """'query|top_k|key=value...' -> request parameters"""
+        parts = query_input.split("|")
+        params = {"query": parts[0].strip()}
+        for part in parts[1:]:
+            part = part.strip()
+            if "=" in part:
+                key, value = (p.strip() for p in part.split("=", 1))
+                if key not in FILTER_KEYS:
+                    raise ValueError(f"Unknown news filter '{key}'; expected one of {sorted(FILTER_KEYS)}")
+                params[key] = value
+            elif part:
+                params["top_k"] = int(part)
+        return params
         
-    def search(self, query_input: str) -> List[Dict]:
+    def search(self, query_input: Union[str, List[str]]) -> Union[List[Dict], List[Dict[str, Any]]]:
         """
         Execute semantic search for news articles.
         
         Args:
-            query_input (str): The search query string, optionally with top_k parameter
-                             Format: "query" or "query|top_k"
+            query_input (str | list): The search query string, optionally with top_k and filters
+                             Format: "query", "query|top_k" or "query|top_k|ticker=AAPL|days=30".
+                             A list of such strings (or a JSON array of them) runs all searches
+                             in one batched request.
         
         Returns:
-            List[Dict]: List of relevant news articles/chunks
+            List[Dict]: List of relevant news articles/chunks, or for a list input one
+                        {"query", "results"} entry per query
             
         Raises:
             Exception: If the search service encounters an error
         """
-        parts = query_input.split("|")
-        query = parts[0].strip()
-        top_k = int(parts[1]) if len(parts) > 1 else None
-        
-        with httpx.Client() as client:
-            try:
-                params = {"query": query}
-                if top_k is not None:
-                    params["top_k"] = top_k
-                    
-                response = client.get(
-                    self.endpoint_url,
-                    params=params,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                # Extract results from response
-                results = data.get("results", [])
-                if not results:
-                    return []
-                    
-                return results
+        if isinstance(query_input, str) and query_input.strip().startswith("["):
+            query_input = json.loads(query_input)
+        if isinstance(query_input, list):
+            return self.search_batch(query_input)
+
+        params = self.parse_query(query_input)
+        try:
+            response = self.client.get(self.endpoint_url, params=params)
+            response.raise_for_status()
+            data = response.json()
+            
+            # Extract results from response
+            results = data.get("results", [])
+            if not results:
+                return []
                 
-            except httpx.RequestError as e:
-                raise Exception(f"Search service error: {str(e)}")
-            except httpx.HTTPStatusError as e:
-                raise Exception(f"HTTP error: {str(e)}")
-            except Exception as e:
-                raise Exception(f"Unexpected error during search: {str(e)}")
+            return results
+            
+        except httpx.RequestError as e:
+            raise Exception(f"Search service error: {str(e)}")
+        except httpx.HTTPStatusError as e:
+            raise Exception(f"HTTP error: {str(e)}")
+        except Exception as e:
+            raise Exception(f"Unexpected error during search: {str(e)}")
+
+    async def asearch(self, query_input: Union[str, List[str]]) -> Union[List[Dict], List[Dict[str, Any]]]:
+        """Async search (same inputs and results), used when the agents run with ainvoke"""
+        if isinstance(query_input, str) and query_input.strip().startswith("["):
+            query_input = json.loads(query_input)
+        if isinstance(query_input, list):
+            return await self.asearch_batch(query_input)
+
+        params = self.parse_query(query_input)
+        try:
+            response = await shared_client("news").get(self.endpoint_url, params=params)
+            response.raise_for_status()
+            return response.json().get("results", []) or []
+
+        except httpx.RequestError as e:
+            raise Exception(f"Search service error: {str(e)}")
+        except httpx.HTTPStatusError as e:
+            raise Exception(f"HTTP error: {str(e)}")
+        except Exception as e:
+            raise Exception(f"Unexpected error during search: {str(e)}")
+
+    def search_batch(self, query_inputs: List[str]) -> List[Dict[str, Any]]:
+        """Several searches in one request: one batched query embedding, concurrent retrievals"""
+        payload = {"queries": [self.parse_query(q) for q in query_inputs]}
+        try:
+            response = self.client.post(self.batch_url, json=payload, timeout=60.0)
+            response.raise_for_status()
+            return [
+                {"query": group["query"], "results": group.get("results", [])}
+                for group in response.json().get("results", [])
+            ]
+
+        except httpx.RequestError as e:
+            raise Exception(f"Search service error: {str(e)}")
+        except httpx.HTTPStatusError as e:
+            raise Exception(f"HTTP error: {str(e)}")
+        except Exception as e:
+            raise Exception(f"Unexpected error during search: {str(e)}")
+
+    async def asearch_batch(self, query_inputs: List[str]) -> List[Dict[str, Any]]:
+        payload = {"queries": [self.parse_query(q) for q in query_inputs]}
+        try:
+            response = await shared_client("news").post(self.batch_url, json=payload, timeout=60.0)
+            response.raise_for_status()
+            return [
+                {"query": group["query"], "results": group.get("results", [])}
+                for group in response.json().get("results", [])
+            ]
+
+        except httpx.RequestError as e:
+            raise Exception(f"Search service error: {str(e)}")
+        except httpx.HTTPStatusError as e:
+            raise Exception(f"HTTP error: {str(e)}")
+        except Exception as e:
+            raise Exception(f"Unexpected error during search: {str(e)}")
 
 def create_news_search_tool(endpoint_url: str) -> Tool:
     """
@@ -76,4 +159,5 @@ def create_news_search_tool(endpoint_url: str) -> Tool:
         name="news_search",
         description=NEWS_SEARCH_DESCRIPTION,
         func=search_tool.search,
+        coroutine=search_tool.asearch,
     )
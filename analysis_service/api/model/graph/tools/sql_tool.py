@@ -1,6 +1,4 @@
-import httpx  
-import pandas as pd 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Callable
 import pandas as pd
 import httpx
 from langchain.tools.base import BaseTool
@@ -12,6 +10,10 @@ from langchain_community.agent_toolkits.sql.toolkit import InfoSQLDatabaseTool,
 from langchain_community.tools.sql_database.tool import QuerySQLDataBaseTool
 import os
 import tempfile
+import hashlib
+import pyarrow as pa
+from api.model.graph.tools.http_clients import shared_client
+from api.model.graph.tools.run_files import write_arrow
 
 """Customised Descriptions for the SQL Toolkit utilised by agents."""
 QUERY_TOOL_DESCRIPTION = """Input to this tool is a detailed and correct SQL query, output is a JSON-formatted result from the database.
@@ -19,13 +21,14 @@ QUERY_TOOL_DESCRIPTION = """Input to this tool is a detailed and correct SQL que
         - Double quote ALL column names: "Column_Name"
         - Only use SELECT statements
         - Avoid LIMIT statements
+        - Filter by ticker and date range; queries the planner estimates as too expensive are rejected with hints
         - Only query necessary columns, never use SELECT *
         - Break complex calculations into simpler steps
         - If you get an error, verify schema and rewrite query.
         
-        The results will be automatically saved as a CSV file and you'll get the file path.
-        You can later load this CSV in python_repl using:
-        df = pd.read_csv('the_file_path_you_received')
+        The results will be automatically saved as an Arrow file and you'll get the file path.
+        You can later load this file in python_repl using:
+        df = load_dataset('the_file_path_you_received')
 """
 
 
@@ -34,7 +37,7 @@ LIST_TABLES_DESCRIPTION = """Use this tool FIRST before any other SQL operation.
         You must check available tables before querying any table."""
 
 INFO_TOOL_DESCRIPTION = """Input: comma-separated list of tables
-        Output: Returns schema and sample rows for those tables in JSON format.
+        Output: Returns columns, row counts, per-ticker date ranges and sample rows for those tables in JSON format.
         CRITICAL:
         - Must be used after list_tables to confirm table existence
         - Use this to verify column names and data types before writing queries
@@ -53,8 +56,12 @@ CHECKER_TOOL_DESCRIPTION = """ALWAYS use this tool before executing any query wi
 class HTTPSQLDatabase(SQLDatabase):
     """Custom SQL Database that works over HTTP."""
     
-    def __init__(self, endpoint_url: str):
+    def __init__(self, endpoint_url: str, catalog_url: Optional[str] = None, data_dir: Optional[str] = None):
         self.endpoint_url = endpoint_url
+        # result files go to the analysis run's own directory, so concurrent runs never share one
+        self.data_dir = data_dir or tempfile.gettempdir()
+        # the schema catalog sits next to the search endpoint (/sql/search -> /sql/catalog)
+        self.catalog_url = catalog_url or f"{endpoint_url.rsplit('/', 1)[0]}/catalog"
         self._engine = None
         self._schema = None
         
@@ -69,19 +76,32 @@ class HTTPSQLDatabase(SQLDatabase):
     def dialect(self) -> str:
         return "postgresql"
 
+    def get_catalog(self, table_names: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Fetch the precomputed schema catalog (served from memory by the storage service)."""
+        params = {"tables": ",".join(table_names)} if table_names else {}
+        with httpx.Client() as client:
+            response = client.get(self.catalog_url, params=params, timeout=30.0)
+            response.raise_for_status()
+            return response.json()
+
+    async def aget_catalog(self, table_names: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Async get_catalog over the shared connection pool."""
+        params = {"tables": ",".join(table_names)} if table_names else {}
+        response = await shared_client("sql").get(self.catalog_url, params=params)
+        response.raise_for_status()
+        return response.json()
+
     def get_tables(self) -> List[str]:
-        """Get list of tables using SQL query."""
-        query = """
-        SELECT table_name 
-        FROM information_schema.tables 
-        WHERE table_schema = 'public'
-        """
-        result = self.run(query)
-        #extract table names from JSON structure
-        table_list = [row['table_name'] for row in result]
+        """Get list of tables from the schema catalog."""
+        table_list = sorted(self.get_catalog()["tables"])
         self._all_tables = set(table_list)
         return table_list
 
+    async def aget_usable_table_names(self) -> List[str]:
+        if not self._all_tables:
+            self._all_tables = set((await self.aget_catalog())["tables"])
+        return sorted(self._all_tables - self._ignore_tables)
+
     def get_usable_table_names(self) -> List[str]:
         """
         Return the difference of _all_tables and _ignore_tables in sorted order.
@@ -92,59 +112,68 @@ class HTTPSQLDatabase(SQLDatabase):
         return sorted(self._all_tables - self._ignore_tables)
 
     def get_table_info(self, table_names: Optional[List[str]] = None) -> str:
-        """Get table schema using SQL query."""
+        """Get columns, row counts, per-ticker date ranges and sample rows from the schema catalog."""
         if not table_names:
             return "No tables specified"
-        
-        query = """
-        SELECT 
-            table_name,
-            column_name,
-            data_type,
-            is_nullable
-        FROM information_schema.columns
-        WHERE table_name IN ({})
-        AND table_schema = 'public'
-        ORDER BY table_name, ordinal_position
-        """.format(','.join(f"'{name}'" for name in table_names))
-        
-        result = self.run(query)
-        return json.dumps(result)
+
+        return self._format_table_info(table_names, self.get_catalog(table_names)["tables"])
+
+    async def aget_table_info(self, table_names: Optional[List[str]] = None) -> str:
+        if not table_names:
+            return "No tables specified"
+
+        return self._format_table_info(table_names, (await self.aget_catalog(table_names))["tables"])
+
+    @staticmethod
+    def _format_table_info(table_names: List[str], tables: Dict[str, Any]) -> str:
+        missing = [name for name in table_names if name not in tables]
+        info = {
+            name: {
+                "columns": [f'{c["name"]} ({c["type"]})' for c in table["columns"]],
+                "row_count": table.get("row_count"),
+                "date_column": table.get("date_column"),
+                "ticker_ranges": table.get("ticker_ranges"),
+                "sample_rows": table.get("sample_rows"),
+            }
+            for name, table in tables.items()
+        }
+        if missing:
+            info["unknown_tables"] = missing
+        return json.dumps(info, default=str)
     
-    def save_sql_results(self, results: List[Dict[str, Any]], query_hash: str) -> str:
+    def save_sql_results(self, table: pa.Table, query_hash: str) -> str:
         """
-        Save SQL results (list of row dicts) to disk and return the file path.
+        Save SQL results (Arrow table) to disk as an uncompressed Arrow IPC file
+        so the REPLs can memory-map it, and return the file path.
         """
-        file_path = os.path.join(tempfile.gettempdir(), f"sql_results_{query_hash}.csv")
-        df = pd.DataFrame(results)
-        df.to_csv(file_path, index=False)
-        return file_path
+        file_path = os.path.join(self.data_dir, f"sql_results_{query_hash}.arrow")
+        return write_arrow(table, file_path)
 
 
-    def enhanced_sql_formatter(self, results: List[Dict[str, Any]]) -> str:
+    def enhanced_sql_formatter(self, table: pa.Table, query: str) -> str:
         """
-        1. Save the list of row dicts as a CSV file.
+        1. Save the Arrow table as an Arrow file.
         2. Return a short text with the file path and a small preview.
         """
-        if not results:
+        if table.num_rows == 0:
             return "Query returned no results"
 
-        # create a unique hash from results for the file name
-        import hashlib
-        content_hash = hashlib.md5(str(results).encode()).hexdigest()[:8]
+        # name the file after the query rather than hashing the whole result set
+        query_hash = hashlib.md5(" ".join(query.split()).encode()).hexdigest()[:8]
 
         # save to disk
-        file_path = self.save_sql_results(results, content_hash)
+        file_path = self.save_sql_results(table, query_hash)
 
         # return a small preview
-        df = pd.DataFrame(results)
-        preview_df = df.head()  # first few rows
+        preview_df = table.slice(0, 5).to_pandas()  # first few rows
+        notes = (table.schema.metadata or {}).get(b"notes", b"").decode()
         return (
+        (f"NOTE: {notes}\n" if notes else "") +
         f"SQL Results saved to: {file_path}\n"
-        f"<<CSV_FILE_PATH:{file_path}>>\n"   # <-- ADDED MARKER
+        f"<<DATASET_PATH:{file_path}>>\n"
         f"Preview:\n{preview_df.to_string(index=False)}\n\n"
-        f"Shape: {df.shape}\n"
-        f"Columns: {', '.join(df.columns)}"
+        f"Shape: ({table.num_rows}, {table.num_columns})\n"
+        f"Columns: {', '.join(table.column_names)}"
     )
 
 
@@ -175,25 +204,104 @@ class HTTPSQLDatabase(SQLDatabase):
 
             except Exception as e:
                 return [{"error": str(e)}]
+
+
+    def run_arrow(self, query: str) -> pa.Table:
+        """
+        Execute a SQL query via the HTTP endpoint and return the result as an Arrow table,
+        read straight from the Arrow IPC response without building row dicts.
+        """
+        with httpx.Client() as client:
+            response = client.get(
+                self.endpoint_url,
+                params={"query": query, "format": "arrow"},
+                timeout=30.0
+            )
+        return self._arrow_response(response)
+
+    async def arun_arrow(self, query: str) -> pa.Table:
+        """Async run_arrow over the shared connection pool."""
+        response = await shared_client("sql").get(
+            self.endpoint_url,
+            params={"query": query, "format": "arrow"},
+        )
+        return self._arrow_response(response)
+
+    @staticmethod
+    def _arrow_response(response: httpx.Response) -> pa.Table:
+        if response.status_code != 200:
+            try:
+                detail = response.json().get("detail", response.text)
+            except ValueError:
+                detail = response.text
+            if isinstance(detail, dict):
+                # structured guard rejection: tell the agent what to narrow
+                hints = "\n".join(f"- {hint}" for hint in detail.get("hints", []))
+                detail = f"{detail.get('message', detail)}\n{hints}".strip()
+            raise Exception(detail)
+
+        content_type = response.headers.get("content-type", "")
+        if "arrow" not in content_type:
+            # only SELECTs reach the storage service; anything else is not a result to show as 0 rows
+            raise Exception(f"Expected an Arrow stream from the SQL search, got {content_type or 'no content type'}: {response.text[:500]}")
+
+        with pa.ipc.open_stream(response.content) as reader:
+            return reader.read_all()
             
 
 class StrictQuerySQLDataBaseTool(QuerySQLDataBaseTool):
+    output_formatter: Optional[Callable[[pa.Table, str], str]] = None
+
+    def _run(self, query: str, run_manager=None) -> str:
+        """Route tool calls through the Arrow-based `_call`."""
+        return self._call(query)
+
+    async def _arun(self, query: str, run_manager=None) -> str:
+        query = query.strip()
+        try:
+            table = await self.db.arun_arrow(query)
+        except Exception as e:
+            return f"Error: {str(e)}"
+        return self._format(table, query)
+
     def _call(self, inputs: str) -> str:
         """Override to ensure we only return the final formatted text."""
         query = inputs.strip()
-        results = self.db.run(query)
+        try:
+            table = self.db.run_arrow(query)
+        except Exception as e:
+            return f"Error: {str(e)}"
+        return self._format(table, query)
 
+    def _format(self, table: pa.Table, query: str) -> str:
         if self.output_formatter:
-            final_text = self.output_formatter(results)
+            final_text = self.output_formatter(table, query)
         else:
-            final_text = str(results)
+            final_text = str(table.to_pylist())
         
         return final_text
 
     
 
-def create_enhanced_sql_toolkit(endpoint_url: str, llm: BaseLanguageModel) -> List[BaseTool]:
-    db = HTTPSQLDatabase(endpoint_url)
+class AsyncInfoSQLDatabaseTool(InfoSQLDatabaseTool):
+    """sql_db_schema without blocking the event loop on the catalog request"""
+
+    async def _arun(self, table_names: str, run_manager=None) -> str:
+        try:
+            return await self.db.aget_table_info([t.strip() for t in table_names.split(",")])
+        except ValueError as e:
+            return f"Error: {e}"
+
+
+class AsyncListSQLDatabaseTool(ListSQLDatabaseTool):
+    """sql_db_list_tables without blocking the event loop on the catalog request"""
+
+    async def _arun(self, tool_input: str = "", run_manager=None) -> str:
+        return ", ".join(await self.db.aget_usable_table_names())
+
+
+def create_enhanced_sql_toolkit(endpoint_url: str, llm: BaseLanguageModel, data_dir: Optional[str] = None) -> List[BaseTool]:
+    db = HTTPSQLDatabase(endpoint_url, data_dir=data_dir)
     
     def json_formatter(result: dict) -> str:
         """Simple JSON formatter that doesn't need conversion"""
@@ -207,12 +315,12 @@ def create_enhanced_sql_toolkit(endpoint_url: str, llm: BaseLanguageModel) -> Li
             #'verbose': False
             # 'return_direct': True
         },
-        InfoSQLDatabaseTool: {
+        AsyncInfoSQLDatabaseTool: {
             'name': 'sql_db_schema',
             'description': INFO_TOOL_DESCRIPTION,
             'formatter': json_formatter
         },
-        ListSQLDatabaseTool: {
+        AsyncListSQLDatabaseTool: {
             'name': 'sql_db_list_tables',
             'description': LIST_TABLES_DESCRIPTION,
             'formatter': json_formatter
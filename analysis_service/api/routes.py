@@ -1,6 +1,13 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
+from typing import Optional
+import asyncio
+import json
 from .model.graph.tools.sql_tool import create_enhanced_sql_toolkit
+from .model.financial_analysis import GRAPHS, render_graph
+from .model.analysis_jobs import analysis_jobs
+from .model.graph.llm_cache import get_store, store_error
 from config.settings import settings
 import logging
 
@@ -14,21 +21,122 @@ class FinanceQuery(BaseModel):
 router = APIRouter(prefix="/api/v1")  
 
 
-# @router.post("/analysis")
-# async def financial_analysis(request: FinanceQuery):
-#     """
-#     Financial analysis service
-#     """
-#     try:
-#         result = await get_financial_analysis(
-#             query=request.query,
-#         )
-#         return result
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=str(e))
+@router.post("/analysis", status_code=202)
+async def financial_analysis(request: FinanceQuery):
+    """
+    Start a financial analysis in the background.
+    Follow it at /analysis/{job_id}/events (Server-Sent Events) or poll /analysis/{job_id}.
+    """
+    if not request.query.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty.")
+    job = analysis_jobs.start(request.query)
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/v1/analysis/{job.id}",
+        "events_url": f"/api/v1/analysis/{job.id}/events",
+    }
     
 
 
+@router.get("/analysis/graph")
+async def analysis_graph(name: str = "main", format: str = "png"):
+    """
+    Visualise the compiled analysis graph (`main`) or the per-team subgraph (`team`),
+    as a PNG or as Mermaid source (`format=mermaid`, rendered locally)
+    """
+    if name not in GRAPHS:
+        raise HTTPException(status_code=400, detail=f"name must be one of {sorted(GRAPHS)}.")
+    if format not in ("png", "mermaid"):
+        raise HTTPException(status_code=400, detail="format must be 'png' or 'mermaid'.")
+    try:
+        rendered = await asyncio.to_thread(render_graph, name, format)
+    except Exception as e:
+        logger.error(f"Graph rendering failed: {str(e)}")
+        raise HTTPException(status_code=502, detail=f"Graph rendering failed: {str(e)}")
+    if format == "mermaid":
+        return PlainTextResponse(rendered)
+    return Response(content=rendered, media_type="image/png")
+
+
+
+def _job_or_404(job_id: str):
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired analysis job '{job_id}'.")
+    return job
+
+
+@router.get("/analysis/{job_id}")
+async def analysis_status(job_id: str):
+    """Status of an analysis job, with its result once completed"""
+    return _job_or_404(job_id).summary()
+
+
+@router.get("/analysis/{job_id}/events")
+async def analysis_events_stream(job_id: str, last_event_id: Optional[str] = Header(None)):
+    """
+    Progress of an analysis job as Server-Sent Events: status changes, the team plan,
+    node starts/ends (action_plan, junior/senior per team, supervisor_review...), tool calls
+    and team outputs. Earlier events are replayed first; reconnecting clients send
+    Last-Event-ID to continue where they left off. The stream ends when the job finishes.
+    """
+    job = _job_or_404(job_id)
+    after = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+
+    async def stream():
+        async for event in analysis_jobs.follow(job, after):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            payload = json.dumps({**event["data"], "time": event["time"]}, default=str)
+            yield f"id: {event['id']}\nevent: {event['type']}\ndata: {payload}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/analysis/{job_id}/figures/{name}")
+async def analysis_figure(job_id: str, name: str):
+    """A figure the senior analysts produced, as PNG"""
+    figure = _job_or_404(job_id).figures.get(name)
+    if figure is None:
+        raise HTTPException(status_code=404, detail=f"No figure '{name}' in this analysis.")
+    return Response(content=figure, media_type="image/png")
+
+
+@router.delete("/analysis/{job_id}")
+async def cancel_analysis(job_id: str):
+    """Cancel a queued or running analysis"""
+    _job_or_404(job_id)
+    job = await analysis_jobs.cancel(job_id)
+    return job.summary()
+
+
+
+@router.get("/llm-cache")
+async def llm_cache_stats():
+    """LLM response cache: entries, size, and hits/misses/writes per chain"""
+    store = get_store()
+    if store is None:
+        raise HTTPException(status_code=503, detail=f"LLM cache unavailable: {store_error()}")
+    return store.stats()
+
+
+@router.delete("/llm-cache")
+async def clear_llm_cache(chain: Optional[str] = None):
+    """Drop cached LLM responses, for one chain or all of them"""
+    store = get_store()
+    if store is None:
+        raise HTTPException(status_code=503, detail=f"LLM cache unavailable: {store_error()}")
+    store.clear(chain)
+    return store.stats()
+
+
+
 ##quick health check
 @router.get("/test/sql")
 async def test_sql_connection():
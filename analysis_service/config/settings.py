@@ -10,6 +10,33 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str 
     TAVILY_API_KEY: str 
     GATEWAY_URI: str = "http://localhost:8080"
+
+    # run the planned teams concurrently (one LangGraph branch per team) instead of one by one;
+    # at most ANALYSIS_MAX_PARALLEL_TEAMS branches run at the same time.
+    # Limits: REPL snippets of different teams and analyses run in worker threads of one process and
+    # share the GIL, so CPU-bound pandas code scales with processes, not with this setting; senior
+    # snippets (which draw with pyplot's process-wide figure registry) run one at a time per process
+    ANALYSIS_PARALLEL_TEAMS: bool = True
+    ANALYSIS_MAX_PARALLEL_TEAMS: int = 3
+
+    # background analysis jobs (/api/v1/analysis): how many run at once, how long finished ones are kept
+    ANALYSIS_MAX_CONCURRENT_JOBS: int = 20
+    ANALYSIS_JOB_TTL_S: float = 3600.0
+
+    # disk cache of LLM responses, keyed on model + parameters + exact prompt; LLM_CACHE_CHAINS picks
+    # which chains use it. The analysts (junior_analyst, senior_analyst) are off by default: after their
+    # first step the prompts carry tool observations with per-run dataset paths, so their keys never
+    # repeat across runs, and caching them turns off token streaming of the agent steps
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_CHAINS: str = "planning,hallucination_grader,answer_grader"
+    LLM_CACHE_PATH: str = "/app/llm_cache/llm_cache.sqlite"
+    LLM_CACHE_TTL_S: float = 7 * 24 * 3600.0  # 0: entries never expire
+    LLM_CACHE_MAX_MB: float = 512.0  # least recently used entries are evicted past this
+    LLM_CACHE_NONDETERMINISTIC: bool = False  # also cache temperature > 0 calls
+
+    # pooled HTTP clients the SQL and news tools of all concurrent analyses share
+    TOOLS_HTTP_MAX_CONNECTIONS: int = 100
+    TOOLS_HTTP_TIMEOUT_S: float = 30.0
     
     class Config:
         env_file = ".env"
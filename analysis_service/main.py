@@ -1,11 +1,24 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from api.routes import router
+from api.model.analysis_jobs import analysis_jobs
+from api.model.graph.tools.http_clients import close_shared_clients
 from config.settings import settings
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await analysis_jobs.shutdown()
+    # connection pools the agents' SQL and news tools share
+    await close_shared_clients()
+
+
 app = FastAPI(
     title="Financial Analysis Service",
     description="Service for analysing financial queries",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.include_router(router)
@@ -0,0 +1,13 @@
+import os
+import tempfile
+
+# settings are read when config.settings is first imported: give the required values a
+# placeholder, and keep the LLM cache in a scratch directory
+_cache_dir = tempfile.mkdtemp(prefix="analysis_service_tests_")
+
+for name, value in {
+    "OPENAI_API_KEY": "test",
+    "TAVILY_API_KEY": "test",
+    "LLM_CACHE_PATH": os.path.join(_cache_dir, "llm_cache.sqlite"),
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,122 @@
+import asyncio
+
+from api.model import analysis_jobs as jobs_module
+from api.model.analysis_jobs import COMPLETED, FAILED, RUNNING, AnalysisJobs
+
+
+def node_event(kind: str, name: str, run_id: str):
+    return {
+        "event": kind, "name": name, "run_id": run_id, "parent_ids": ["root"],
+        "metadata": {"langgraph_node": name}, "data": {"input": {}, "output": {}},
+    }
+
+
+def fake_run(gate: asyncio.Event = None, error: Exception = None):
+    """Stands in for analysis_events: one node, optionally held open by `gate`, then the final state"""
+    async def events(query, run_id=None):
+        yield node_event("on_chain_start", "supervisor_review", "r1")
+        if gate is not None:
+            await gate.wait()
+        if error is not None:
+            raise error
+        yield node_event("on_chain_end", "supervisor_review", "r1")
+        yield {"event": "on_chain_end", "name": "LangGraph", "run_id": "root", "parent_ids": [],
+               "data": {"output": {"teams": [], "team_outputs": {1: {"analysis": "done"}}}}}
+    return events
+
+
+def describe(event):
+    data = event["data"]
+    return event["type"], data.get("status") or f"{data.get('node')}:{data.get('phase')}"
+
+
+async def collect(follow):
+    return [event async for event in follow]
+
+
+def test_a_finished_job_replays_every_event(monkeypatch):
+    monkeypatch.setattr(jobs_module, "analysis_events", fake_run())
+
+    async def scenario():
+        jobs = AnalysisJobs()
+        job = jobs.start("how did AAPL do?")
+        await job.task
+        events = await collect(jobs.follow(job))
+        await jobs.shutdown()
+        return job, events
+
+    job, events = asyncio.run(scenario())
+
+    assert job.status == COMPLETED
+    assert [event["id"] for event in events] == [1, 2, 3, 4, 5]
+    assert [describe(event) for event in events] == [
+        ("status", "queued"),
+        ("status", "running"),
+        ("node", "supervisor_review:start"),
+        ("node", "supervisor_review:end"),
+        ("status", "completed"),
+    ]
+    assert events[-1]["data"]["result"]["team_outputs"] == {1: {"analysis": "done"}}
+
+
+def test_a_reconnecting_client_resumes_after_its_last_event_id(monkeypatch):
+    monkeypatch.setattr(jobs_module, "analysis_events", fake_run())
+
+    async def scenario():
+        jobs = AnalysisJobs()
+        job = jobs.start("q")
+        await job.task
+        resumed = await collect(jobs.follow(job, after=3))
+        caught_up = await collect(jobs.follow(job, after=len(job.events)))
+        await jobs.shutdown()
+        return resumed, caught_up
+
+    resumed, caught_up = asyncio.run(scenario())
+
+    assert [event["id"] for event in resumed] == [4, 5]
+    assert caught_up == []
+
+
+def test_followers_receive_events_while_the_job_runs(monkeypatch):
+    gate = asyncio.Event()
+    monkeypatch.setattr(jobs_module, "analysis_events", fake_run(gate))
+
+    async def scenario():
+        jobs = AnalysisJobs()
+        job = jobs.start("q")
+        seen, follow = [], jobs.follow(job, keepalive_s=0.05)
+        async for event in follow:
+            seen.append(event)
+            if event is None:
+                # nothing new while the run is held: a keep-alive, then let it finish
+                status = job.status
+                gate.set()
+            elif event["data"].get("status") == COMPLETED:
+                break
+        await jobs.shutdown()
+        return seen, status
+
+    seen, status_at_keepalive = asyncio.run(scenario())
+
+    assert status_at_keepalive == RUNNING
+    keepalive = seen.index(None)
+    assert [describe(event) for event in seen[:keepalive]] == [
+        ("status", "queued"), ("status", "running"), ("node", "supervisor_review:start"),
+    ]
+    assert [event["id"] for event in seen[keepalive + 1:]] == [4, 5]
+
+
+def test_a_failed_run_ends_the_stream_with_its_error(monkeypatch):
+    monkeypatch.setattr(jobs_module, "analysis_events", fake_run(error=RuntimeError("model unavailable")))
+
+    async def scenario():
+        jobs = AnalysisJobs()
+        job = jobs.start("q")
+        events = await collect(jobs.follow(job))
+        await jobs.shutdown()
+        return job, events
+
+    job, events = asyncio.run(scenario())
+
+    assert job.status == FAILED and job.error == "model unavailable"
+    assert events[-1]["data"] == {"status": FAILED, "error": "model unavailable"}
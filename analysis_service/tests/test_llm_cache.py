@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.outputs import Generation
+
+from api.model.graph import llm_cache
+from api.model.graph.llm_cache import LLMCache, LLMCacheStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A hand-driven time.time() for the cache module"""
+    now = SimpleNamespace(value=1_000.0)
+    monkeypatch.setattr(llm_cache, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    store = LLMCacheStore(str(tmp_path / "cache.sqlite"), ttl_s=60, max_bytes=0)
+    store.put("k", "planning", "answer")
+
+    clock.value += 59
+    assert store.get("k", "planning") == "answer"
+    clock.value += 2
+    assert store.get("k", "planning") is None
+
+    stats = store.stats()
+    assert stats["entries"] == 0 and stats["bytes"] == 0
+    assert stats["chains"]["planning"]["hits"] == 1
+    assert stats["chains"]["planning"]["misses"] == 1
+
+
+def test_a_zero_ttl_never_expires(tmp_path, clock):
+    store = LLMCacheStore(str(tmp_path / "cache.sqlite"), ttl_s=0, max_bytes=0)
+    store.put("k", "planning", "answer")
+
+    clock.value += 10 * 365 * 24 * 3600
+    assert store.get("k", "planning") == "answer"
+
+
+def test_least_recently_used_entries_are_evicted_past_max_bytes(tmp_path, clock):
+    store = LLMCacheStore(str(tmp_path / "cache.sqlite"), ttl_s=0, max_bytes=25)
+    for key in ("a", "b"):
+        clock.value += 1
+        store.put(key, "planning", "x" * 10)
+    clock.value += 1
+    assert store.get("a", "planning") is not None  # "b" is now the least recently used
+
+    clock.value += 1
+    store.put("c", "planning", "x" * 10)
+
+    assert store.get("b", "planning") is None
+    assert store.get("a", "planning") is not None and store.get("c", "planning") is not None
+    assert store.stats()["bytes"] == 20
+    assert store.evictions == 1
+
+
+def test_size_accounting_survives_replacements_and_restarts(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    store = LLMCacheStore(path, ttl_s=0, max_bytes=0)
+    store.put("a", "planning", "x" * 10)
+    store.put("a", "planning", "x" * 4)
+    store.put("b", "answer_grader", "é")
+
+    assert store.stats()["bytes"] == 6
+    assert LLMCacheStore(path, ttl_s=0, max_bytes=0).stats()["bytes"] == 6
+
+    store.clear("planning")
+    assert store.stats()["bytes"] == 2
+
+
+def test_langchain_view_round_trips_generations(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "_store", LLMCacheStore(str(tmp_path / "cache.sqlite"), ttl_s=0, max_bytes=0))
+    cache = LLMCache("planning")
+
+    assert cache.lookup("prompt", "gpt-4o temperature=0") is None
+    cache.update("prompt", "gpt-4o temperature=0", [Generation(text="plan")])
+
+    assert cache.lookup("prompt", "gpt-4o temperature=0") == [Generation(text="plan")]
+    # another model or parameter set is another entry
+    assert cache.lookup("prompt", "gpt-4o-mini temperature=0") is None
+
+
+def test_only_deterministic_calls_of_enabled_chains_are_cached(monkeypatch):
+    monkeypatch.setattr(llm_cache.settings, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(llm_cache.settings, "LLM_CACHE_CHAINS", "planning,answer_grader")
+    monkeypatch.setattr(llm_cache.settings, "LLM_CACHE_NONDETERMINISTIC", False)
+    monkeypatch.setattr(llm_cache, "_store_error", None)
+
+    assert isinstance(llm_cache.llm_cache("planning"), LLMCache)
+    assert llm_cache.llm_cache("planning") is llm_cache.llm_cache("planning", temperature=0)
+    assert llm_cache.llm_cache("planning", temperature=0.7) is False
+    assert llm_cache.llm_cache("senior_analyst") is False
+
+    monkeypatch.setattr(llm_cache.settings, "LLM_CACHE_NONDETERMINISTIC", True)
+    assert isinstance(llm_cache.llm_cache("planning", temperature=0.7), LLMCache)
+
+
+def test_caching_is_off_while_the_store_cannot_be_opened(monkeypatch):
+    monkeypatch.setattr(llm_cache.settings, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(llm_cache, "_store_error", "disk full")
+
+    assert llm_cache.llm_cache("planning") is False
+    monkeypatch.setattr(llm_cache.settings, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(llm_cache, "_store_error", None)
+    assert llm_cache.enabled_chains() == []
+    assert llm_cache.llm_cache("planning") is False
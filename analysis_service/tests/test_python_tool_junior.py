@@ -0,0 +1,52 @@
+import pyarrow.feather as feather
+
+from api.model.graph.state import AnalysisState, TeamPlan
+from api.model.graph.tools.python_tool_junior import junior_analysis_tool
+from api.model.graph.tools.run_files import remove_run_files
+
+
+def make_team_plan() -> TeamPlan:
+    return TeamPlan(
+        id=1,
+        focus_area="prices",
+        expected_output="a dataset",
+        junior_task="collect prices",
+        junior_data_needs=["AAPL closes"],
+        junior_expected_output="a DataFrame",
+        senior_task="analyse prices",
+        senior_expected_output="a report",
+    )
+
+
+def test_marked_dataset_is_stored_in_the_run_directory():
+    state = AnalysisState(query="q", run_id="test-junior-tool")
+    team_plan = make_team_plan()
+    tool = junior_analysis_tool(state)
+    try:
+        output = tool(
+            "df = pd.DataFrame({'close': [1.0, 2.0]})\n"
+            "mark_final_dataset(df, 'closes')",
+            team_plan=team_plan,
+        )
+
+        assert "Execution failed" not in output
+        file_path = team_plan.shared_data["closes"]
+        assert "test-junior-tool" in file_path
+        assert feather.read_feather(file_path)["close"].tolist() == [1.0, 2.0]
+        # the marker is reset, so the next snippet does not store the dataset again
+        assert tool.python_repl.globals["final_dataset"] is None
+    finally:
+        remove_run_files(state.run_id)
+
+
+def test_load_dataset_reads_a_stored_file():
+    state = AnalysisState(query="q", run_id="test-junior-load")
+    team_plan = make_team_plan()
+    tool = junior_analysis_tool(state)
+    try:
+        tool("mark_final_dataset(pd.DataFrame({'x': [3]}), 'xs')", team_plan=team_plan)
+        output = tool(f"print(load_dataset(r'{team_plan.shared_data['xs']}')['x'].sum())", team_plan=team_plan)
+
+        assert output.strip() == "3"
+    finally:
+        remove_run_files(state.run_id)
@@ -4,6 +4,9 @@ class Settings(BaseSettings):
     INGESTION_SERVICE_URL: str = "http://ingestion_service:8000"
     STORAGE_SERVICE_URL: str = "http://storage_service:8001"
     ANALYSIS_SERVICE_URL: str = "http://analysis_service:8002"
+    # SQL search/catalog proxies: must outlast the storage service's SQL_STATEMENT_TIMEOUT_MS (30 s)
+    # plus its EXPLAIN check, so a cancelled statement comes back as its query_timeout response
+    SQL_PROXY_TIMEOUT_S: float = 60.0
 
     class Config:
         env_file = ".env"
@@ -1,7 +1,9 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse
 import httpx
+from typing import Optional
 from config.settings import settings
-from models import StockRequest, NewsRequest, FinancialsRequest, AnalysisRequest
+from models import StockRequest, NewsRequest, FinancialsRequest, AnalysisRequest, NewsBatchSearchRequest
 import logging
 import json
 # Set up logging
@@ -126,20 +128,88 @@ async def fetch_and_store_news(request: NewsRequest):
 
 #### SEARCH NEWS DATA
 @app.get("/news/search")
-async def search_news(query: str):
+async def search_news(
+    query: str,
+    top_k: Optional[int] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    days: Optional[int] = None,
+    sources: Optional[str] = None,
+    min_sentiment: Optional[float] = None,
+    max_sentiment: Optional[float] = None,
+    ticker: Optional[str] = None,
+    mode: Optional[str] = None,
+    vector_weight: Optional[float] = None,
+    keyword_weight: Optional[float] = None,
+):
     """
-    Search news data using vector similarity search
+    Search news data (vector, BM25 keyword or hybrid), optionally filtered by date window,
+    sources, sentiment range and ticker (filters are applied by the storage service's indexes)
     """
+    params = {
+        "query": query,
+        "top_k": top_k,
+        "start_date": start_date,
+        "end_date": end_date,
+        "days": days,
+        "sources": sources,
+        "min_sentiment": min_sentiment,
+        "max_sentiment": max_sentiment,
+        "ticker": ticker,
+        "mode": mode,
+        "vector_weight": vector_weight,
+        "keyword_weight": keyword_weight,
+    }
     async with httpx.AsyncClient() as client:
         try:
             logger.info(f"Sending search request to storage service: {STORAGE_SERVICE_URL}/api/v1/search/news")
             search_response = await client.get(
                 f"{STORAGE_SERVICE_URL}/api/v1/search/news",
-                params={"query": query}
+                params={k: v for k, v in params.items() if v is not None}
             )
             search_response.raise_for_status()
             return search_response.json()
 
+        except httpx.HTTPStatusError as e:
+            # e.g. 400 for a malformed date filter
+            try:
+                detail = e.response.json().get("detail", e.response.text)
+            except ValueError:
+                detail = e.response.text
+            raise HTTPException(status_code=e.response.status_code, detail=detail)
+
+        except httpx.RequestError as e:
+            logger.error(f"Search error: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Search service error: {str(e)}")
+
+
+
+
+#### SEVERAL NEWS SEARCHES IN ONE REQUEST
+@app.post("/news/search/batch")
+async def search_news_batch(request: NewsBatchSearchRequest):
+    """
+    Run several news searches in one call; the storage service embeds all queries in a single
+    batched request and runs the retrievals concurrently
+    """
+    async with httpx.AsyncClient() as client:
+        try:
+            logger.info(f"Sending {len(request.queries)} searches to storage service: {STORAGE_SERVICE_URL}/api/v1/search/news/batch")
+            search_response = await client.post(
+                f"{STORAGE_SERVICE_URL}/api/v1/search/news/batch",
+                json=request.model_dump(exclude_none=True),
+                timeout=60.0
+            )
+            search_response.raise_for_status()
+            return search_response.json()
+
+        except httpx.HTTPStatusError as e:
+            try:
+                detail = e.response.json().get("detail", e.response.text)
+            except ValueError:
+                detail = e.response.text
+            raise HTTPException(status_code=e.response.status_code, detail=detail)
+
         except httpx.RequestError as e:
             logger.error(f"Search error: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Search service error: {str(e)}")
@@ -229,20 +299,40 @@ async def fetch_and_store_financials(request: FinancialsRequest):
 
 ### SEARCH SQL DATA
 @app.get("/sql/search")
-async def search_sql(query: str):
+async def search_sql(query: str, format: str = "json"):
     """
     Handle SQL query requests, forward them to the storage service.
+    Arrow IPC responses (`format=arrow`) are passed through byte-for-byte.
     """
-    async with httpx.AsyncClient() as client:
+    async with httpx.AsyncClient(timeout=settings.SQL_PROXY_TIMEOUT_S) as client:
         try:
             # Send SQL query request to the storage service's /search/SQL endpoint
             logger.info(f"Sending SQL search request to storage service: {STORAGE_SERVICE_URL}/api/v1/search/sql")
             sql_response = await client.get(
-                f"{STORAGE_SERVICE_URL}/api/v1/search/sql", params={"query": query}
+                f"{STORAGE_SERVICE_URL}/api/v1/search/sql", params={"query": query, "format": format}
             )
             sql_response.raise_for_status()  # Raise an error for bad responses
+            if format == "arrow":
+                return Response(
+                    content=sql_response.content,
+                    media_type=sql_response.headers.get("content-type"),
+                    headers={"X-Row-Count": sql_response.headers.get("x-row-count", "")}
+                )
             return sql_response.json()  # Return the SQL query results as a JSON response
 
+        except httpx.HTTPStatusError as e:
+            # keep the storage service's status and structured detail (e.g. query_too_expensive)
+            try:
+                detail = e.response.json().get("detail", e.response.text)
+            except ValueError:
+                detail = e.response.text
+            logger.error(f"SQL search rejected by storage service: {detail}")
+            raise HTTPException(status_code=e.response.status_code, detail=detail)
+
+        except httpx.TimeoutException as e:
+            logger.error(f"SQL search timed out after {settings.SQL_PROXY_TIMEOUT_S} s: {str(e)}")
+            raise HTTPException(status_code=504, detail=f"Storage service did not answer within {settings.SQL_PROXY_TIMEOUT_S} s")
+
         except httpx.RequestError as e:
             logger.error(f"Search error: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Search service error: {str(e)}")
@@ -254,33 +344,124 @@ async def search_sql(query: str):
 
 
 
-@app.post("/analysis")
-async def get_financial_analysis(request: AnalysisRequest):
+### SQL SCHEMA CATALOG
+@app.get("/sql/catalog")
+async def get_sql_catalog(tables: str = ""):
     """
-    Forward financial analysis requests to the analysis service
+    Forward schema catalog requests to the storage service.
     """
-    async with httpx.AsyncClient() as client:
+    # a catalog rebuild counts and samples every table, so it gets the SQL timeout too
+    async with httpx.AsyncClient(timeout=settings.SQL_PROXY_TIMEOUT_S) as client:
         try:
-            logger.info(f"Sending request to analysis service: {ANALYSIS_SERVICE_URL}/api/v1/analysis")
-            logger.info(f"Analysis request payload: {request.model_dump()}")
-            
-            analysis_response = await client.post(
-                f"{ANALYSIS_SERVICE_URL}/api/v1/analysis",
-                json=request.model_dump(),
-                timeout=300.0  # Longer timeout as LLM processing might take time
+            catalog_response = await client.get(
+                f"{STORAGE_SERVICE_URL}/api/v1/catalog", params={"tables": tables}
             )
-            analysis_response.raise_for_status()
-            return analysis_response.json()
-            
+            catalog_response.raise_for_status()
+            return catalog_response.json()
+
+        except httpx.RequestError as e:
+            logger.error(f"Catalog error: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Catalog service error: {str(e)}")
+
+        except Exception as e:
+            logger.error(f"Unexpected error fetching catalog: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+
+
+
+### FINANCIAL ANALYSIS (BACKGROUND JOBS)
+async def forward_to_analysis(method: str, path: str, **kwargs) -> httpx.Response:
+    """Forward a short analysis-job request, keeping the analysis service's status and detail"""
+    async with httpx.AsyncClient() as client:
+        try:
+            response = await client.request(method, f"{ANALYSIS_SERVICE_URL}/api/v1{path}", timeout=30.0, **kwargs)
+            response.raise_for_status()
+            return response
+
+        except httpx.HTTPStatusError as e:
+            try:
+                detail = e.response.json().get("detail", e.response.text)
+            except ValueError:
+                detail = e.response.text
+            raise HTTPException(status_code=e.response.status_code, detail=detail)
         except httpx.RequestError as e:
             logger.error(f"Analysis service request error: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Analysis service request error: {str(e)}")
-        except httpx.HTTPError as e:
-            logger.error(f"Analysis service HTTP error: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Analysis service error: {str(e)}")
-        except Exception as e:
-            logger.error(f"Unexpected error with analysis service: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Analysis service error: {str(e)}")
+
+
+@app.post("/analysis", status_code=202)
+async def start_financial_analysis(request: AnalysisRequest):
+    """
+    Start a financial analysis; returns a job id right away.
+    Follow progress at /analysis/{job_id}/events (Server-Sent Events) or poll /analysis/{job_id}.
+    """
+    logger.info(f"Starting analysis job: {request.model_dump()}")
+    job = (await forward_to_analysis("POST", "/analysis", json=request.model_dump())).json()
+    job["status_url"] = f"/analysis/{job['job_id']}"
+    job["events_url"] = f"/analysis/{job['job_id']}/events"
+    return job
+
+
+@app.get("/analysis/{job_id}")
+async def get_financial_analysis(job_id: str):
+    """Status of an analysis job, with its result once completed"""
+    return (await forward_to_analysis("GET", f"/analysis/{job_id}")).json()
+
+
+@app.delete("/analysis/{job_id}")
+async def cancel_financial_analysis(job_id: str):
+    return (await forward_to_analysis("DELETE", f"/analysis/{job_id}")).json()
+
+
+@app.get("/analysis/{job_id}/figures/{name}")
+async def get_analysis_figure(job_id: str, name: str):
+    response = await forward_to_analysis("GET", f"/analysis/{job_id}/figures/{name}")
+    return Response(content=response.content, media_type=response.headers.get("content-type"))
+
+
+@app.get("/analysis/{job_id}/events")
+async def stream_analysis_events(job_id: str, last_event_id: Optional[str] = Header(None)):
+    """
+    Relay an analysis job's Server-Sent Events as they arrive, chunk by chunk without buffering.
+    There is no read timeout: the analysis service sends keep-alives while the run is quiet.
+    Disconnecting only stops the relay, not the analysis; reconnect with Last-Event-ID to resume.
+    """
+    client = httpx.AsyncClient(timeout=httpx.Timeout(10.0, read=None))
+    headers = {"Last-Event-ID": last_event_id} if last_event_id else {}
+    try:
+        upstream = await client.send(
+            client.build_request("GET", f"{ANALYSIS_SERVICE_URL}/api/v1/analysis/{job_id}/events", headers=headers),
+            stream=True,
+        )
+    except httpx.RequestError as e:
+        await client.aclose()
+        logger.error(f"Analysis service request error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Analysis service request error: {str(e)}")
+
+    if upstream.status_code != 200:
+        body = await upstream.aread()
+        await upstream.aclose()
+        await client.aclose()
+        try:
+            detail = json.loads(body).get("detail", body.decode())
+        except ValueError:
+            detail = body.decode()
+        raise HTTPException(status_code=upstream.status_code, detail=detail)
+
+    async def relay():
+        try:
+            async for chunk in upstream.aiter_raw():
+                yield chunk
+        finally:
+            await upstream.aclose()
+            await client.aclose()
+
+    return StreamingResponse(
+        relay(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
         
 
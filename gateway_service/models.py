@@ -15,5 +15,22 @@ class FinancialsRequest(BaseModel):
     tickers: List[str]
     years_back: Optional[int] = 5
 
+class NewsSearchQuery(BaseModel):
+    query: str
+    top_k: int = 5
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    days: Optional[int] = None
+    sources: str = ""
+    min_sentiment: Optional[float] = None
+    max_sentiment: Optional[float] = None
+    ticker: Optional[str] = None
+
+class NewsBatchSearchRequest(BaseModel):
+    queries: List[NewsSearchQuery]
+    mode: Optional[str] = None
+    vector_weight: Optional[float] = None
+    keyword_weight: Optional[float] = None
+
 class AnalysisRequest(BaseModel):
     query: str
\ No newline at end of file
@@ -0,0 +1,36 @@
+# storage_service/api/formats.py
+import json
+from typing import Any, List, Sequence
+
+import pyarrow as pa
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def _to_arrow_column(values: List[Any]) -> pa.Array:
+    """Build an Arrow array for one result column. JSON columns (e.g. statement `data`)
+    and anything Arrow can't infer a single type for are kept as JSON text."""
+    if not any(isinstance(v, (dict, list)) for v in values):
+        try:
+            return pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            pass
+    return pa.array(
+        [None if v is None else json.dumps(v, default=str) for v in values],
+        type=pa.string(),
+    )
+
+
+def rows_to_arrow_table(columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> pa.Table:
+    """Turn SQLAlchemy result rows into a columnar Arrow table"""
+    columns = list(columns)
+    arrays = [_to_arrow_column([row[i] for row in rows]) for i in range(len(columns))]
+    return pa.Table.from_arrays(arrays, names=columns)
+
+
+def arrow_table_to_ipc(table: pa.Table) -> bytes:
+    """Serialise an Arrow table to the IPC stream format"""
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,38 @@
+# storage_service/api/index_proxy.py
+# API worker processes: news vector routes are forwarded to the index-owner process
+import logging
+import httpx
+from fastapi import APIRouter, HTTPException, Request, Response
+from database.index_client import index_client
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1")
+
+FORWARDED_HEADERS = ("content-type", "accept")
+
+
+async def forward_to_index_owner(request: Request):
+    """Same method, path, query and body; the owner's status code and payload are passed back as-is"""
+    try:
+        response = await index_client.forward(
+            request.method,
+            request.url.path,
+            params=list(request.query_params.multi_items()),
+            content=await request.body(),
+            headers={k: v for k, v in request.headers.items() if k in FORWARDED_HEADERS},
+        )
+    except httpx.HTTPError as e:
+        logger.error(f"Index owner request failed: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"News index unavailable: {str(e)}")
+    return Response(
+        content=response.content,
+        status_code=response.status_code,
+        media_type=response.headers.get("content-type"),
+    )
+
+
+# registered after api.routes, so /store/news and the MongoDB/Postgres-only news routes stay local
+for path in ("/search/news", "/search/news/{rest:path}", "/store/news/{rest:path}"):
+    router.add_api_route(path, forward_to_index_owner, methods=["GET", "POST"], include_in_schema=False)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 class StockData(BaseModel):
     data: List[Dict[str, Any]]
@@ -11,4 +11,21 @@ class NewsData(BaseModel):
 
 class FinancialData(BaseModel):
     data: List[Dict[str, Any]]
-    metadata: Dict[str, Any]
\ No newline at end of file
+    metadata: Dict[str, Any]
+
+class NewsSearchQuery(BaseModel):
+    query: str
+    top_k: int = 5
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    days: Optional[int] = None
+    sources: str = ""
+    min_sentiment: Optional[float] = None
+    max_sentiment: Optional[float] = None
+    ticker: Optional[str] = None
+
+class NewsBatchSearch(BaseModel):
+    queries: List[NewsSearchQuery]
+    mode: Optional[str] = None
+    vector_weight: Optional[float] = None
+    keyword_weight: Optional[float] = None
\ No newline at end of file
@@ -0,0 +1,233 @@
+# storage_service/api/news_routes.py
+# news vector index routes: served by the process that owns the index (see serve.py)
+import time
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, HTTPException
+from llama_index.core import Document
+from .models import NewsSearchQuery, NewsBatchSearch
+from database.reindex import reindexer
+from database.index_manager import index_manager
+from database.embedding_queue import embedding_worker
+from database.news_filters import build_news_filters, public_metadata
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1")
+
+
+
+### QUEUE DOCUMENTS FOR EMBEDDING ON BEHALF OF API WORKER PROCESSES
+@router.post("/internal/news/enqueue")
+async def enqueue_news_documents(documents: List[Dict[str, Any]]):
+    queued, already_indexed = await embedding_worker.enqueue_new([Document.from_dict(d) for d in documents])
+    return {"queued": queued, "already_indexed": already_indexed}
+
+
+### WITHDRAW REPLACED ARTICLES FROM THE QUEUE AND THE INDEX ON BEHALF OF API WORKER PROCESSES
+@router.post("/internal/news/remove")
+async def remove_news_documents(doc_ids: List[str]):
+    return {"removed": await embedding_worker.remove_documents(doc_ids)}
+
+
+
+### NEWS INDEXING PROGRESS: QUEUE DEPTH, INDEXING LAG, FAILURES
+@router.get("/store/news/status")
+async def store_news_status():
+    return {
+        "queue": embedding_worker.summary(),
+        "embedding_cache": index_manager.embed_model.cache.summary(),
+        "quantized_index": index_manager.quantized.summary() if index_manager.quantized else None,
+    }
+
+
+### RE-QUEUE DOCUMENTS THAT EXHAUSTED THEIR RETRIES
+@router.post("/store/news/retry-failed")
+async def store_news_retry_failed():
+    requeued = embedding_worker.queue.retry_failed()
+    embedding_worker.wake()
+    return {"requeued": requeued}
+
+
+
+
+### REBUILD THE NEWS VECTOR INDEX FROM MONGODB (NEW EMBEDDING MODEL / DAMAGED COLLECTIONS)
+@router.post("/store/news/reindex")
+async def start_news_reindex(model: Optional[str] = None, batch_size: Optional[int] = None, workers: Optional[int] = None):
+    """Rebuild into a new generation of collections; searches use the live one until it switches over"""
+    try:
+        return {"started": reindexer.start(model, batch_size, workers)}
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post("/store/news/reindex/resume")
+async def resume_news_reindex(generation: Optional[str] = None, batch_size: Optional[int] = None,
+                              workers: Optional[int] = None):
+    try:
+        run = reindexer.resume(generation, batch_size, workers)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if run is None:
+        raise HTTPException(status_code=404, detail="No unfinished reindex to resume")
+    return {"resumed": run}
+
+
+@router.get("/store/news/reindex")
+async def news_reindex_status():
+    return await reindexer.summary()
+
+
+@router.post("/store/news/reindex/drop")
+async def drop_news_generation(generation: str):
+    """Delete a generation of collections that is no longer live ("" is the original one)"""
+    try:
+        return {"dropped": await index_manager.drop_generation(generation)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+
+### NEWS VECTOR PARTITIONS (ONE CHROMA COLLECTION PER MONTH, OPTIONALLY PER TICKER)
+@router.get("/store/news/partitions")
+async def news_partitions():
+    return {"partitions": index_manager.partitions_summary()}
+
+
+@router.post("/store/news/partitions/compact")
+async def compact_news_partitions(before: str):
+    """Merge monthly partitions ending before `before` (YYYY-MM) into yearly partitions"""
+    try:
+        datetime.strptime(before, "%Y-%m")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="before must be YYYY-MM.")
+    try:
+        return {"compacted": await index_manager.compact(before)}
+    except Exception as e:
+        logger.error(f"Error compacting news partitions: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/store/news/partitions/unload")
+async def unload_news_partitions(names: str):
+    """Release comma-separated partitions from memory; they are reopened when next searched"""
+    return {"unloaded": await index_manager.unload([n.strip() for n in names.split(",") if n.strip()])}
+
+
+
+### QUERY-EMBEDDING CACHE STATS (HIT RATE, SIZE, EVICTIONS)
+@router.get("/search/news/cache")
+async def news_query_cache_stats():
+    embedding_cache = index_manager.embed_model.query_cache
+    return embedding_cache.summary() if embedding_cache else {"enabled": False}
+
+
+
+### SEARCH NEWS VIA LLAMAINDEX RETRIEVERS
+@router.get("/search/news")
+async def search_news(
+    query: str,
+    top_k: int = 5,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    days: Optional[int] = None,
+    sources: str = "",
+    min_sentiment: Optional[float] = None,
+    max_sentiment: Optional[float] = None,
+    ticker: Optional[str] = None,
+    mode: Optional[str] = None,
+    vector_weight: Optional[float] = None,
+    keyword_weight: Optional[float] = None,
+):
+    """
+    Search over news. Optional filters are applied inside the vector store and keyword index,
+    so only articles in the window are scored:
+    `start_date`/`end_date` (YYYY-MM-DD or YYYYMMDDTHHMMSS), `days` (lookback from now),
+    `sources` (comma-separated), `min_sentiment`/`max_sentiment`, `ticker`.
+    `mode` is "vector", "keyword" or "hybrid" (default from settings); the weights tune the
+    reciprocal-rank fusion in hybrid mode.
+    """
+    search = NewsSearchQuery(
+        query=query, top_k=top_k, start_date=start_date, end_date=end_date, days=days, sources=sources,
+        min_sentiment=min_sentiment, max_sentiment=max_sentiment, ticker=ticker,
+    )
+    filters = _news_filters(search)
+    _check_mode(mode)
+
+    try:
+        hits, timings = await index_manager.search(
+            query, top_k, filters, mode=mode, vector_weight=vector_weight, keyword_weight=keyword_weight
+        )
+        
+        return {"results": _format_hits(hits), "timings_ms": timings}
+        
+    except Exception as e:
+        logger.error(f"Error searching news: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+
+### SEVERAL NEWS SEARCHES IN ONE CALL (ONE BATCHED EMBEDDING REQUEST, CONCURRENT RETRIEVALS)
+@router.post("/search/news/batch")
+async def search_news_batch(request: NewsBatchSearch):
+    """Takes the same per-query parameters as GET /search/news; results come back in query order"""
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="queries cannot be empty.")
+    _check_mode(request.mode)
+    searches = [(q.query, q.top_k, _news_filters(q)) for q in request.queries]
+
+    try:
+        started = time.perf_counter()
+        results, embed_ms = await index_manager.search_batch(
+            searches, mode=request.mode,
+            vector_weight=request.vector_weight, keyword_weight=request.keyword_weight,
+        )
+        return {
+            "results": [
+                {"query": q.query, "results": _format_hits(hits), "timings_ms": timings}
+                for q, (hits, timings) in zip(request.queries, results)
+            ],
+            "timings_ms": {
+                "embed_ms": embed_ms,
+                "total_ms": round((time.perf_counter() - started) * 1000, 2),
+            },
+        }
+
+    except Exception as e:
+        logger.error(f"Error in batch news search: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _news_filters(search: NewsSearchQuery):
+    try:
+        return build_news_filters(
+            start_date=search.start_date,
+            end_date=search.end_date,
+            days=search.days,
+            sources=[s.strip() for s in search.sources.split(",") if s.strip()],
+            min_sentiment=search.min_sentiment,
+            max_sentiment=search.max_sentiment,
+            ticker=search.ticker,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid filter: {str(e)}")
+
+
+def _check_mode(mode: Optional[str]):
+    if mode not in (None, "vector", "keyword", "hybrid"):
+        raise HTTPException(status_code=400, detail="mode must be 'vector', 'keyword' or 'hybrid'.")
+
+
+def _format_hits(hits):
+    return [
+        {
+            "text": hit["node"].text,
+            "metadata": public_metadata(hit["node"].metadata),
+            "score": hit["score"],
+            "vector_rank": hit["vector_rank"],
+            "keyword_rank": hit["keyword_rank"]
+        }
+        for hit in hits
+    ]
@@ -1,12 +1,11 @@
 # storage_service/api/routes.py
+import asyncio
 import logging
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from .models import StockData, NewsData, FinancialData
+from .formats import rows_to_arrow_table, arrow_table_to_ipc, ARROW_STREAM_MEDIA_TYPE
 from database.postgres import save_stocks, save_financials
-from database.mongodb_atlas import save_news
-from database.index_manager import IndexManager
-index_manager = IndexManager()
-from sqlalchemy import text as sql_text
+from database.mongodb_atlas import save_news, migrate_legacy_news, rebuild_news_sentiment
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -44,48 +43,132 @@ async def store_financials(data: FinancialData):
     
 
 
-from database.postgres import AsyncSessionLocal
+from database.postgres import AsyncSessionLocal, query_cache
+from database.sql_guard import run_guarded_query, QueryRejected
+from database.schema_catalog import schema_catalog
+from database.query_log import query_log
+import time
 
 
 
 ### SEARCH SQL DATABASE
 @router.get("/search/sql")
-async def search_sql(query: str):
+async def search_sql(query: str, format: str = "json"):
     """
     Handle SQL query and execute it against PostgreSQL.
+    Statements run read-only with a statement_timeout, after an EXPLAIN cost check.
+    `format=arrow` returns results as an Arrow IPC stream instead of JSON rows.
     """
     if not query.strip():
         raise HTTPException(status_code=400, detail="Query cannot be empty.")
+    if format not in ("json", "arrow"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'arrow'.")
     
     try:
+        # serve repeats from the result cache while the tables they read are unchanged
+        # (in a thread: a hit may come from the disk tier, a put may spill to it)
+        cached = await asyncio.to_thread(query_cache.get, query)
+        if cached is not None:
+            query_log.record(query, 0.0, len(cached.rows), cache_hit=True)
+            return _format_select(cached.columns, cached.rows, format, cache_hit=True)
+
         async with AsyncSessionLocal() as session:
-            sql_query = sql_text(query)
-            
-            # For SELECT queries
-            if query.strip().lower().startswith("select"):
-                result = await session.execute(sql_query)
-                rows = result.fetchall()
-                columns = result.keys()
-                
-                return {
-                    "results": [dict(r._mapping) for r in rows],
-                    "columns": list(columns),
-                    "row_count": len(rows),
-                    "query_type": "SELECT"
-                }
-            else:
-                await session.execute(sql_query)
-                await session.commit()
-                return {
-                    "message": "Statement executed successfully",
-                    "query_type": "DML/DDL"
-                }
-                
+            versions = query_cache.snapshot(query)
+            started = time.perf_counter()
+            rows, error = 0, None
+            try:
+                result = await run_guarded_query(session, query)
+                rows = len(result.rows)
+            except QueryRejected as e:
+                error = e.detail.get("error", "rejected")
+                raise
+            except Exception:
+                error = "error"
+                raise
+            finally:
+                # timed-out and failed statements are logged too: they are the slow ones
+                query_log.record(query, (time.perf_counter() - started) * 1000, rows, error=error)
+
+        # truncated results are never cached under the original query
+        if not result.downgraded:
+            await asyncio.to_thread(query_cache.put, query, result.columns, result.rows, versions)
+
+        return _format_select(result.columns, result.rows, format, notes=result.notes)
+
+    except QueryRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
         logger.error(f"Error executing SQL query: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error executing query: {str(e)}")
 
 
+def _format_select(columns, rows, format: str, cache_hit: bool = False, notes=None):
+    """Shape SELECT results as JSON rows or an Arrow IPC stream"""
+    notes = notes or []
+    if format == "arrow":
+        table = rows_to_arrow_table(columns, rows)
+        if notes:
+            # carried inside the stream so it survives the gateway pass-through
+            table = table.replace_schema_metadata({"notes": "\n".join(notes)})
+        return Response(
+            content=arrow_table_to_ipc(table),
+            media_type=ARROW_STREAM_MEDIA_TYPE,
+            headers={"X-Row-Count": str(len(rows)), "X-Cache": "HIT" if cache_hit else "MISS"}
+        )
+
+    return {
+        "results": [dict(zip(columns, row)) for row in rows],
+        "columns": columns,
+        "row_count": len(rows),
+        "query_type": "SELECT",
+        "cached": cache_hit,
+        "notes": notes
+    }
+
+
+
+### SCHEMA CATALOG (TABLES, COLUMNS, ROW COUNTS, TICKER DATE RANGES, SAMPLE ROWS)
+@router.get("/catalog")
+async def get_catalog(tables: str = ""):
+    """
+    Serve the precomputed schema catalog from memory; it is only rebuilt after a write.
+    `tables` optionally restricts the response to a comma-separated list of tables.
+    """
+    try:
+        table_names = [t.strip() for t in tables.split(",") if t.strip()]
+        return await schema_catalog.get(table_names)
+    except Exception as e:
+        logger.error(f"Error building schema catalog: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+
+### SLOW-QUERY LOG: FINGERPRINTS RANKED BY TOTAL TIME
+@router.get("/search/sql/workload")
+async def sql_workload(limit: int = 20, order_by: str = "total_ms"):
+    if order_by not in ("total_ms", "mean_ms", "max_ms", "calls", "slow_calls"):
+        raise HTTPException(status_code=400, detail="Unsupported order_by")
+    return {"fingerprints": query_log.top(limit, order_by)}
+
+
+
+### INDEX SUGGESTIONS FROM OBSERVED PREDICATES
+@router.get("/search/sql/index-advice")
+async def sql_index_advice():
+    try:
+        return {"suggestions": await query_log.suggest_indexes()}
+    except Exception as e:
+        logger.error(f"Error building index suggestions: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+
+### SQL RESULT CACHE STATS
+@router.get("/search/sql/cache")
+async def sql_cache_stats():
+    return query_cache.summary()
+
+
 
 ### STORE NEWS TO LOCAL DISK VIA CHROMADB VECTOR EMBEDDINGS
 @router.post("/store/news")
@@ -99,29 +182,21 @@ async def store_news(data: NewsData):
 
 
 
-### SEARCH NEWS VIA LLAMAINDEX RETRIEVERS
-@router.get("/search/news")
-async def search_news(query: str, top_k: int = 5):
+### FLATTEN NEWS STORED AS WHOLE RESPONSE WRAPPERS INTO ONE DOCUMENT PER ARTICLE
+@router.post("/store/news/migrate-legacy")
+async def store_news_migrate_legacy():
     try:
-        index = await index_manager.load_index()
-        if not index:
-            raise HTTPException(status_code=404, detail="News index not found")
-            
-        retriever = index.as_retriever(similarity_top_k = top_k)
-        
-        nodes = retriever.retrieve(query)
-        
-        return {
-            "results": [
-                {
-                    "text": node.node.text, 
-                    "metadata": node.node.metadata,  
-                    "score": node.score 
-                }
-                for node in nodes
-            ]
-        }
-        
+        return {"migrated": await migrate_legacy_news()}
     except Exception as e:
-        logger.error(f"Error searching news: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        logger.error(f"Error migrating legacy news: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+### RECOMPUTE THE news_sentiment_daily TABLE FROM THE STORED ARTICLES
+@router.post("/store/news/sentiment/rebuild")
+async def store_news_sentiment_rebuild():
+    try:
+        return {"articles_counted": await rebuild_news_sentiment()}
+    except Exception as e:
+        logger.error(f"Error rebuilding news sentiment: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,132 @@
+"""
+Recall@k and latency of the quantized vector mode against the float index.
+
+    python -m benchmarks.quantization --vectors 100000 --dim 1536 --k 10
+    python -m benchmarks.quantization --from-store /app/chroma_db      # vectors already indexed
+
+Ground truth is exact brute-force cosine search over float32 vectors. Rows compared:
+  float-hnsw      Chroma HNSW over the float vectors (what search uses without quantization)
+  int8/binary@R   quantized first pass, exact re-scoring of the best k*R candidates
+Queries are stored vectors plus Gaussian noise, so no embedding API calls are needed.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from database.quantized_index import QuantizedIndex
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Unit vectors around `clusters` topic centres, roughly like news embeddings"""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, n)] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def stored_vectors(chroma_dir: str) -> np.ndarray:
+    import chromadb
+
+    client = chromadb.PersistentClient(path=chroma_dir)
+    pages = []
+    for collection in client.list_collections():
+        collection = client.get_collection(getattr(collection, "name", collection))
+        offset = 0
+        while True:
+            page = collection.get(include=["embeddings"], limit=5000, offset=offset)
+            if not page["ids"]:
+                break
+            pages.append(np.asarray(page["embeddings"], dtype=np.float32))
+            offset += len(page["ids"])
+    return np.concatenate(pages)
+
+
+def percentiles(latencies_ms):
+    return {f"p{p}_ms": round(float(np.percentile(latencies_ms, p)), 3) for p in (50, 95, 99)}
+
+
+def run_quantized(vectors, queries, truth, k, mode, rescore, workdir):
+    directory = os.path.join(workdir, f"{mode}-{rescore}")
+    index = QuantizedIndex(directory, mode=mode, rescore_factor=rescore)
+    for start in range(0, len(vectors), 10000):
+        index.add((f"n{i}", vectors[i]) for i in range(start, min(start + 10000, len(vectors))))
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        found = index.search(query, k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(len(expected & {int(node_id[1:]) for node_id, _ in found}) / k)
+    return {
+        "index": f"{mode}@{rescore}",
+        f"recall@{k}": round(float(np.mean(recalls)), 4),
+        **percentiles(latencies),
+        "resident_bytes": index.memory_bytes(),
+    }
+
+
+def run_float_hnsw(vectors, queries, truth, k):
+    import chromadb
+
+    client = chromadb.EphemeralClient()
+    collection = client.create_collection("benchmark", metadata={"hnsw:space": "cosine"})
+    ids = [str(i) for i in range(len(vectors))]
+    for start in range(0, len(vectors), 5000):
+        collection.add(ids=ids[start:start + 5000], embeddings=vectors[start:start + 5000].tolist())
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(len(expected & {int(i) for i in result["ids"][0]}) / k)
+    return {
+        "index": "float-hnsw",
+        f"recall@{k}": round(float(np.mean(recalls)), 4),
+        **percentiles(latencies),
+        "resident_bytes": vectors.nbytes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--modes", default="int8,binary")
+    parser.add_argument("--rescore", default="4,10,20", help="re-scoring factors to compare")
+    parser.add_argument("--from-store", metavar="CHROMA_DIR", help="benchmark on vectors already indexed")
+    parser.add_argument("--skip-hnsw", action="store_true")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.from_store:
+        vectors = stored_vectors(args.from_store)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    else:
+        vectors = synthetic_vectors(args.vectors, args.dim, args.clusters, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    queries = vectors[rng.integers(0, len(vectors), args.queries)]
+    queries = queries + 0.05 * rng.normal(size=queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = [set(np.argpartition(-(vectors @ q), args.k)[:args.k].tolist()) for q in queries]
+
+    print(json.dumps({"vectors": len(vectors), "dim": vectors.shape[1], "queries": len(queries), "k": args.k}))
+    if not args.skip_hnsw:
+        print(json.dumps(run_float_hnsw(vectors, queries, truth, args.k)))
+    workdir = tempfile.mkdtemp(prefix="quantization-benchmark-")
+    try:
+        for mode in args.modes.split(","):
+            for rescore in (int(r) for r in args.rescore.split(",")):
+                print(json.dumps(run_quantized(vectors, queries, truth, args.k, mode, rescore, workdir)))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
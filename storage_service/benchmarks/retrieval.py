@@ -0,0 +1,291 @@
+"""
+News retrieval benchmark: grows a synthetic corpus through create_news_documents and
+IndexManager (the same path as POST /store/news) and measures /search/news at every size.
+
+    python -m benchmarks.retrieval --sizes 10000,100000 --output baseline.json
+    python -m benchmarks.retrieval --sizes 10000,100000,1000000 --compare baseline.json
+
+Embeddings come from a deterministic hashing model (benchmarks.synthetic_news), so runs are
+offline and two commits index exactly the same vectors. Every index file lives in a temp dir.
+Reported per corpus size:
+  ingest       articles/s and chunks/s, time split into create / embed / write
+  size         bytes on disk per store, process RSS, quantized first-pass RAM when enabled
+  latency      p50/p95/p99 of IndexManager.search per mode and top_k, unfiltered and with a
+               ticker + date filter
+  recall@k     vector mode vs exact brute-force cosine over the same embeddings (and filters)
+The output JSON records the commit and configuration; --compare prints relative changes.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+
+WORKDIR = tempfile.mkdtemp(prefix="retrieval-benchmark-")
+STORES = {
+    "NEWS_STORAGE_DIR": "storage",
+    "CHROMA_DIR": "chroma_db",
+    "EMBEDDING_CACHE_PATH": "storage/embedding_cache.sqlite",
+    "EMBEDDING_QUEUE_PATH": "storage/embedding_queue.sqlite",
+    "KEYWORD_INDEX_PATH": "storage/keyword_index.sqlite",
+    "QUANTIZED_INDEX_DIR": "quantized",
+}
+# settings are read at import time: point every store at the temp dir first
+for _name, _path in STORES.items():
+    os.environ[_name] = os.path.join(WORKDIR, _path)
+# query embeddings are not cached, so repeated queries measure retrieval rather than cache hits
+os.environ["QUERY_EMBEDDING_CACHE_ENABLED"] = "false"
+for _name in ("MONGODB_URI", "MONGODB_DB", "OPENAI_API_KEY", "POSTGRES_URI"):
+    os.environ.setdefault(_name, "unused-by-benchmark")
+
+import numpy as np  # noqa: E402
+
+from api.models import NewsData  # noqa: E402
+from config.settings import settings  # noqa: E402
+from database.embedding_cache import CachedEmbedding, EmbeddingCache  # noqa: E402
+from database.index_manager import index_manager  # noqa: E402
+from database.mongodb_atlas import create_news_documents  # noqa: E402
+from database.news_filters import build_news_filters  # noqa: E402
+from database.news_partitions import filter_window  # noqa: E402
+from .synthetic_news import HashingEmbedding, news_batches, sample_queries  # noqa: E402
+
+MODES = ("vector", "keyword", "hybrid")
+# filtered variant: one ticker over the last six months of the synthetic corpus
+FILTER_WINDOW = ("2024-07-01", "2024-12-31")
+
+
+class Corpus:
+    """Every indexed chunk's embedding and filterable metadata, for brute-force ground truth"""
+
+    def __init__(self):
+        self.ids, self.published, self.tickers = [], [], []
+        self._vectors = []
+        self.vectors = None
+
+    def add(self, nodes):
+        for node in nodes:
+            self.ids.append(node.node_id)
+            self.published.append(node.metadata.get("published_at", 0))
+            self.tickers.append(node.metadata.get("tickers", ""))
+            self._vectors.append(np.asarray(node.embedding, dtype=np.float32))
+
+    def freeze(self):
+        if self._vectors:
+            added = np.stack(self._vectors)
+            self.vectors = added if self.vectors is None else np.concatenate([self.vectors, added])
+            self._vectors = []
+        return self
+
+    def mask(self, filters):
+        """Rows matching the benchmark's filters (date window + ticker)"""
+        start, end, ticker = filter_window(filters)
+        published = np.asarray(self.published)
+        keep = np.ones(len(self.ids), dtype=bool)
+        if start is not None:
+            keep &= published >= start
+        if end is not None:
+            keep &= published < end
+        if ticker:
+            keep &= np.array([ticker in t.split(",") for t in self.tickers])
+        return keep
+
+    def exact(self, query, k, mask=None):
+        scores = self.vectors @ query
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+        k = min(k, int(np.isfinite(scores).sum()))
+        best = np.argpartition(-scores, k - 1)[:k] if k else []
+        return {self.ids[i] for i in best}
+
+
+def directory_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def percentiles(latencies_ms):
+    return {f"p{p}_ms": round(float(np.percentile(latencies_ms, p)), 3) for p in (50, 95, 99)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def ingest(corpus, start, total, batch_size, seed):
+    timings = {"create_s": 0.0, "embed_s": 0.0, "write_s": 0.0}
+    articles = chunks = 0
+    for batch in news_batches(total, batch_size, seed=seed, start=start):
+        # create_news_documents / save_atlas_index log every payload; keep the console readable
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            started = time.perf_counter()
+            documents = await create_news_documents(NewsData(data=batch, metadata={}))
+            created = time.perf_counter()
+            nodes = await index_manager.embed_documents(documents)
+            embedded = time.perf_counter()
+            await index_manager.save_atlas_index(documents, nodes)
+            written = time.perf_counter()
+        timings["create_s"] += created - started
+        timings["embed_s"] += embedded - created
+        timings["write_s"] += written - embedded
+        articles += len(documents)
+        chunks += len(nodes)
+        corpus.add(nodes)
+    elapsed = sum(timings.values())
+    return {
+        "articles": articles,
+        "chunks": chunks,
+        **{name: round(value, 3) for name, value in timings.items()},
+        "articles_per_s": round(articles / elapsed, 1) if elapsed else None,
+        "chunks_per_s": round(chunks / elapsed, 1) if elapsed else None,
+    }
+
+
+async def measure(corpus, queries, top_ks, rounds):
+    embed_model = index_manager.embed_model
+    embeddings = {q["query"]: np.asarray(embed_model.get_query_embedding(q["query"]), dtype=np.float32)
+                  for q in queries}
+    results = []
+    for filtered in (False, True):
+        for mode in MODES:
+            for top_k in top_ks:
+                latencies, recalls = [], []
+                for _ in range(rounds):
+                    for q in queries:
+                        filters = build_news_filters(*FILTER_WINDOW, ticker=q["ticker"]) if filtered else None
+                        started = time.perf_counter()
+                        hits, _ = await index_manager.search(q["query"], top_k, filters, mode=mode)
+                        latencies.append((time.perf_counter() - started) * 1000)
+                        if mode == "vector":
+                            mask = corpus.mask(filters) if filtered else None
+                            expected = corpus.exact(embeddings[q["query"]], top_k, mask)
+                            found = {hit["node"].node_id for hit in hits}
+                            recalls.append(len(expected & found) / len(expected) if expected else 1.0)
+                row = {"mode": mode, "top_k": top_k, "filtered": filtered, **percentiles(latencies)}
+                if recalls:
+                    row["recall"] = round(float(np.mean(recalls)), 4)
+                results.append(row)
+    return results
+
+
+def sizes_report():
+    report = {name: directory_bytes(os.environ[name]) if os.path.isdir(os.environ[name])
+              else os.path.getsize(os.environ[name]) if os.path.exists(os.environ[name]) else 0
+              for name in STORES if name != "NEWS_STORAGE_DIR"}
+    report["total_disk_bytes"] = directory_bytes(WORKDIR)
+    report["rss_bytes"] = rss_bytes()
+    if index_manager.quantized is not None:
+        report["quantized_first_pass_bytes"] = index_manager.quantized.memory_bytes()
+    return report
+
+
+async def run(args):
+    index_manager.embed_model = CachedEmbedding(
+        HashingEmbedding(dim=args.dim), EmbeddingCache(os.environ["EMBEDDING_CACHE_PATH"])
+    )
+    await index_manager.warm()
+    queries = sample_queries(args.queries, seed=args.seed)
+    top_ks = [int(k) for k in args.top_k.split(",")]
+    corpus = Corpus()
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {
+            "dim": args.dim, "seed": args.seed, "queries": args.queries, "rounds": args.rounds,
+            "batch_size": args.batch_size, "filter_window": FILTER_WINDOW,
+            "VECTOR_QUANTIZATION": settings.VECTOR_QUANTIZATION,
+            "NEWS_PARTITION_BY_TICKER": settings.NEWS_PARTITION_BY_TICKER,
+            "HYBRID_CANDIDATES": settings.HYBRID_CANDIDATES,
+            "HYBRID_RRF_K": settings.HYBRID_RRF_K,
+        },
+        "results": [],
+    }
+    indexed = 0
+    for size in sorted(int(s) for s in args.sizes.split(",")):
+        # corpora grow cumulatively: each size adds the next articles to the same index
+        ingest_report = await ingest(corpus, indexed, size, args.batch_size, args.seed)
+        indexed = size
+        corpus.freeze()
+        result = {
+            "size": size,
+            "ingest": ingest_report,
+            "partitions": len(index_manager._known),
+            "storage": sizes_report(),
+            "search": await measure(corpus, queries, top_ks, args.rounds),
+        }
+        print(json.dumps(result))
+        report["results"].append(result)
+    return report
+
+
+def _numbers(value, prefix=""):
+    """Flatten a result into {path: number}; search rows are keyed by mode/top_k/filtered"""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _numbers(item, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, list):
+        for row in value:
+            key = f"{row['mode']}@{row['top_k']}" + ("+filtered" if row["filtered"] else "")
+            metrics = {k: v for k, v in row.items() if k not in ("mode", "top_k", "filtered")}
+            yield from _numbers(metrics, f"{prefix}.{key}")
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, value
+
+
+def compare(report, baseline):
+    before = {r["size"]: dict(_numbers(r)) for r in baseline["results"]}
+    print(f"\ncompared with {baseline.get('commit')} (now {report.get('commit')})")
+    for result in report["results"]:
+        old = before.get(result["size"])
+        if old is None:
+            continue
+        for path, value in _numbers(result):
+            if path in old and old[path] and path != "size":
+                print(f"{result['size']:>9} {path:<48} {old[path]:>14} -> {value:<14} {100 * (value - old[path]) / old[path]:+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000", help="cumulative corpus sizes in articles")
+    parser.add_argument("--batch-size", type=int, default=1000, help="articles per save_atlas_index call")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--top-k", default="5,10,50")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the full report as JSON")
+    parser.add_argument("--compare", metavar="BASELINE_JSON", help="print changes against an earlier report")
+    parser.add_argument("--keep", action="store_true", help=f"keep the index files in {WORKDIR}")
+    args = parser.parse_args()
+
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        if not args.keep:
+            shutil.rmtree(WORKDIR, ignore_errors=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
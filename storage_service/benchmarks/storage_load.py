@@ -0,0 +1,151 @@
+"""
+Throughput of the storage service against its worker count.
+
+    python -m benchmarks.storage_load --workers 1,2,4,8 --mix mixed --duration 30
+
+For every worker count, serve.py is started on a spare port (an index-owner process plus N API
+workers; N=1 is the plain single process) and loaded by --clients processes, each running
+--concurrency requests at a time for --duration seconds after a short warm-up. Requests:
+  sql     GET /api/v1/search/sql, per-ticker aggregates over stock_prices
+  news    GET /api/v1/search/news, synthetic agent-style queries (served by the index owner)
+  mixed   three SQL requests for every news request
+SQL texts carry a varying LIMIT, so only --distinct-sql of them repeat and the result cache
+hit rate stays realistic. The service uses the databases and index configured in the
+environment (.env); it is not reset between runs.
+Prints one JSON line per worker count: requests/s, p50/p95/p99, errors and speedup vs the first.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+from .synthetic_news import COMPANIES, sample_queries
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def requests_for(mix: str, distinct_sql: int, seed: int):
+    """Endless (path, params) stream for one client process"""
+    rng = random.Random(seed)
+    queries = sample_queries(200, seed=seed)
+    tickers = list(COMPANIES)
+    while True:
+        if mix == "news" or (mix == "mixed" and rng.random() < 0.25):
+            q = rng.choice(queries)
+            yield "/api/v1/search/news", {"query": q["query"], "top_k": 10}
+        else:
+            limit = 20 + rng.randrange(distinct_sql)
+            yield "/api/v1/search/sql", {
+                "query": "SELECT ticker, date_trunc('month', date) AS month, avg(close) AS close, "
+                         "sum(volume) AS volume FROM stock_prices "
+                         f"WHERE ticker = '{rng.choice(tickers)}' GROUP BY 1, 2 ORDER BY 2 DESC LIMIT {limit}"
+            }
+
+
+async def load(base_url: str, mix: str, distinct_sql: int, concurrency: int, warmup: float, duration: float, seed: int):
+    stream = requests_for(mix, distinct_sql, seed)
+    latencies, errors = [], 0
+    started = time.monotonic()
+    measure_from, stop_at = started + warmup, started + warmup + duration
+
+    async def user(client):
+        nonlocal errors
+        while (now := time.monotonic()) < stop_at:
+            path, params = next(stream)
+            try:
+                response = await client.get(path, params=params)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            if now >= measure_from:
+                errors += failed
+                latencies.append((time.monotonic() - now) * 1000)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        await asyncio.gather(*[user(client) for _ in range(concurrency)])
+    return latencies, errors
+
+
+def client_process(args):
+    return asyncio.run(load(*args))
+
+
+def start_service(workers: int, port: int, owner_port: int, timeout_s: float) -> subprocess.Popen:
+    service = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--host", "127.0.0.1",
+         "--port", str(port), "--owner-port", str(owner_port)],
+        cwd=SERVICE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if service.poll() is not None:
+            raise SystemExit(f"serve.py --workers {workers} exited with code {service.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=2).status_code == 200:
+                return service
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    service.terminate()
+    raise SystemExit(f"serve.py --workers {workers} did not become healthy within {timeout_s:.0f}s")
+
+
+def run(workers: int, args) -> dict:
+    port = free_port()
+    service = start_service(workers, port, free_port(), args.startup_timeout)
+    try:
+        jobs = [(f"http://127.0.0.1:{port}", args.mix, args.distinct_sql, args.concurrency,
+                 args.warmup, args.duration, args.seed + i) for i in range(args.clients)]
+        with multiprocessing.Pool(args.clients) as pool:
+            outcomes = pool.map(client_process, jobs)
+    finally:
+        service.terminate()
+        service.wait(timeout=60)
+    latencies = np.concatenate([np.asarray(l, dtype=np.float64) for l, _ in outcomes])
+    errors = sum(e for _, e in outcomes)
+    result = {"workers": workers, "mix": args.mix, "requests": int(latencies.size), "errors": errors,
+              "rps": round(latencies.size / args.duration, 1)}
+    if latencies.size:
+        result.update({f"p{p}_ms": round(float(np.percentile(latencies, p)), 2) for p in (50, 95, 99)})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="worker counts to compare")
+    parser.add_argument("--mix", choices=("sql", "news", "mixed"), default="mixed")
+    parser.add_argument("--clients", type=int, default=4, help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight per client")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds per worker count")
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--distinct-sql", type=int, default=500, help="distinct SQL texts per ticker")
+    parser.add_argument("--startup-timeout", type=float, default=600.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    baseline = None
+    for workers in [int(w) for w in args.workers.split(",")]:
+        result = run(workers, args)
+        baseline = baseline or result["rps"]
+        result["speedup"] = round(result["rps"] / baseline, 2) if baseline else None
+        print(json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Deterministic synthetic Alpha Vantage-style news feeds and an offline embedding model,
+so the retrieval benchmark runs without network access and gives the same corpus every time.
+"""
+import hashlib
+import random
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+COMPANIES = {
+    "AAPL": "Apple", "MSFT": "Microsoft", "NVDA": "Nvidia", "AMZN": "Amazon", "GOOGL": "Alphabet",
+    "META": "Meta", "TSLA": "Tesla", "JPM": "JPMorgan", "XOM": "Exxon Mobil", "UNH": "UnitedHealth",
+    "V": "Visa", "WMT": "Walmart", "PFE": "Pfizer", "KO": "Coca-Cola", "DIS": "Disney",
+    "INTC": "Intel", "AMD": "AMD", "NFLX": "Netflix", "BA": "Boeing", "CVX": "Chevron",
+}
+SOURCES = ["Reuters", "Benzinga", "Motley Fool", "Zacks Commentary", "CNBC", "Bloomberg", "MarketWatch", "Barrons"]
+TOPICS = {
+    "earnings": ["quarterly earnings", "revenue", "EPS", "guidance", "margin", "beat estimates", "missed estimates"],
+    "products": ["product launch", "new chip", "data center", "cloud", "AI model", "subscription", "streaming"],
+    "regulation": ["antitrust", "lawsuit", "SEC filing", "fine", "regulators", "probe", "settlement"],
+    "markets": ["shares", "stock price", "valuation", "analyst upgrade", "price target", "downgrade", "rally"],
+    "deals": ["acquisition", "merger", "partnership", "buyback", "dividend", "stake", "spin-off"],
+    "macro": ["interest rates", "inflation", "Fed", "tariffs", "supply chain", "consumer demand", "recession"],
+}
+SENTENCES = [
+    "{company} ({ticker}) reported {term} of ${amount} billion, {direction} {pct}% from a year earlier.",
+    "Analysts said the {term} news could weigh on {company} as {other} competes for {term2}.",
+    "{company} shares moved {pct}% after comments on {term} and {term2}.",
+    "The {term} outlook for {company} was {adjective}, according to {source}.",
+    "Investors are watching how {company} handles {term2} while {other} focuses on {term}.",
+    "{company} said {term} remained {adjective} and expects {term2} to improve next quarter.",
+]
+ADJECTIVES = ["strong", "weak", "mixed", "better than expected", "disappointing", "resilient", "uncertain"]
+
+
+def sentiment_label(score: float) -> str:
+    # Alpha Vantage NEWS_SENTIMENT thresholds
+    if score <= -0.35:
+        return "Bearish"
+    if score <= -0.15:
+        return "Somewhat-Bearish"
+    if score < 0.15:
+        return "Neutral"
+    if score < 0.35:
+        return "Somewhat-Bullish"
+    return "Bullish"
+
+
+def _article(rng: random.Random, index: int, now: datetime, months: int) -> Dict[str, Any]:
+    ticker = rng.choice(list(COMPANIES))
+    others = rng.sample([t for t in COMPANIES if t != ticker], k=rng.randint(0, 3))
+    topic = rng.choice(list(TOPICS))
+    terms = TOPICS[topic]
+    source = rng.choice(SOURCES)
+    score = max(-1.0, min(1.0, rng.gauss(0.1, 0.25)))
+    published = now - timedelta(seconds=rng.randint(0, months * 30 * 86400))
+    summary = " ".join(
+        rng.choice(SENTENCES).format(
+            company=COMPANIES[ticker],
+            ticker=ticker,
+            other=COMPANIES[others[0]] if others else "rivals",
+            term=rng.choice(terms),
+            term2=rng.choice(terms),
+            amount=round(rng.uniform(0.5, 120), 1),
+            pct=round(rng.uniform(0.1, 15), 1),
+            direction=rng.choice(["up", "down"]),
+            adjective=rng.choice(ADJECTIVES),
+            source=source,
+        )
+        for _ in range(rng.randint(2, 5))
+    )
+    return {
+        "title": f"{COMPANIES[ticker]} {rng.choice(terms)}: {rng.choice(ADJECTIVES)} {topic} update",
+        "url": f"https://news.example.com/{ticker.lower()}/{index}",
+        "time_published": published.strftime("%Y%m%dT%H%M%S"),
+        "summary": summary,
+        "source": source,
+        "topics": [{"topic": topic, "relevance_score": "0.9"}],
+        "overall_sentiment_score": round(score, 6),
+        "overall_sentiment_label": sentiment_label(score),
+        "ticker_sentiment": [
+            {"ticker": t, "relevance_score": str(round(rng.uniform(0.1, 1.0), 6)),
+             "ticker_sentiment_score": str(round(score + rng.gauss(0, 0.1), 6))}
+            for t in [ticker, *others]
+        ],
+    }
+
+
+def news_batches(total: int, batch_size: int, seed: int = 42, months: int = 24,
+                 start: int = 0) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Articles `start`..`total` as lists of ingestion-shaped wrappers ({query_type, value, feed}),
+    `batch_size` articles at a time. Article i is the same for a given seed whatever the batching.
+    """
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    for batch_start in range(start, total, batch_size):
+        feeds: Dict[str, List[Dict[str, Any]]] = {}
+        for i in range(batch_start, min(batch_start + batch_size, total)):
+            article = _article(random.Random(f"{seed}-{i}"), i, now, months)
+            feeds.setdefault(article["ticker_sentiment"][0]["ticker"], []).append(article)
+        yield [
+            {"query_type": "company", "value": ticker, "feed": feed, "timestamp": now.isoformat()}
+            for ticker, feed in feeds.items()
+        ]
+
+
+def sample_queries(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Search requests resembling the agents' news_search calls"""
+    rng = random.Random(f"queries-{seed}")
+    queries = []
+    for _ in range(count):
+        ticker = rng.choice(list(COMPANIES))
+        topic = rng.choice(list(TOPICS))
+        queries.append({
+            "query": f"{COMPANIES[ticker]} {rng.choice(TOPICS[topic])} {rng.choice(TOPICS[topic])}",
+            "ticker": ticker,
+        })
+    return queries
+
+
+
+###OFFLINE STAND-IN FOR THE OPENAI EMBEDDING MODEL (SIGNED FEATURE HASHING OF WORDS AND BIGRAMS)
+class HashingEmbedding(BaseEmbedding):
+    """
+    Deterministic bag-of-words embedding: every word and word bigram adds +/-1 to a hashed
+    dimension, and the result is L2-normalised. Texts sharing vocabulary land close together,
+    which is enough to exercise the index and measure recall; no network, no model weights.
+    """
+
+    _dim: int = PrivateAttr()
+
+    def __init__(self, dim: int = 256, **kwargs: Any):
+        super().__init__(model_name=f"hashing-{dim}", embed_batch_size=1000, **kwargs)
+        self._dim = dim
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "HashingEmbedding"
+
+    def _embed(self, text: str) -> Embedding:
+        vector = np.zeros(self._dim, dtype=np.float32)
+        words = re.findall(r"\w+", text.lower())
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self._dim] += 1.0 if (value >> 63) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._embed(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return [self._embed(text) for text in texts]
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._embed(query)
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return self._embed(query)
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return self._embed(text)
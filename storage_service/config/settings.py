@@ -8,10 +8,89 @@ class Settings(BaseSettings):
 
     MONGODB_URI: str  
     MONGODB_DB: str
+    MONGODB_NEWS_COLLECTION: str = "news_articles"  # one document per article, unique by URL
     OPENAI_API_KEY: str
 
     POSTGRES_URI: str
 
+    # multi-worker mode (serve.py): STORAGE_WORKERS API processes on PORT, plus one process on
+    # INDEX_OWNER_PORT that owns the news vector index. API workers get INDEX_OWNER_URL set and
+    # forward vector reads/writes to it; empty means this process owns the index itself.
+    STORAGE_WORKERS: int = 1
+    INDEX_OWNER_PORT: int = 8002
+    INDEX_OWNER_URL: str = ""
+    INDEX_OWNER_TIMEOUT_S: float = 120.0
+
+    # SQL result cache (invalidated per table on every write)
+    QUERY_CACHE_ENABLED: bool = True
+    QUERY_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    QUERY_CACHE_DISK_DIR: str = ""  # empty disables the on-disk tier
+    QUERY_CACHE_DISK_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+    # table write versions shared by all worker processes ("" keeps them per process)
+    QUERY_CACHE_VERSIONS_PATH: str = ""
+
+    # cost guard for agent-written SQL (planner estimates from EXPLAIN)
+    SQL_GUARD_ENABLED: bool = True
+    SQL_MAX_ESTIMATED_COST: float = 1_000_000.0
+    SQL_MAX_ESTIMATED_ROWS: int = 200_000
+    SQL_GUARD_ON_EXCESS_ROWS: str = "downgrade"  # "downgrade" adds a LIMIT, "reject" refuses the query
+    SQL_STATEMENT_TIMEOUT_MS: int = 30_000
+
+    # slow-query log / index advisor
+    SLOW_QUERY_MS: float = 1000.0
+    SLOW_QUERY_EXPLAIN_ANALYZE: bool = False  # sample EXPLAIN (ANALYZE, BUFFERS) for slow fingerprints
+    SLOW_QUERY_EXPLAIN_INTERVAL_S: int = 3600
+    SLOW_QUERY_MAX_FINGERPRINTS: int = 1000
+
+    # news index locations (docstore/index store SQLite file, Chroma collections)
+    NEWS_STORAGE_DIR: str = "/app/storage"
+    CHROMA_DIR: str = "/app/chroma_db"
+
+    # OpenAI embedding model for news; an existing index keeps its model until reindexed
+    EMBEDDING_MODEL: str = "text-embedding-ada-002"
+
+    # rebuilding the news index from MongoDB into a new generation of collections
+    REINDEX_STATE_PATH: str = "/app/storage/reindex.sqlite"
+    REINDEX_PAGE_SIZE: int = 500  # articles read from MongoDB per page (and checkpoint unit)
+    REINDEX_BATCH_SIZE: int = 256  # texts per embedding request
+    REINDEX_WORKERS: int = 4  # pages embedded concurrently
+
+    # persistent (model, text hash) -> vector cache for news indexing
+    EMBEDDING_CACHE_PATH: str = "/app/storage/embedding_cache.sqlite"
+
+    # LRU + TTL cache of search query embeddings ("" path keeps it in memory only)
+    QUERY_EMBEDDING_CACHE_ENABLED: bool = True
+    QUERY_EMBEDDING_CACHE_SIZE: int = 10_000
+    QUERY_EMBEDDING_CACHE_TTL_S: float = 7 * 24 * 3600
+    QUERY_EMBEDDING_CACHE_PATH: str = "/app/storage/query_embedding_cache.sqlite"
+
+    # background embedding queue drained by workers in the storage process
+    EMBEDDING_QUEUE_PATH: str = "/app/storage/embedding_queue.sqlite"
+    EMBEDDING_BATCH_SIZE: int = 64
+    EMBEDDING_WORKERS: int = 2
+    EMBEDDING_MAX_ATTEMPTS: int = 5
+    EMBEDDING_RETRY_BASE_S: float = 5.0  # retry delay doubles on every failed attempt
+    EMBEDDING_POLL_INTERVAL_S: float = 1.0
+
+    # news vector partitions: one Chroma collection per month, optionally per (month, ticker)
+    NEWS_PARTITION_BY_TICKER: bool = False
+    CHROMA_MEMORY_LIMIT_BYTES: int = 0  # > 0 enables Chroma's LRU unloading of idle partitions
+
+    # compact vector mode: "none", "int8" or "binary" first pass + exact re-scoring of
+    # top_k * QUANTIZED_RESCORE_FACTOR candidates against memory-mapped float32 vectors
+    VECTOR_QUANTIZATION: str = "none"
+    QUANTIZED_INDEX_DIR: str = "/app/storage/quantized"
+    QUANTIZED_RESCORE_FACTOR: int = 10
+
+    # news search: "vector", "keyword" (BM25) or "hybrid" (both, fused with reciprocal-rank fusion);
+    # vector by default, so `score` stays a cosine similarity unless a caller opts in with mode=
+    NEWS_SEARCH_MODE: str = "vector"
+    KEYWORD_INDEX_PATH: str = "/app/storage/keyword_index.sqlite"
+    HYBRID_VECTOR_WEIGHT: float = 1.0
+    HYBRID_KEYWORD_WEIGHT: float = 1.0
+    HYBRID_RRF_K: int = 60
+    HYBRID_CANDIDATES: int = 4  # each side retrieves top_k * this before fusion
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,281 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+
+###PERSISTENT (model, text_hash) -> VECTOR STORE IN A LOCAL SQLITE FILE
+class EmbeddingCache:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, Embedding]:
+        found: Dict[str, Embedding] = {}
+        with self._lock:
+            # stay well under SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk],
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = array("f", blob).tolist()
+        self.stats["hits"] += len(found)
+        self.stats["misses"] += len(set(hashes)) - len(found)
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, Embedding]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                [(model, h, array("f", vector).tobytes()) for h, vector in vectors.items()],
+            )
+            self._conn.commit()
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            count = self._conn.execute("SELECT count(*) FROM embeddings").fetchone()[0]
+        return {"path": self.path, "entries": count, **self.stats}
+
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+
+###BOUNDED LRU + TTL CACHE OF QUERY EMBEDDINGS, OPTIONALLY WRITTEN THROUGH TO SQLITE
+class QueryEmbeddingCache:
+    """
+    Keyed by (model, normalised query text). Entries expire `ttl_s` after they were embedded.
+    With a `path`, entries are also written to SQLite and the most recent live ones are loaded
+    back at startup, so a restart does not start cold.
+    """
+
+    def __init__(self, max_entries: int, ttl_s: float, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.path = path or None
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Embedding, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+        self._conn = None
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS query_embeddings (
+                    model TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (model, query)
+                ) WITHOUT ROWID
+                """
+            )
+            self._load()
+
+    def _load(self):
+        cutoff = time.time() - self.ttl_s
+        self._conn.execute("DELETE FROM query_embeddings WHERE created_at < ?", (cutoff,))
+        self._conn.commit()
+        rows = self._conn.execute(
+            "SELECT model, query, vector, created_at FROM query_embeddings ORDER BY created_at DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        for model, query, blob, created_at in reversed(rows):
+            self._entries[(model, query)] = (array("f", blob).tolist(), created_at)
+        logger.info(f"Loaded {len(rows)} query embeddings from {self.path}")
+
+    def get(self, model: str, query: str) -> Optional[Embedding]:
+        key = (model, normalize_query(query))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[1] > self.ttl_s:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[0]
+
+    def put(self, model: str, query: str, vector: Embedding):
+        key = (model, normalize_query(query))
+        created_at = time.time()
+        with self._lock:
+            self._entries[key] = (vector, created_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+                if self._conn is not None:
+                    self._conn.execute("DELETE FROM query_embeddings WHERE model = ? AND query = ?", evicted)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO query_embeddings (model, query, vector, created_at) VALUES (?, ?, ?, ?)",
+                    (*key, array("f", vector).tobytes(), created_at),
+                )
+                self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM query_embeddings")
+                self._conn.commit()
+
+    def summary(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "persisted_to": self.path,
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else None,
+        }
+
+
+
+###EMBEDDING MODEL WRAPPER THAT ONLY CALLS THE REAL MODEL FOR TEXTS IT HAS NEVER SEEN
+class CachedEmbedding(BaseEmbedding):
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+    _query_cache: Optional[QueryEmbeddingCache] = PrivateAttr()
+
+    def __init__(
+        self,
+        embed_model: BaseEmbedding,
+        cache: EmbeddingCache,
+        query_cache: Optional[QueryEmbeddingCache] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(
+            model_name=embed_model.model_name,
+            embed_batch_size=embed_model.embed_batch_size,
+            **kwargs,
+        )
+        self._embed_model = embed_model
+        self._cache = cache
+        self._query_cache = query_cache
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        return self._cache
+
+    @property
+    def query_cache(self) -> Optional[QueryEmbeddingCache]:
+        return self._query_cache
+
+    def _split(self, texts: List[str]):
+        hashes = [text_hash(t) for t in texts]
+        cached = self._cache.get_many(self.model_name, list(set(hashes)))
+        # embed each distinct unseen text once, even if it repeats within the batch
+        missing: Dict[str, str] = {}
+        for h, t in zip(hashes, texts):
+            if h not in cached:
+                missing.setdefault(h, t)
+        return hashes, cached, missing
+
+    def _merge(self, hashes, cached, missing, new_vectors) -> List[Embedding]:
+        fresh = dict(zip(missing.keys(), new_vectors))
+        if fresh:
+            self._cache.put_many(self.model_name, fresh)
+        return [cached.get(h) or fresh[h] for h in hashes]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        hashes, cached, missing = self._split(texts)
+        new_vectors = self._embed_model.get_text_embedding_batch(list(missing.values())) if missing else []
+        return self._merge(hashes, cached, missing, new_vectors)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        hashes, cached, missing = self._split(texts)
+        new_vectors = await self._embed_model.aget_text_embedding_batch(list(missing.values())) if missing else []
+        return self._merge(hashes, cached, missing, new_vectors)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        cached = self._query_cache.get(self.model_name, query) if self._query_cache else None
+        if cached is not None:
+            return cached
+        vector = self._embed_model.get_query_embedding(query)
+        if self._query_cache:
+            self._query_cache.put(self.model_name, query, vector)
+        return vector
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        cached = self._query_cache.get(self.model_name, query) if self._query_cache else None
+        if cached is not None:
+            return cached
+        vector = await self._embed_model.aget_query_embedding(query)
+        if self._query_cache:
+            self._query_cache.put(self.model_name, query, vector)
+        return vector
+
+    async def aget_query_embedding_batch(self, queries: List[str]) -> List[Embedding]:
+        """Embed several queries in one request. OpenAI embedding models use the same engine
+        for queries and documents, so the batched text endpoint is used for the cache misses."""
+        found = {}
+        if self._query_cache:
+            for query in queries:
+                vector = self._query_cache.get(self.model_name, query)
+                if vector is not None:
+                    found[query] = vector
+        missing = [query for query in dict.fromkeys(queries) if query not in found]
+        if missing:
+            vectors = await self._embed_model.aget_text_embedding_batch(missing)
+            for query, vector in zip(missing, vectors):
+                found[query] = vector
+                if self._query_cache:
+                    self._query_cache.put(self.model_name, query, vector)
+        return [found[query] for query in queries]
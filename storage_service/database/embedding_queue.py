@@ -0,0 +1,224 @@
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Tuple
+
+from llama_index.core import Document
+
+from config.settings import settings
+from .index_manager import index_manager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+IN_PROGRESS = "in_progress"
+FAILED = "failed"
+
+
+
+###DURABLE QUEUE OF DOCUMENTS WAITING TO BE EMBEDDED AND INDEXED
+class EmbeddingQueue:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS queue (
+                doc_id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                enqueued_at REAL NOT NULL,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_queue_status_due ON queue (status, next_attempt_at)")
+        # anything a crashed process had claimed goes back to pending
+        self._conn.execute("UPDATE queue SET status = ? WHERE status = ?", (PENDING, IN_PROGRESS))
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def enqueue(self, documents: List[Document]) -> int:
+        """
+        Add documents; ones already waiting (same content-hash id) are ignored, ones parked as
+        failed are given a fresh set of attempts, so re-sending an article retries it.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.executemany(
+                "INSERT INTO queue (doc_id, payload, status, enqueued_at, next_attempt_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(doc_id) DO UPDATE SET status = excluded.status, attempts = 0, "
+                "next_attempt_at = excluded.next_attempt_at, last_error = NULL "
+                f"WHERE queue.status = '{FAILED}'",
+                [(doc.get_doc_id(), doc.to_json(), PENDING, now, now) for doc in documents],
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def claim(self, batch_size: int) -> List[Tuple[str, Document]]:
+        """Atomically move up to `batch_size` due documents to in_progress"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT doc_id, payload FROM queue WHERE status = ? AND next_attempt_at <= ? "
+                "ORDER BY enqueued_at LIMIT ?",
+                (PENDING, time.time(), batch_size),
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE queue SET status = ? WHERE doc_id = ?", [(IN_PROGRESS, doc_id) for doc_id, _ in rows]
+            )
+            self._conn.commit()
+        return [(doc_id, Document.from_json(payload)) for doc_id, payload in rows]
+
+    def complete(self, doc_ids: List[str]) -> List[str]:
+        """Drop finished documents; returns the ones that were removed from the queue while in progress"""
+        with self._lock:
+            removed = [
+                doc_id for doc_id in doc_ids
+                if not self._conn.execute("DELETE FROM queue WHERE doc_id = ?", (doc_id,)).rowcount
+            ]
+            self._conn.commit()
+        return removed
+
+    def remove(self, doc_ids: List[str]) -> int:
+        """Withdraw documents whatever their status (their content was replaced before being indexed)"""
+        with self._lock:
+            cursor = self._conn.executemany("DELETE FROM queue WHERE doc_id = ?", [(doc_id,) for doc_id in doc_ids])
+            self._conn.commit()
+        return cursor.rowcount
+
+    def fail(self, doc_ids: List[str], error: str, max_attempts: int, retry_base_s: float):
+        """Schedule a retry with exponential backoff, or park as failed after `max_attempts`"""
+        now = time.time()
+        with self._lock:
+            for doc_id in doc_ids:
+                row = self._conn.execute("SELECT attempts FROM queue WHERE doc_id = ?", (doc_id,)).fetchone()
+                if row is None:
+                    continue  # removed while in progress
+                attempts = row[0] + 1
+                status = FAILED if attempts >= max_attempts else PENDING
+                self._conn.execute(
+                    "UPDATE queue SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE doc_id = ?",
+                    (status, attempts, now + retry_base_s * 2 ** (attempts - 1), error[:1000], doc_id),
+                )
+            self._conn.commit()
+
+    def retry_failed(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE queue SET status = ?, attempts = 0, next_attempt_at = ? WHERE status = ?",
+                (PENDING, time.time(), FAILED),
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, count(*) FROM queue GROUP BY status").fetchall())
+            oldest = self._conn.execute(
+                "SELECT min(enqueued_at) FROM queue WHERE status IN (?, ?)", (PENDING, IN_PROGRESS)
+            ).fetchone()[0]
+            last_error = self._conn.execute(
+                "SELECT last_error FROM queue WHERE last_error IS NOT NULL ORDER BY next_attempt_at DESC LIMIT 1"
+            ).fetchone()
+        return {
+            "pending": counts.get(PENDING, 0),
+            "in_progress": counts.get(IN_PROGRESS, 0),
+            "failed": counts.get(FAILED, 0),
+            "indexing_lag_seconds": round(time.time() - oldest, 1) if oldest else 0.0,
+            "last_error": last_error[0] if last_error else None,
+        }
+
+
+
+###WORKERS THAT DRAIN THE QUEUE: CONCURRENT BATCHED EMBEDDING, SERIALISED INDEX WRITES
+class EmbeddingWorker:
+    def __init__(self, queue: EmbeddingQueue):
+        self.queue = queue
+        self.batch_size = settings.EMBEDDING_BATCH_SIZE
+        self.concurrency = settings.EMBEDDING_WORKERS
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self.stats = {"indexed": 0, "batches": 0, "errors": 0, "last_batch_seconds": None}
+
+    def enqueue(self, documents: List[Document]) -> int:
+        queued = self.queue.enqueue(documents)
+        self.wake()
+        return queued
+
+    async def enqueue_new(self, documents: List[Document]) -> Tuple[int, int]:
+        """Queue the documents that are not indexed yet; returns (queued, already indexed)"""
+        new_documents = index_manager.filter_new_documents(documents)
+        queued = self.enqueue(new_documents) if new_documents else 0
+        return queued, len(documents) - len(new_documents)
+
+    async def remove_documents(self, doc_ids: List[str]) -> int:
+        """Withdraw documents from the queue and the index; returns keyword chunks removed"""
+        self.queue.remove(doc_ids)
+        return await index_manager.remove_documents(doc_ids)
+
+    def wake(self):
+        self._wakeup.set()
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run(i)) for i in range(self.concurrency)]
+            logger.info(f"Started {self.concurrency} embedding workers (batch size {self.batch_size})")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self, worker_id: int):
+        while True:
+            batch = self.queue.claim(self.batch_size)
+            if not batch:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=settings.EMBEDDING_POLL_INTERVAL_S)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._process(worker_id, batch)
+
+    async def _process(self, worker_id: int, batch: List[Tuple[str, Document]]):
+        doc_ids = [doc_id for doc_id, _ in batch]
+        documents = [doc for _, doc in batch]
+        started = time.perf_counter()
+        try:
+            await index_manager.save_atlas_index(documents)
+            removed = self.queue.complete(doc_ids)
+            if removed:
+                # withdrawn while this batch was embedding: it may have been written after the removal
+                await index_manager.remove_documents(removed)
+            self.stats["indexed"] += len(documents)
+            self.stats["batches"] += 1
+            self.stats["last_batch_seconds"] = round(time.perf_counter() - started, 2)
+            logger.info(f"Embedding worker {worker_id} indexed {len(documents)} documents")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Embedding worker {worker_id} failed on a batch of {len(documents)}: {str(e)}")
+            self.queue.fail(doc_ids, str(e), settings.EMBEDDING_MAX_ATTEMPTS, settings.EMBEDDING_RETRY_BASE_S)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            **self.queue.summary(),
+            "workers": len(self._tasks),
+            "batch_size": self.batch_size,
+            **self.stats,
+        }
+
+
+embedding_worker = EmbeddingWorker(EmbeddingQueue(settings.EMBEDDING_QUEUE_PATH))
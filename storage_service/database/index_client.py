@@ -0,0 +1,51 @@
+import logging
+from typing import List, Tuple
+
+import httpx
+from llama_index.core import Document
+
+from config.settings import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+
+###HTTP CLIENT FOR THE INDEX-OWNER PROCESS, USED BY API WORKER PROCESSES
+class IndexOwnerClient:
+    """
+    Vector reads and writes of an API worker go to the single process that owns Chroma and the
+    docstore; it serialises index writes and serves searches concurrently. One pooled client per worker.
+    """
+
+    def __init__(self, base_url: str, timeout_s: float):
+        self.base_url = base_url.rstrip("/")
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout_s,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+
+    async def enqueue_new(self, documents: List[Document]) -> Tuple[int, int]:
+        """Queue documents for embedding in the owner; returns (queued, already indexed)"""
+        response = await self._client.post(
+            "/api/v1/internal/news/enqueue", json=[doc.to_dict() for doc in documents]
+        )
+        response.raise_for_status()
+        body = response.json()
+        return body["queued"], body["already_indexed"]
+
+    async def remove_documents(self, doc_ids: List[str]) -> int:
+        """Withdraw documents from the owner's queue and index; returns keyword chunks removed"""
+        response = await self._client.post("/api/v1/internal/news/remove", json=list(doc_ids))
+        response.raise_for_status()
+        return response.json()["removed"]
+
+    async def forward(self, method: str, path: str, params, content: bytes, headers) -> httpx.Response:
+        return await self._client.request(method, path, params=params, content=content, headers=headers)
+
+    async def close(self):
+        await self._client.aclose()
+
+
+index_client = IndexOwnerClient(settings.INDEX_OWNER_URL, settings.INDEX_OWNER_TIMEOUT_S)
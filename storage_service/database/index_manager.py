@@ -1,4 +1,4 @@
-from llama_index.core import StorageContext, load_index_from_storage, VectorStoreIndex
+from llama_index.core import StorageContext, VectorStoreIndex
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.embeddings.openai import OpenAIEmbedding
 import chromadb
@@ -7,96 +7,628 @@ from sqlalchemy import make_url
 from llama_index.vector_stores.postgres import PGVectorStore
 from config.settings import settings
 from llama_index.core import Document
+from llama_index.core.ingestion import run_transformations
+from llama_index.core.schema import MetadataMode
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.storage.docstore.keyval_docstore import KVDocumentStore
+from llama_index.core.storage.index_store.keyval_index_store import KVIndexStore
+from .sqlite_kvstore import SQLiteKVStore
+from .embedding_cache import CachedEmbedding, EmbeddingCache, QueryEmbeddingCache
+from .keyword_index import KeywordIndex
+from .quantized_index import QuantizedIndex
+from .news_partitions import (
+    LEGACY_COLLECTION,
+    parse_partition,
+    partition_names,
+    plan_partitions,
+    yearly_name,
+)
+from llama_index.core.data_structs.data_structs import IndexDict
+from chromadb.config import Settings as ChromaSettings
+from collections import defaultdict
+from datetime import datetime, timezone
+from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
+from llama_index.core.vector_stores.utils import metadata_dict_to_node, node_to_metadata_dict
 import logging
-from llama_index.core.graph_stores import SimpleGraphStore
-import json
+import re
 import shutil
+import asyncio
+import time
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 
+# live index generation and its embedding model, stored in the kvstore
+INDEX_META_COLLECTION = "news_index_meta"
+LIVE_KEY = "live"
+# collections of a rebuilt generation are named "g<UTC timestamp>.<partition>"
+_GENERATION_COLLECTION = re.compile(r"^(g\d{14})\.(.+)$")
+
+
+def new_generation() -> str:
+    return datetime.now(timezone.utc).strftime("g%Y%m%d%H%M%S")
+
+
+def chunk_id(i: int, doc) -> str:
+    """Deterministic node ids (document content hash + chunk number), so re-inserting is idempotent"""
+    return f"{doc.id_}-{i}"
+
+
+
 ###CLASS TO TURN RAW DATA TO VECTOR EMBEDDINGS AND STORE THEM
 class IndexManager:
     def __init__(self):
         # paths to store 
-        self.persist_dir = "/app/storage"
-        self.chroma_dir = "/app/chroma_db"
-        self.chroma_client = chromadb.PersistentClient(path=self.chroma_dir)
+        self.persist_dir = settings.NEWS_STORAGE_DIR
+        self.chroma_dir = settings.CHROMA_DIR
+        # news vectors are partitioned into one Chroma collection per month (see news_partitions);
+        # the pre-partitioning collection (LEGACY_COLLECTION) is still searched until it is reindexed
+        self.partition_by_ticker = settings.NEWS_PARTITION_BY_TICKER
+        chroma_settings = ChromaSettings(anonymized_telemetry=False)
+        if settings.CHROMA_MEMORY_LIMIT_BYTES:
+            # let Chroma evict the HNSW segments of partitions that have not been queried recently
+            chroma_settings = ChromaSettings(
+                anonymized_telemetry=False,
+                chroma_segment_cache_policy="LRU",
+                chroma_memory_limit_bytes=settings.CHROMA_MEMORY_LIMIT_BYTES,
+            )
+        self.chroma_client = chromadb.PersistentClient(path=self.chroma_dir, settings=chroma_settings)
+        # embeddings are cached on disk by (model, text hash), so re-ingested articles cost nothing
+        # repeated search queries are answered from a bounded LRU/TTL cache of query embeddings
+        self.embedding_cache = EmbeddingCache(settings.EMBEDDING_CACHE_PATH)
+        self.query_embedding_cache = QueryEmbeddingCache(
+            max_entries=settings.QUERY_EMBEDDING_CACHE_SIZE,
+            ttl_s=settings.QUERY_EMBEDDING_CACHE_TTL_S,
+            path=settings.QUERY_EMBEDDING_CACHE_PATH,
+        ) if settings.QUERY_EMBEDDING_CACHE_ENABLED else None
+        self.transformations = [SentenceSplitter(id_func=chunk_id)]
 
-    async def save_atlas_index(self, documents):  
-        """Create and save index to disk"""
-        try:
-            index_dir = os.path.join(self.persist_dir)
-            os.makedirs(index_dir, exist_ok=True)
-
-            docstore_path = os.path.join(index_dir, "docstore.json")
-            if not os.path.exists(docstore_path) or os.path.getsize(docstore_path) == 0:
-                initial_json = {
-                    "docstore/docs": {},
-                    "docstore/ref_doc_info": {},
-                    "docstore/metadata": {}
-                }
-                with open(docstore_path, 'w') as f:
-                    json.dump(initial_json, f)
-            
-            print(f"Ensured index directory exists: {index_dir}")
-            
-            chroma_collection = self.chroma_client.get_or_create_collection("main_collection")
-            
-            vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-            
-            storage_context = StorageContext.from_defaults(
-                vector_store=vector_store,
-                persist_dir=index_dir
+        # docstore + index store as rows in one SQLite file, appended to transactionally
+        self.kvstore = SQLiteKVStore(os.path.join(self.persist_dir, "kvstore.sqlite"))
+        for name in ("docstore.json", "index_store.json"):
+            self.kvstore.import_json_store(os.path.join(self.persist_dir, name))
+        self.docstore = KVDocumentStore(self.kvstore)
+        self.index_store = KVIndexStore(self.kvstore)
+        # BM25 inverted index over the same chunks, for hybrid search
+        self.keyword_index = KeywordIndex(settings.KEYWORD_INDEX_PATH)
+
+        # the live generation of vector collections (see `reindex`); "" is the original, unprefixed one
+        live = self.kvstore.get(LIVE_KEY, collection=INDEX_META_COLLECTION) or {}
+        self.generation = live.get("generation", "")
+        self.model = live.get("model", settings.EMBEDDING_MODEL)
+        if self.model != settings.EMBEDDING_MODEL:
+            logger.warning(
+                f"News index was built with {self.model}, not EMBEDDING_MODEL={settings.EMBEDDING_MODEL}; "
+                f"it keeps using {self.model} until reindexed"
             )
-            
-            index = VectorStoreIndex.from_documents(
-                    documents,
-                    storage_context=storage_context,
-                    embed_model=OpenAIEmbedding(),
-                    show_progress=True
+        self.embed_model = self.embedding_model(self.model)
+        # optional compact first-pass vectors (int8 / binary) with exact re-scoring from disk;
+        # when enabled it answers vector searches instead of the Chroma partitions
+        self.quantized = self.quantized_index(self.generation)
+
+        # every partition on disk, and the warm, process-wide indexes of the ones opened so far;
+        # the set of indexes and retrievers is replaced as a whole after every write
+        self._known = set()
+        self._partitions = {}
+        self._retrievers = {}
+        self._write_lock = asyncio.Lock()
+
+    def embedding_model(self, model: str, batch_size: int = None) -> CachedEmbedding:
+        """`model` behind the shared text and query embedding caches (both are keyed by model)"""
+        kwargs = {"embed_batch_size": batch_size} if batch_size else {}
+        return CachedEmbedding(
+            OpenAIEmbedding(model=model, **kwargs), self.embedding_cache, self.query_embedding_cache
+        )
+
+    def quantized_index(self, generation: str):
+        if settings.VECTOR_QUANTIZATION == "none":
+            return None
+        return QuantizedIndex(
+            os.path.join(settings.QUANTIZED_INDEX_DIR, generation) if generation else settings.QUANTIZED_INDEX_DIR,
+            mode=settings.VECTOR_QUANTIZATION,
+            rescore_factor=settings.QUANTIZED_RESCORE_FACTOR,
+        )
+
+    def collection_name(self, partition: str, generation: str = None) -> str:
+        """Chroma collection of a partition in a generation (the live one by default)"""
+        generation = self.generation if generation is None else generation
+        return f"{generation}.{partition}" if generation else partition
+
+    def _vector_store(self, name: str, generation: str = None) -> ChromaVectorStore:
+        chroma_collection = self.chroma_client.get_or_create_collection(self.collection_name(name, generation))
+        return ChromaVectorStore(chroma_collection=chroma_collection)
+
+    def _publish(self, partitions):
+        """Atomically swap in a new set of partition indexes; readers holding the old ones finish on them"""
+        self._known |= set(partitions)
+        self._partitions, self._retrievers = partitions, {}
+
+    def _storage_context(self, name: str, generation: str = None) -> StorageContext:
+        return StorageContext.from_defaults(
+            vector_store=self._vector_store(name, generation),
+            docstore=self.docstore,
+            index_store=self.index_store,
+        )
+
+    def _open_partition(self, name: str, generation: str = None, embed_model=None):
+        """Index over one partition's collection; its index struct is stored under the collection name"""
+        index_id = self.collection_name(name, generation)
+        index_struct = self.index_store.get_index_struct(index_id)
+        if index_struct is None:
+            index_struct = IndexDict(index_id=index_id)
+            self.index_store.add_index_struct(index_struct)
+        return VectorStoreIndex(
+            index_struct=index_struct,
+            storage_context=self._storage_context(name, generation),
+            embed_model=embed_model or self.embed_model,
+            transformations=self.transformations,
+        )
+
+    def _collection_names(self, generation: str = None):
+        """Partitions of a generation (the live one by default) that exist in Chroma"""
+        generation = self.generation if generation is None else generation
+        names = []
+        for collection in self.chroma_client.list_collections():
+            # list_collections returns names in newer Chroma releases, Collection objects in older ones
+            name = getattr(collection, "name", collection)
+            match = _GENERATION_COLLECTION.match(name)
+            prefix, partition = match.groups() if match else ("", name)
+            if prefix == generation and parse_partition(partition) is not None:
+                names.append(partition)
+        return names
+
+    async def warm(self):
+        """Open every partition once, at startup. Chroma loads a partition's vectors on first query."""
+        self._known = set(self._collection_names())
+        with self.kvstore.transaction():
+            partitions = {name: self._open_partition(name) for name in self._known}
+        self._publish(partitions)
+        vectors = sum(index.storage_context.vector_store.client.count() for index in partitions.values())
+        keyword_chunks = self.keyword_index.count()
+        # with ticker sub-partitions a chunk can be stored more than once, so only backfill from scratch
+        if (keyword_chunks < vectors and not self.partition_by_ticker) or (keyword_chunks == 0 and vectors):
+            await asyncio.to_thread(self._backfill_keyword_index)
+        if self.quantized is not None and len(self.quantized) < self.keyword_index.count():
+            await asyncio.to_thread(self._backfill_quantized)
+        logger.info(f"Warm news index ready ({len(partitions)} partitions, {vectors} vectors)")
+        return partitions
+
+    def _backfill_keyword_index(self, page_size: int = 1000):
+        """Add chunks that are in Chroma but not yet in the keyword index (first run / after a crash)"""
+        added = 0
+        for name in self._collection_names():
+            collection = self.chroma_client.get_collection(self.collection_name(name))
+            offset = 0
+            while True:
+                page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+                if not page["ids"]:
+                    break
+                nodes = [
+                    metadata_dict_to_node(metadata, text=text)
+                    for text, metadata in zip(page["documents"], page["metadatas"])
+                ]
+                added += self.keyword_index.add(nodes)
+                offset += len(page["ids"])
+        logger.info(f"Keyword index backfilled with {added} chunks")
+
+    def _backfill_quantized(self, page_size: int = 1000):
+        """Quantize vectors already in Chroma (first start with VECTOR_QUANTIZATION enabled)"""
+        added = 0
+        for name in self._collection_names():
+            collection = self.chroma_client.get_collection(self.collection_name(name))
+            offset = 0
+            while True:
+                page = collection.get(include=["embeddings"], limit=page_size, offset=offset)
+                if not page["ids"]:
+                    break
+                added += self.quantized.add(zip(page["ids"], page["embeddings"]))
+                offset += len(page["ids"])
+        logger.info(f"Quantized index backfilled with {added} vectors")
+
+    def plan(self, filters=None):
+        """Partitions a search with these filters has to visit"""
+        partitions = [parse_partition(name) for name in self._known]
+        return plan_partitions(partitions, filters, by_ticker=self.partition_by_ticker)
+
+    async def get_retriever(self, top_k: int, filters=None, partition: str = LEGACY_COLLECTION, partitions=None):
+        """Retriever over one warm partition; one per (collection, top_k), rebuilt only after a swap.
+        `filters` (MetadataFilters) are pushed down into the Chroma `where` clause.
+        `partitions` pins the set of indexes a search started on, across a concurrent swap."""
+        partitions = self._partitions if partitions is None else partitions
+        index = partitions.get(partition)
+        if index is None:
+            if partition not in self._known:
+                raise KeyError(f"Unknown news partition '{partition}'")
+            # reopen a partition that was unloaded
+            with self.kvstore.transaction():
+                index = partitions[partition] = self._open_partition(partition)
+        if filters is not None:
+            return index.as_retriever(similarity_top_k=top_k, filters=filters)
+        retrievers = self._retrievers
+        retriever = retrievers.get((index.index_id, top_k))
+        if retriever is None:
+            retriever = index.as_retriever(similarity_top_k=top_k)
+            retrievers[(index.index_id, top_k)] = retriever
+        return retriever
+
+    async def _vector_search(self, query: str, top_k: int, filters=None, query_embedding=None):
+        """Query only the partitions overlapping the filters, concurrently, and merge their top-k"""
+        # one consistent view of the live generation, even if a reindex switches it mid-search
+        partitions, embed_model, quantized = self._partitions, self.embed_model, self.quantized
+        if quantized is not None:
+            return await self._quantized_search(query, top_k, filters, query_embedding, quantized, embed_model)
+        names = self.plan(filters)
+        if not names:
+            return []
+        if query_embedding is None:
+            query_embedding = await embed_model.aget_query_embedding(query)
+        bundle = QueryBundle(query_str=query, embedding=query_embedding)
+
+        async def retrieve(name):
+            retriever = await self.get_retriever(top_k, filters, name, partitions)
+            return await retriever.aretrieve(bundle)
+
+        merged = {}
+        for hits in await asyncio.gather(*[retrieve(name) for name in names]):
+            for hit in hits:
+                # a chunk lives in several partitions when partitioned by ticker
+                best = merged.get(hit.node.node_id)
+                if best is None or (hit.score or 0) > (best.score or 0):
+                    merged[hit.node.node_id] = hit
+        return sorted(merged.values(), key=lambda h: h.score or 0, reverse=True)[:top_k]
+
+    async def _quantized_search(self, query: str, top_k: int, filters=None, query_embedding=None,
+                                quantized=None, embed_model=None):
+        """First pass on the quantized codes (restricted to chunks matching the filters),
+        exact re-scoring of the shortlist, text + metadata from the keyword index's chunk table"""
+        quantized = quantized or self.quantized
+        if query_embedding is None:
+            query_embedding = await (embed_model or self.embed_model).aget_query_embedding(query)
+
+        def run():
+            allowed = self.keyword_index.node_ids(filters) if filters is not None else None
+            scored = quantized.search(query_embedding, top_k, allowed)
+            stored = self.keyword_index.get([node_id for node_id, _ in scored])
+            return [
+                NodeWithScore(node=TextNode(id_=node_id, text=stored[node_id][0], metadata=stored[node_id][1]), score=score)
+                for node_id, score in scored if node_id in stored
+            ]
+
+        return await asyncio.to_thread(run)
+
+    def partitions_summary(self):
+        summary = []
+        for name in sorted(self._known):
+            partition = parse_partition(name)
+            summary.append({
+                "name": name,
+                "start": datetime.fromtimestamp(partition.start, tz=timezone.utc).date().isoformat() if partition.start else None,
+                "end": datetime.fromtimestamp(partition.end, tz=timezone.utc).date().isoformat() if partition.end else None,
+                "subkey": partition.subkey,
+                "vectors": self.chroma_client.get_collection(self.collection_name(name)).count(),
+                "loaded": name in self._partitions,
+            })
+        return summary
+
+    async def unload(self, names):
+        """Drop partitions from the warm set; they stay searchable and are reopened on demand.
+        Their vectors stay on disk, and Chroma's LRU segment cache (CHROMA_MEMORY_LIMIT_BYTES)
+        releases the memory of segments that are no longer queried."""
+        async with self._write_lock:
+            partitions = {name: index for name, index in self._partitions.items() if name not in names}
+            unloaded = sorted(set(self._partitions) - set(partitions))
+            self._publish(partitions)
+        return unloaded
+
+    async def compact(self, before: str):
+        """
+        Merge monthly partitions older than `before` (YYYY-MM) into one partition per year
+        (per ticker when sub-partitioned), so old history costs one collection per year.
+        Searches keep working meanwhile: merged results are de-duplicated by node id.
+        """
+        cutoff = datetime.strptime(before, "%Y-%m").replace(tzinfo=timezone.utc).timestamp()
+        async with self._write_lock:
+            moved = await asyncio.to_thread(self._compact, cutoff)
+            self._known = set(self._collection_names())
+            partitions = {name: index for name, index in self._partitions.items() if name in self._known}
+            self._publish(partitions)
+        return moved
+
+    def _compact(self, cutoff: float, page_size: int = 1000):
+        moved = {}
+        for name in self._collection_names():
+            partition = parse_partition(name)
+            is_monthly = partition.start is not None and partition.end - partition.start < 32 * 86400
+            if not is_monthly or partition.end > cutoff:
+                continue
+            source = self.chroma_client.get_collection(self.collection_name(name))
+            target = self.chroma_client.get_or_create_collection(self.collection_name(yearly_name(partition)))
+            count = 0
+            while True:
+                # always read the first page: copied rows are deleted from the source as we go
+                page = source.get(include=["embeddings", "documents", "metadatas"], limit=page_size)
+                if not page["ids"]:
+                    break
+                target.upsert(
+                    ids=page["ids"],
+                    embeddings=page["embeddings"],
+                    documents=page["documents"],
+                    metadatas=page["metadatas"],
                 )
-            
-            print("Vector store index updated successfully.")
-            
-            # persist index to use later
-            print(f"Persisting index to: {index_dir}")
-            index.storage_context.persist()
-            print("Index persisted successfully.")
-            return index
+                source.delete(ids=page["ids"])
+                count += len(page["ids"])
+            self.chroma_client.delete_collection(source.name)
+            self.index_store.delete_index_struct(source.name)
+            moved[name] = {"into": yearly_name(partition), "vectors": count}
+            logger.info(f"Compacted partition {source.name} into {target.name} ({count} vectors)")
+        return moved
+
+    def generations(self):
+        """Every generation of news collections in Chroma, with its size"""
+        found = defaultdict(lambda: {"collections": 0, "vectors": 0})
+        for collection in self.chroma_client.list_collections():
+            name = getattr(collection, "name", collection)
+            match = _GENERATION_COLLECTION.match(name)
+            generation, partition = match.groups() if match else ("", name)
+            if parse_partition(partition) is None:
+                continue
+            found[generation]["collections"] += 1
+            found[generation]["vectors"] += self.chroma_client.get_collection(name).count()
+        return [
+            {"generation": generation, **info, "live": generation == self.generation}
+            for generation, info in sorted(found.items())
+        ]
+
+    def write_generation(self, generation: str, nodes, quantized=None):
+        """Upsert embedded chunks into the partitions of a generation that is being rebuilt.
+        Idempotent, so a resumed rebuild can safely repeat a page."""
+        routed = defaultdict(list)
+        for node in nodes:
+            for name in partition_names(node.metadata, by_ticker=self.partition_by_ticker):
+                routed[name].append(node)
+        for name, partition_nodes in routed.items():
+            collection = self.chroma_client.get_or_create_collection(self.collection_name(name, generation))
+            collection.upsert(
+                ids=[node.node_id for node in partition_nodes],
+                embeddings=[node.get_embedding() for node in partition_nodes],
+                metadatas=[node_to_metadata_dict(node, remove_text=True, flat_metadata=True) for node in partition_nodes],
+                documents=[node.get_content(metadata_mode=MetadataMode.NONE) or "" for node in partition_nodes],
+            )
+        # the keyword index does not depend on the embeddings and is shared by all generations
+        self.keyword_index.add(nodes)
+        if quantized is not None:
+            quantized.add((node.node_id, node.embedding) for node in nodes)
+
+    async def switch_generation(self, generation: str, model: str, quantized=None, catch_up=None):
+        """
+        Make a rebuilt generation live. Under the write lock (so no ingest lands in between),
+        `catch_up` copies what was ingested since the rebuild's last page; then the collections,
+        embedding model and quantized index are swapped together. Returns the previous generation.
+        """
+        async with self._write_lock:
+            if catch_up is not None:
+                await catch_up()
+            embed_model = self.embedding_model(model)
+            known = set(self._collection_names(generation))
+            with self.kvstore.transaction():
+                partitions = {name: self._open_partition(name, generation, embed_model) for name in known}
+                self.kvstore.put(LIVE_KEY, {"generation": generation, "model": model}, collection=INDEX_META_COLLECTION)
+            previous = self.generation
+            # plain assignments with no await in between: a search sees either generation, never a mix
+            self.generation, self.model, self.embed_model, self.quantized = generation, model, embed_model, quantized
+            self._known = known
+            self._partitions, self._retrievers = partitions, {}
+        logger.info(f"News index switched from generation '{previous}' to '{generation}' ({model}, {len(known)} partitions)")
+        return previous
+
+    async def drop_generation(self, generation: str):
+        """Delete the collections (and quantized files) of a generation that is no longer live"""
+        async with self._write_lock:
+            if generation == self.generation:
+                raise ValueError("Cannot drop the live generation")
+            names = self._collection_names(generation)
+            for name in names:
+                collection = self.collection_name(name, generation)
+                self.chroma_client.delete_collection(collection)
+                self.index_store.delete_index_struct(collection)
+            directory = os.path.join(settings.QUANTIZED_INDEX_DIR, generation) if generation else settings.QUANTIZED_INDEX_DIR
+            if os.path.isdir(directory):
+                # the original generation's files sit next to the rebuilt generations' directories
+                for entry in os.scandir(directory):
+                    if entry.is_file():
+                        os.remove(entry.path)
+                if generation:
+                    shutil.rmtree(directory, ignore_errors=True)
+        logger.info(f"Dropped news index generation '{generation}' ({len(names)} collections)")
+        return names
+
+    async def search(self, query: str, top_k: int, filters=None, mode: str = None,
+                     vector_weight: float = None, keyword_weight: float = None, query_embedding=None):
+        """
+        News search in "vector", "keyword" (BM25) or "hybrid" mode. Hybrid runs both searches
+        concurrently over `top_k * HYBRID_CANDIDATES` candidates each and fuses them with
+        reciprocal-rank fusion: score = sum(weight / (HYBRID_RRF_K + rank)).
+        `query_embedding` skips embedding the query (see `search_batch`).
+        Returns (hits, timings_ms); each hit is a dict with node, score, vector_rank, keyword_rank.
+        """
+        mode = mode or settings.NEWS_SEARCH_MODE
+        if mode not in ("vector", "keyword", "hybrid"):
+            raise ValueError(f"Unknown search mode '{mode}'")
+        vector_weight = settings.HYBRID_VECTOR_WEIGHT if vector_weight is None else vector_weight
+        keyword_weight = settings.HYBRID_KEYWORD_WEIGHT if keyword_weight is None else keyword_weight
+        candidates = top_k * settings.HYBRID_CANDIDATES if mode == "hybrid" else top_k
+        timings = {}
+        started = time.perf_counter()
+
+        async def timed(stage, coro):
+            stage_started = time.perf_counter()
+            result = await coro
+            timings[f"{stage}_ms"] = round((time.perf_counter() - stage_started) * 1000, 2)
+            return result
+
+        async def vector_stage():
+            return await self._vector_search(query, candidates, filters, query_embedding)
+
+        async def no_results():
+            return []
+
+        vector_hits, keyword_hits = await asyncio.gather(
+            timed("vector", vector_stage()) if mode != "keyword" else no_results(),
+            timed("keyword", asyncio.to_thread(self.keyword_index.search, query, candidates, filters))
+            if mode != "vector" else no_results(),
+        )
+
+        fusion_started = time.perf_counter()
+        hits = {}
+        for rank, hit in enumerate(vector_hits, start=1):
+            hits[hit.node.node_id] = {
+                "node": hit.node, "vector_rank": rank, "keyword_rank": None,
+                "score": hit.score if mode == "vector" else vector_weight / (settings.HYBRID_RRF_K + rank),
+            }
+        for rank, (node_id, text, metadata, bm25) in enumerate(keyword_hits, start=1):
+            hit = hits.setdefault(node_id, {
+                "node": TextNode(id_=node_id, text=text, metadata=metadata),
+                "vector_rank": None, "keyword_rank": None, "score": 0.0,
+            })
+            hit["keyword_rank"] = rank
+            hit["score"] = bm25 if mode == "keyword" else hit["score"] + keyword_weight / (settings.HYBRID_RRF_K + rank)
+        ranked = sorted(hits.values(), key=lambda h: h["score"], reverse=True)[:top_k]
+        timings["fusion_ms"] = round((time.perf_counter() - fusion_started) * 1000, 2)
+        timings["total_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return ranked, timings
+
+    async def search_batch(self, searches, mode: str = None,
+                           vector_weight: float = None, keyword_weight: float = None):
+        """
+        Run several searches at once: the distinct query texts are embedded in one batched call,
+        then the retrievals run concurrently. `searches` is a list of (query, top_k, filters).
+        Returns ([(hits, timings_ms), ...], embed_ms).
+        """
+        mode = mode or settings.NEWS_SEARCH_MODE
+        embeddings = {}
+        started = time.perf_counter()
+        if mode != "keyword":
+            texts = list(dict.fromkeys(query for query, _, _ in searches))
+            vectors = await self.embed_model.aget_query_embedding_batch(texts)
+            embeddings = dict(zip(texts, vectors))
+        embed_ms = round((time.perf_counter() - started) * 1000, 2)
+
+        results = await asyncio.gather(*[
+            self.search(query, top_k, filters, mode=mode, vector_weight=vector_weight,
+                        keyword_weight=keyword_weight, query_embedding=embeddings.get(query))
+            for query, top_k, filters in searches
+        ])
+        return list(results), embed_ms
+
+    async def remove_documents(self, doc_ids):
+        """
+        Take documents out of the index, e.g. an article whose summary (and so content hash) changed:
+        their chunks in every generation's partitions and in the keyword index, then their hashes,
+        so the same content is indexed again if it comes back. The quantized files are append-only;
+        searches drop rows the keyword index no longer has. Returns keyword chunks removed.
+        """
+        doc_ids = list(doc_ids)
+        if not doc_ids:
+            return 0
+        async with self._write_lock:
+            return await asyncio.to_thread(self._remove_documents, doc_ids)
+
+    def _remove_documents(self, doc_ids):
+        for collection in self.chroma_client.list_collections():
+            name = getattr(collection, "name", collection)
+            match = _GENERATION_COLLECTION.match(name)
+            if parse_partition(match.group(2) if match else name) is not None:
+                self.chroma_client.get_collection(name).delete(where={"document_id": {"$in": doc_ids}})
+        removed = self.keyword_index.remove(doc_ids)
+        with self.kvstore.transaction():
+            for doc_id in doc_ids:
+                self.docstore.delete_document(doc_id, raise_error=False)
+        logger.info(f"Removed {len(doc_ids)} documents ({removed} chunks) from the news index")
+        return removed
+
+    def filter_new_documents(self, documents):
+        """Drop documents whose content hash (doc id) is already recorded in the docstore"""
+        return [doc for doc in documents if self.docstore.get_document_hash(doc.get_doc_id()) is None]
+
+    async def embed_documents(self, documents, embed_model=None):
+        """Chunk documents and embed the chunks (no lock: several batches can embed concurrently)"""
+        nodes = run_transformations(documents, self.transformations)
+        texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+        embeddings = await (embed_model or self.embed_model).aget_text_embedding_batch(texts)
+        for node, embedding in zip(nodes, embeddings):
+            node.embedding = embedding
+        return nodes
+
+    async def save_atlas_index(self, documents, nodes=None):  
+        """Create and save index to disk, then hot-swap it in for searches.
+        `nodes` may be passed pre-embedded (see `embed_documents`); only the write is serialised."""
+        documents = self.filter_new_documents(documents)
+        model = self.model
+        if documents and nodes is None:
+            nodes = await self.embed_documents(documents)
+        async with self._write_lock:
+            if nodes and self.model != model:
+                # a reindex switched embedding models while this batch was embedding
+                nodes = await self.embed_documents(documents)
+            return await self._save_atlas_index(documents, nodes or [])
+
+    async def _save_atlas_index(self, documents, nodes):
+        try:
+            partitions = self._partitions or await self.warm()
+
+            # re-check under the write lock: a concurrent ingest may have indexed the same articles
+            new_ids = {doc.get_doc_id() for doc in self.filter_new_documents(documents)}
+            documents = [doc for doc in documents if doc.get_doc_id() in new_ids]
+            nodes = [node for node in nodes if node.ref_doc_id in new_ids]
+            if not documents:
+                return partitions
+
+            # route every chunk to the partition(s) for its month (and tickers)
+            routed = defaultdict(list)
+            for node in nodes:
+                for name in partition_names(node.metadata, by_ticker=self.partition_by_ticker):
+                    routed[name].append(node)
+
+            # Chroma and the other stores are written synchronously: off the event loop, like searches
+            partitions = await asyncio.to_thread(self._write_batch, dict(partitions), routed, nodes, documents)
+            logger.info(f"Vector store index updated with {len(nodes)} nodes across {len(routed)} partitions.")
+
+            self._publish(partitions)
+            return partitions
             
         except Exception as e:
-            print(f"Error during save_index: {str(e)}")
+            logger.error(f"Error during save_index: {str(e)}")
             raise Exception(f"Error saving index: {str(e)}")
+
+    def _write_batch(self, partitions, routed, nodes, documents):
+        """
+        Vectors (Chroma, quantized) and keyword rows are written first; each store skips node ids
+        it already has, so a batch interrupted here is simply redone on the next attempt.
+        The document hashes are committed last: they mark the batch as complete, and only
+        documents they record are skipped by `filter_new_documents`.
+        """
+        for name, partition_nodes in routed.items():
+            if name not in partitions:
+                partitions[name] = self._open_partition(name)
+            partitions[name].insert_nodes(partition_nodes)
+        self.keyword_index.add(nodes)
+        if self.quantized is not None:
+            self.quantized.add((node.node_id, node.embedding) for node in nodes)
+        self.docstore.set_document_hashes({doc.get_doc_id(): doc.hash for doc in documents})
+        return partitions
         
 
 
-    ### load index directly from persisted storage
+    ### the warm partition indexes (loaded on first use if startup didn't already)
     async def load_index(self):
         try:
-            index_dir = self.persist_dir
-            
-            if not os.path.exists(index_dir):
-                raise FileNotFoundError(f"Index directory '{index_dir}' does not exist.")
-                
-            chroma_collection = self.chroma_client.get_or_create_collection("main_collection")
-            vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-            
-            storage_context = StorageContext.from_defaults(
-                vector_store=vector_store,
-                persist_dir=index_dir,
-                graph_store=SimpleGraphStore(),
-            )
-            
-            index = load_index_from_storage(storage_context=storage_context)
-            
-            if index is None:
-                raise ValueError("Index could not be loaded from storage context")
-                
-            return index
-            
+            return self._partitions or await self.warm()
         except Exception as e:
             logger.error(f"Error in load_index: {str(e)}")
             raise Exception(f"Error loading index: {str(e)}")
+
+
+# one Chroma client and one warm set of partition indexes per process
+index_manager = IndexManager()
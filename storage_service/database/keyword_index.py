@@ -0,0 +1,198 @@
+import os
+import re
+import json
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from llama_index.core.schema import BaseNode, MetadataMode
+from llama_index.core.vector_stores import FilterOperator, MetadataFilters
+
+from .news_filters import PUBLISHED_AT_KEY, TICKERS_KEY, TICKER_KEY_PREFIX
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# metadata filter keys -> columns of the `chunks` table
+_FILTER_COLUMNS = {
+    PUBLISHED_AT_KEY: "published_at",
+    "source": "source",
+    "overall_sentiment_score": "sentiment",
+}
+_SQL_OPERATORS = {
+    FilterOperator.EQ: "=",
+    FilterOperator.NE: "!=",
+    FilterOperator.GT: ">",
+    FilterOperator.GTE: ">=",
+    FilterOperator.LT: "<",
+    FilterOperator.LTE: "<=",
+}
+
+
+def match_expression(query: str) -> Optional[str]:
+    """Free text -> FTS5 query: every token quoted and OR-ed, ranking is left to bm25()"""
+    tokens = list(dict.fromkeys(t.lower() for t in _TOKEN.findall(query)))
+    return " OR ".join(f'"{t}"' for t in tokens) if tokens else None
+
+
+
+###BM25 INVERTED INDEX OVER NEWS CHUNKS (SQLITE FTS5), KEPT NEXT TO THE CHROMA COLLECTION
+class KeywordIndex:
+    """
+    Chunks are appended as they are indexed, so the inverted index is updated incrementally.
+    The filterable metadata lives in plain columns, so the same date/source/sentiment/ticker
+    filters as the vector search restrict the candidate set inside SQLite.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY,
+                node_id TEXT UNIQUE NOT NULL,
+                ref_doc_id TEXT,
+                published_at INTEGER,
+                source TEXT,
+                sentiment REAL,
+                tickers TEXT,
+                text TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_chunks_published_at ON chunks (published_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_chunks_ref_doc_id ON chunks (ref_doc_id)")
+        self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(body)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM chunks").fetchone()[0]
+
+    def add(self, nodes: List[BaseNode]) -> int:
+        return self.add_rows([
+            (node.node_id, node.ref_doc_id, node.get_content(), node.metadata,
+             node.get_content(metadata_mode=MetadataMode.EMBED))
+            for node in nodes
+        ])
+
+    def add_rows(self, rows: List[Tuple[str, Optional[str], str, Dict[str, Any], str]]) -> int:
+        """(node_id, ref_doc_id, text, metadata, searchable text); existing node ids are skipped"""
+        added = 0
+        with self._lock:
+            try:
+                for node_id, ref_doc_id, text, metadata, body in rows:
+                    tickers = metadata.get(TICKERS_KEY, "")
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO chunks "
+                        "(node_id, ref_doc_id, published_at, source, sentiment, tickers, text, metadata) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            node_id,
+                            ref_doc_id,
+                            metadata.get(PUBLISHED_AT_KEY),
+                            metadata.get("source"),
+                            metadata.get("overall_sentiment_score"),
+                            f",{tickers}," if tickers else "",
+                            text,
+                            json.dumps(metadata),
+                        ),
+                    )
+                    if cursor.rowcount:
+                        self._conn.execute(
+                            "INSERT INTO chunks_fts (rowid, body) VALUES (?, ?)", (cursor.lastrowid, body)
+                        )
+                        added += 1
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return added
+
+    def remove(self, ref_doc_ids: List[str]) -> int:
+        """Delete every chunk of the given documents; returns chunks removed"""
+        removed = 0
+        with self._lock:
+            try:
+                for start in range(0, len(ref_doc_ids), 500):
+                    chunk = ref_doc_ids[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    self._conn.execute(
+                        f"DELETE FROM chunks_fts WHERE rowid IN (SELECT id FROM chunks WHERE ref_doc_id IN ({placeholders}))",
+                        chunk,
+                    )
+                    removed += self._conn.execute(
+                        f"DELETE FROM chunks WHERE ref_doc_id IN ({placeholders})", chunk
+                    ).rowcount
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return removed
+
+    def _where(self, filters: Optional[MetadataFilters]) -> Tuple[List[str], List[Any]]:
+        clauses, params = [], []
+        for f in (filters.filters if filters else []):
+            if isinstance(f, MetadataFilters):
+                raise ValueError("Nested metadata filters are not supported by the keyword index")
+            if f.key.startswith(TICKER_KEY_PREFIX):
+                clauses.append("c.tickers LIKE ?")
+                params.append(f"%,{f.key[len(TICKER_KEY_PREFIX):]},%")
+            elif f.key in _FILTER_COLUMNS and f.operator == FilterOperator.IN:
+                clauses.append(f"c.{_FILTER_COLUMNS[f.key]} IN ({','.join('?' * len(f.value))})")
+                params.extend(f.value)
+            elif f.key in _FILTER_COLUMNS and f.operator in _SQL_OPERATORS:
+                clauses.append(f"c.{_FILTER_COLUMNS[f.key]} {_SQL_OPERATORS[f.operator]} ?")
+                params.append(f.value)
+            else:
+                raise ValueError(f"Unsupported keyword index filter: {f.key} {f.operator}")
+        return clauses, params
+
+    def node_ids(self, filters: Optional[MetadataFilters] = None) -> List[str]:
+        """Ids of all chunks matching the filters"""
+        clauses, params = self._where(filters)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT c.node_id FROM chunks c{where}", params).fetchall()
+        return [node_id for (node_id,) in rows]
+
+    def get(self, node_ids: List[str]) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        """node_id -> (text, metadata) for the stored chunks among `node_ids`"""
+        found = {}
+        with self._lock:
+            for start in range(0, len(node_ids), 500):
+                chunk = node_ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT node_id, text, metadata FROM chunks WHERE node_id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                found.update({node_id: (text, json.loads(metadata)) for node_id, text, metadata in rows})
+        return found
+
+    def search(
+        self, query: str, top_k: int, filters: Optional[MetadataFilters] = None
+    ) -> List[Tuple[str, str, Dict[str, Any], float]]:
+        """Best `top_k` chunks by BM25 as (node_id, text, metadata, score); higher score is better"""
+        expression = match_expression(query)
+        if not expression:
+            return []
+        clauses, params = self._where(filters)
+        where = "".join(f" AND {clause}" for clause in clauses)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT c.node_id, c.text, c.metadata, bm25(chunks_fts) AS rank "
+                "FROM chunks_fts JOIN chunks c ON c.id = chunks_fts.rowid "
+                f"WHERE chunks_fts MATCH ?{where} ORDER BY rank LIMIT ?",
+                [expression, *params, top_k],
+            ).fetchall()
+        # FTS5 bm25() is negated so that ascending order is best-first
+        return [(node_id, text, json.loads(metadata), -rank) for node_id, text, metadata, rank in rows]
@@ -1,81 +1,315 @@
-from .index_manager import IndexManager
+from .news_filters import parse_date, published_at, ticker_metadata, filter_only_keys
+from .postgres import clear_news_sentiment, save_news_sentiment
 from llama_index.core import Document
-from typing import List
+from typing import Any, Dict, List, Optional
 import pymongo
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError
 from config.settings import settings
 from motor.motor_asyncio import AsyncIOMotorClient
 from fastapi import HTTPException
+from datetime import datetime, timedelta, timezone
+import hashlib
+import uuid
 import logging
 
+if settings.INDEX_OWNER_URL:
+    # API worker process: the vector index lives in the index-owner process
+    from .index_client import index_client as news_indexer
+else:
+    from .embedding_queue import embedding_worker as news_indexer
+
 logger = logging.getLogger("uvicorn")
-index_manager = IndexManager()
 
 atlas_client = AsyncIOMotorClient(settings.MONGODB_URI)
-news_collection = atlas_client[settings.MONGODB_DB]["news"]
+# one document per article, keyed by URL
+news_collection = atlas_client[settings.MONGODB_DB][settings.MONGODB_NEWS_COLLECTION]
+# response wrappers ({query_type, value, feed: [...]}) as stored before articles were flattened
+legacy_news_collection = atlas_client[settings.MONGODB_DB]["news"]
+
+DUPLICATE_KEY = 11000
+# a sentiment claim older than this belongs to a call that failed; the next aggregation finishes it
+SENTIMENT_CLAIM_STALE_S = 300
+
+
+def content_hash(feed_item) -> str:
+    """Identity of an article: the same URL + summary is the same content, whichever ticker/topic feed it came from"""
+    key = f"{feed_item.get('url', '')}\n{feed_item.get('summary', '')}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def article_document(feed_item) -> Document:
+    """One news article (Alpha Vantage feed item) as a Document with searchable/filterable metadata"""
+    metadata = {
+        "source": feed_item.get("source", "Unknown source"),
+        "date": feed_item.get("time_published", "Unknown date"),
+        # numeric copy of the date so searches can range-filter it in the vector store
+        "published_at": published_at(feed_item.get("time_published")),
+        "title": feed_item.get("title", "No title provided"),
+        "url": feed_item.get("url", "No URL provided"),
+        "overall_sentiment_label": feed_item.get("overall_sentiment_label", "Unknown sentiment"),
+        "overall_sentiment_score": float(feed_item.get("overall_sentiment_score", 0) or 0),
+        **ticker_metadata(feed_item),
+    }
+    return Document(
+        id_=content_hash(feed_item),
+        text=feed_item.get("summary", "No summary available"),
+        metadata=metadata,
+        excluded_embed_metadata_keys=filter_only_keys(metadata),
+        excluded_llm_metadata_keys=filter_only_keys(metadata),
+    )
 
 
 ###create document objects from raw data
 async def create_news_documents(news_data) -> List[Document]:
     print(f"News data received for document creation: {news_data}")
     documents = []
+    seen = set()
     try:
         for article in news_data.data:
             feed = article.get("feed", [])
             for feed_item in feed:
-                doc = Document(
-                    text=feed_item.get("summary", "No summary available"),
-                    metadata={
-                        "source": feed_item.get("source", "Unknown source"),
-                        "date": feed_item.get("time_published", "Unknown date"),
-                        "title": feed_item.get("title", "No title provided"),
-                        "url": feed_item.get("url", "No URL provided"),
-                        "overall_sentiment_label": feed_item.get("overall_sentiment_label", "Unknown sentiment"),
-                        "overall_sentiment_score": feed_item.get("overall_sentiment_score", 0),
-                    },
-                )
-                documents.append(doc)
+                doc_id = content_hash(feed_item)
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                documents.append(article_document(feed_item))
     except Exception as e:
         raise Exception(f"Error creating documents: {str(e)}")
     return documents
 
 
 
+async def ensure_news_indexes():
+    """Unique article URL, plus the date and ticker lookups (idempotent; run at startup)"""
+    await news_collection.create_indexes([
+        IndexModel([("url", ASCENDING)], unique=True, name="url_unique"),
+        IndexModel([("time_published", DESCENDING)], name="time_published"),
+        IndexModel(
+            [("ticker_sentiment.ticker", ASCENDING), ("time_published", DESCENDING)],
+            name="ticker_time_published",
+        ),
+        IndexModel([("sentiment_claim", ASCENDING)], sparse=True, name="sentiment_claim"),
+    ])
+
+
+def flatten_news(wrappers: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """url -> article fields and the feeds (query_type, value) it was returned for; articles without a URL are dropped"""
+    articles = {}
+    for wrapper in wrappers:
+        feed_ref = {"query_type": wrapper.get("query_type"), "value": wrapper.get("value")}
+        for feed_item in wrapper.get("feed", []):
+            url = feed_item.get("url")
+            if not url:
+                continue
+            article = articles.setdefault(url, {"fields": {}, "feeds": []})
+            article["fields"] = {**feed_item, "content_hash": content_hash(feed_item)}
+            if feed_ref not in article["feeds"]:
+                article["feeds"].append(feed_ref)
+    return articles
+
+
+SENTIMENT_FIELDS = ("time_published", "ticker_sentiment")
+
+
+async def upsert_articles(wrappers: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Write every article of the wrappers as its own document with one unordered bulk upsert:
+    new URLs are inserted, known ones updated in place, so refreshing a feed adds no duplicates.
+    A known URL whose summary changed has its old content hash withdrawn from the vector index,
+    and one whose sentiment changed is counted again (replacing what it counted before).
+    """
+    now = datetime.now(timezone.utc)
+    articles = flatten_news(wrappers)
+    projection = {"_id": 0, "url": 1, "content_hash": 1, **{field: 1 for field in SENTIMENT_FIELDS}}
+    previous = {
+        article["url"]: article
+        async for article in news_collection.find({"url": {"$in": list(articles)}}, projection)
+    }
+    operations, replaced = [], []
+    for url, article in articles.items():
+        update = {
+            "$set": {**article["fields"], "last_seen": now},
+            "$setOnInsert": {"first_seen": now},
+            "$addToSet": {"feeds": {"$each": article["feeds"]}},
+        }
+        known = previous.get(url)
+        if known is not None:
+            if known.get("content_hash") not in (None, article["fields"]["content_hash"]):
+                replaced.append(known["content_hash"])
+            if any(known.get(field) != article["fields"].get(field) for field in SENTIMENT_FIELDS):
+                # also drops an in-flight claim, so the call holding it can't flag the new values as counted
+                update["$unset"] = {"sentiment_aggregated": "", "sentiment_claim": "", "sentiment_claimed_at": ""}
+        operations.append(UpdateOne({"url": url}, update, upsert=True))
+    if not operations:
+        return {"articles": 0, "inserted": 0, "updated": 0, "replaced": 0}
+    if replaced:
+        # chunks of the old summary would otherwise keep matching searches next to the new ones;
+        # withdrawn before the write, so a failed save still sees the change when it is retried
+        await news_indexer.remove_documents(replaced)
+        logger.info(f"Withdrew {len(replaced)} replaced article versions from the news index")
+    try:
+        result = (await news_collection.bulk_write(operations, ordered=False)).bulk_api_result
+    except BulkWriteError as e:
+        # two concurrent upserts of a new URL: the loser hits the unique index; retry it as an update
+        errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != DUPLICATE_KEY for error in errors):
+            raise
+        result = e.details
+        retried = await news_collection.bulk_write([operations[error["index"]] for error in errors], ordered=False)
+        result["nModified"] = result.get("nModified", 0) + retried.modified_count
+    return {
+        "articles": len(operations),
+        "inserted": result.get("nUpserted", 0),
+        "updated": result.get("nModified", 0),
+        "replaced": len(replaced),
+    }
+
+
+async def migrate_legacy_news(page_size: int = 500) -> Dict[str, int]:
+    """Flatten wrappers stored by earlier versions into per-article documents (safe to re-run)"""
+    totals = {"wrappers": 0, "articles": 0, "inserted": 0, "updated": 0, "replaced": 0}
+    page = []
+
+    async def flush():
+        for key, value in (await upsert_articles(page)).items():
+            totals[key] += value
+        totals["wrappers"] += len(page)
+        page.clear()
+
+    async for wrapper in legacy_news_collection.find({}, {"_id": 0}).batch_size(page_size):
+        page.append(wrapper)
+        if len(page) == page_size:
+            await flush()
+    if page:
+        await flush()
+    totals["sentiment_articles_counted"] = await aggregate_news_sentiment()
+    logger.info(f"Migrated legacy news: {totals}")
+    return totals
+
+
+
+def sentiment_entries(article: Dict[str, Any]):
+    """(ticker, day, score, relevance) per ticker the article scores; a ticker listed twice counts once (the last)"""
+    try:
+        day = parse_date(article.get("time_published") or "").date()
+    except ValueError:
+        return []
+    entries = {}
+    for entry in article.get("ticker_sentiment", []):
+        ticker = (entry.get("ticker") or "").strip().upper()
+        try:
+            score = float(entry["ticker_sentiment_score"])
+            relevance = float(entry.get("relevance_score") or 0)
+        except (KeyError, TypeError, ValueError):
+            continue
+        if ticker:
+            entries[ticker] = (ticker, day, score, relevance)
+    return list(entries.values())
+
+
+async def apply_sentiment_claim(claim: str) -> int:
+    """
+    Count the articles claimed under `claim` and flag them. Postgres replaces what an article counted
+    each time it is saved, so re-applying a claim whose flag write failed counts nothing twice.
+    Returns articles in the claim.
+    """
+    projection = {"_id": 0, "url": 1, "time_published": 1, "ticker_sentiment": 1}
+    articles = [article async for article in news_collection.find({"sentiment_claim": claim}, projection)]
+    if articles:
+        await save_news_sentiment({article["url"]: sentiment_entries(article) for article in articles})
+    await news_collection.update_many(
+        {"sentiment_claim": claim},
+        {"$set": {"sentiment_aggregated": True}, "$unset": {"sentiment_claim": "", "sentiment_claimed_at": ""}},
+    )
+    return len(articles)
+
+
+async def aggregate_news_sentiment(urls: Optional[List[str]] = None, page_size: int = 1000) -> int:
+    """
+    Add articles not yet counted (all of them, or those among `urls`) to news_sentiment_daily.
+    Each page is first claimed with a fresh token, so concurrent calls never count the same article,
+    then applied with `apply_sentiment_claim`; claims left behind by failed calls are finished first.
+    Returns articles counted.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=SENTIMENT_CLAIM_STALE_S)
+    counted = 0
+    for claim in await news_collection.distinct("sentiment_claim", {"sentiment_claimed_at": {"$lt": cutoff}}):
+        counted += await apply_sentiment_claim(claim)
+
+    query = {"sentiment_aggregated": {"$ne": True}, "sentiment_claim": {"$exists": False}}
+    if urls is not None:
+        query["url"] = {"$in": urls}
+    while True:
+        page = [article["url"] async for article in news_collection.find(query, {"_id": 0, "url": 1}).limit(page_size)]
+        if not page:
+            break
+        claim = uuid.uuid4().hex
+        # only articles still unclaimed are taken; ones another call claimed meanwhile are left to it
+        await news_collection.update_many(
+            {**query, "url": {"$in": page}},
+            {"$set": {"sentiment_claim": claim, "sentiment_claimed_at": datetime.now(timezone.utc)}},
+        )
+        counted += await apply_sentiment_claim(claim)
+    return counted
+
+
+async def rebuild_news_sentiment() -> int:
+    """Recompute news_sentiment_daily from every stored article"""
+    await news_collection.update_many(
+        {}, {"$unset": {"sentiment_aggregated": "", "sentiment_claim": "", "sentiment_claimed_at": ""}}
+    )
+    await clear_news_sentiment()
+    counted = await aggregate_news_sentiment()
+    logger.info(f"Rebuilt news sentiment from {counted} articles")
+    return counted
+
+
+
 async def save_news(news_data):
-    """Save news data and create vector embeddings"""
+    """Save raw news data and queue it for vector embedding"""
     try:
         logger.info("Starting to save news data...")
         
-        # 1. save raw data to MongoDB 
-        logger.info(f"Inserting raw news data into MongoDB: {len(news_data.data)} items")
-        result = await news_collection.insert_many(news_data.data)
-        logger.info(f"Successfully inserted {len(result.inserted_ids)} items into MongoDB")
+        # 1. upsert one document per article
+        logger.info(f"Upserting news articles into MongoDB from {len(news_data.data)} feeds")
+        written = await upsert_articles(news_data.data)
+        logger.info(f"MongoDB articles: {written['inserted']} inserted, {written['updated']} updated")
+        # per-ticker daily sentiment in Postgres, for SQL joins against stock_prices
+        urls = list(flatten_news(news_data.data))
+        sentiment_counted = await aggregate_news_sentiment(urls) if urls else 0
 
         # 2. check if there's any content in the feeds
-        has_content = any(article.get("feed") for article in news_data.data)
-        
-        if not has_content:
+        if not written["articles"]:
             logger.info("No news content found in feeds - skipping vector indexing")
             return {
                 "status": "success",
-                "message": "Empty news data saved to MongoDB",
-                "raw_docs_saved": len(result.inserted_ids),
-                "vectors_created": 0,
+                "message": "No news articles to store",
+                "raw_docs_saved": 0,
+                "vectors_queued": 0,
                 "details": "No content available for vector indexing"
             }
 
-        # 3. if the content isn't empty, index it and store
+        # 3. queue new articles for the background embedding workers; search sees them once indexed
+        # whether an article still needs embedding is decided by the docstore (indexed) and the queue
+        # (waiting), not by the Mongo copy: one stored by a save that failed later is queued on retry
         documents = await create_news_documents(news_data)
-        if documents:
-            logger.info(f"Creating and saving vector index with {len(documents)} documents")
-            index = await index_manager.save_atlas_index(documents)
-            logger.info("Successfully created and saved vector index")
-            return {
-                "status": "success",
-                "message": "News data stored successfully",
-                "raw_docs_saved": len(result.inserted_ids),
-                "vectors_created": len(documents),
-                "details": "Data saved to both MongoDB and vector index"
-            }
+        queued, already_indexed = await news_indexer.enqueue_new(documents) if documents else (0, 0)
+        skipped = len(documents) - queued
+        logger.info(f"{skipped} of {len(documents)} articles already indexed or queued - skipping them ({already_indexed} indexed)")
+        logger.info(f"Queued {queued} documents for embedding")
+        return {
+            "status": "accepted",
+            "message": "News data stored; vector indexing queued",
+            "raw_docs_saved": written["articles"],
+            "articles_inserted": written["inserted"],
+            "articles_updated": written["updated"],
+            "articles_replaced": written["replaced"],
+            "sentiment_articles_counted": sentiment_counted,
+            "vectors_queued": queued,
+            "duplicates_skipped": skipped,
+            "details": "Data saved to MongoDB; indexing progress at /api/v1/store/news/status"
+        }
 
     except Exception as e:
         logger.error(f"Failed to save news data: {str(e)}")
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from llama_index.core.vector_stores import (
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+)
+
+# metadata keys that exist only for filtering; kept out of embedded text and LLM context
+PUBLISHED_AT_KEY = "published_at"
+TICKERS_KEY = "tickers"
+TICKER_KEY_PREFIX = "ticker_"
+
+_DATE_FORMATS = ("%Y%m%dT%H%M%S", "%Y%m%dT%H%M", "%Y%m%d")
+
+
+def parse_date(value: str) -> datetime:
+    """Alpha Vantage `time_published` (20240115T123000) or ISO 8601; naive values are taken as UTC"""
+    value = value.strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(value, fmt)
+            break
+        except ValueError:
+            continue
+    else:
+        parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def published_at(time_published: Optional[str]) -> int:
+    """Sortable epoch seconds for the article date; 0 when missing or unparseable"""
+    try:
+        return int(parse_date(time_published).timestamp()) if time_published else 0
+    except ValueError:
+        return 0
+
+
+def ticker_key(ticker: str) -> str:
+    # Chroma metadata values must be scalars, so ticker membership is one boolean key per ticker
+    return f"{TICKER_KEY_PREFIX}{ticker.strip().upper()}"
+
+
+def ticker_metadata(feed_item: Dict[str, Any]) -> Dict[str, Any]:
+    tickers = sorted({
+        t.get("ticker", "").upper() for t in feed_item.get("ticker_sentiment", []) if t.get("ticker")
+    })
+    return {TICKERS_KEY: ",".join(tickers), **{ticker_key(t): True for t in tickers}}
+
+
+def filter_only_keys(metadata: Dict[str, Any]) -> List[str]:
+    return [k for k in metadata if k == PUBLISHED_AT_KEY or k.startswith(TICKER_KEY_PREFIX)]
+
+
+def public_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Metadata as returned by search: without the per-ticker flag keys"""
+    return {k: v for k, v in metadata.items() if not k.startswith(TICKER_KEY_PREFIX)}
+
+
+def build_news_filters(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    days: Optional[int] = None,
+    sources: Optional[List[str]] = None,
+    min_sentiment: Optional[float] = None,
+    max_sentiment: Optional[float] = None,
+    ticker: Optional[str] = None,
+) -> Optional[MetadataFilters]:
+    """
+    Translate search parameters into metadata filters; the Chroma vector store turns these into
+    its `where` clause, so only matching vectors are scored. Raises ValueError on a bad date.
+    """
+    filters: List[MetadataFilter] = []
+
+    start = parse_date(start_date) if start_date else None
+    if days is not None:
+        lookback = datetime.now(timezone.utc) - timedelta(days=days)
+        start = max(start, lookback) if start else lookback
+    if start:
+        filters.append(MetadataFilter(key=PUBLISHED_AT_KEY, value=int(start.timestamp()), operator=FilterOperator.GTE))
+    if end_date:
+        end = parse_date(end_date)
+        if len(end_date.strip()) <= 10:
+            # a bare date includes the whole day
+            end += timedelta(days=1)
+            filters.append(MetadataFilter(key=PUBLISHED_AT_KEY, value=int(end.timestamp()), operator=FilterOperator.LT))
+        else:
+            filters.append(MetadataFilter(key=PUBLISHED_AT_KEY, value=int(end.timestamp()), operator=FilterOperator.LTE))
+
+    if sources:
+        filters.append(MetadataFilter(key="source", value=sources, operator=FilterOperator.IN))
+    if min_sentiment is not None:
+        filters.append(MetadataFilter(key="overall_sentiment_score", value=float(min_sentiment), operator=FilterOperator.GTE))
+    if max_sentiment is not None:
+        filters.append(MetadataFilter(key="overall_sentiment_score", value=float(max_sentiment), operator=FilterOperator.LTE))
+    if ticker:
+        # MetadataFilter only validates int/float/str values; Chroma and the keyword index match the flag as-is
+        filters.append(MetadataFilter.model_construct(key=ticker_key(ticker), value=True, operator=FilterOperator.EQ))
+
+    return MetadataFilters(filters=filters) if filters else None
@@ -0,0 +1,113 @@
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from llama_index.core.vector_stores import FilterOperator, MetadataFilters
+
+from .news_filters import PUBLISHED_AT_KEY, TICKERS_KEY, TICKER_KEY_PREFIX
+
+PARTITION_PREFIX = "news_"
+UNDATED = "undated"
+# the single collection used before partitioning; always searched while it exists
+LEGACY_COLLECTION = "main_collection"
+
+_PARTITION_NAME = re.compile(r"^news_(?:(?P<year>\d{4})(?:_(?P<month>\d{2}))?|undated)(?:__(?P<subkey>.+))?$")
+_UNSAFE = re.compile(r"[^A-Za-z0-9._-]")
+
+
+class Partition(NamedTuple):
+    name: str
+    start: Optional[int]  # epoch seconds, inclusive; None = undated / unbounded
+    end: Optional[int]    # epoch seconds, exclusive
+    subkey: Optional[str]
+
+
+def _epoch(year: int, month: int) -> int:
+    if month > 12:
+        year, month = year + 1, 1
+    return int(datetime(year, month, 1, tzinfo=timezone.utc).timestamp())
+
+
+def subkey(ticker: str) -> str:
+    # Chroma collection names only allow [A-Za-z0-9._-] (tickers can look like CRYPTO:BTC)
+    return _UNSAFE.sub("-", ticker.upper())
+
+
+def partition_names(metadata: Dict[str, Any], by_ticker: bool = False) -> List[str]:
+    """
+    Collections a chunk is written to: one per month of its publication date, and with
+    `by_ticker` one per (month, ticker) it mentions, so a ticker-scoped search only opens
+    that ticker's partitions.
+    """
+    published = metadata.get(PUBLISHED_AT_KEY) or 0
+    if published:
+        moment = datetime.fromtimestamp(published, tz=timezone.utc)
+        base = f"{PARTITION_PREFIX}{moment.year:04d}_{moment.month:02d}"
+    else:
+        base = f"{PARTITION_PREFIX}{UNDATED}"
+    tickers = [t for t in metadata.get(TICKERS_KEY, "").split(",") if t]
+    if not by_ticker or not tickers:
+        return [base]
+    return [f"{base}__{subkey(t)}" for t in tickers]
+
+
+def yearly_name(partition: Partition) -> str:
+    year = datetime.fromtimestamp(partition.start, tz=timezone.utc).year
+    return f"{PARTITION_PREFIX}{year:04d}" + (f"__{partition.subkey}" if partition.subkey else "")
+
+
+def parse_partition(name: str) -> Optional[Partition]:
+    """Time range and sub-key encoded in a collection name; None for non-partition collections"""
+    if name == LEGACY_COLLECTION:
+        return Partition(name, None, None, None)
+    match = _PARTITION_NAME.match(name)
+    if not match:
+        return None
+    year, month, sub = match.group("year"), match.group("month"), match.group("subkey")
+    if year is None:
+        return Partition(name, None, None, sub)
+    if month is None:
+        return Partition(name, _epoch(int(year), 1), _epoch(int(year) + 1, 1), sub)
+    return Partition(name, _epoch(int(year), int(month)), _epoch(int(year), int(month) + 1), sub)
+
+
+def filter_window(filters: Optional[MetadataFilters]) -> Tuple[Optional[int], Optional[int], Optional[str]]:
+    """(start, end, ticker) constraints expressed by search filters; `end` is exclusive"""
+    start = end = ticker = None
+    for f in (filters.filters if filters else []):
+        if isinstance(f, MetadataFilters):
+            continue
+        if f.key == PUBLISHED_AT_KEY and f.operator in (FilterOperator.GT, FilterOperator.GTE):
+            start = f.value if start is None else max(start, f.value)
+        elif f.key == PUBLISHED_AT_KEY and f.operator in (FilterOperator.LT, FilterOperator.LTE):
+            # normalised to an exclusive bound
+            bound = f.value if f.operator == FilterOperator.LT else f.value + 1
+            end = bound if end is None else min(end, bound)
+        elif f.key.startswith(TICKER_KEY_PREFIX) and f.operator == FilterOperator.EQ and f.value is True:
+            ticker = f.key[len(TICKER_KEY_PREFIX):]
+    return start, end, ticker
+
+
+def plan_partitions(
+    partitions: List[Partition], filters: Optional[MetadataFilters], by_ticker: bool = False
+) -> List[str]:
+    """
+    Partitions that can hold matches: those overlapping the date window (undated ones only
+    when there is no window), restricted to the ticker's sub-partitions when partitioned by ticker.
+    The legacy collection is always included; the filters still apply inside each partition.
+    """
+    start, end, ticker = filter_window(filters)
+    selected = []
+    for p in partitions:
+        if p.name == LEGACY_COLLECTION:
+            selected.append(p.name)
+            continue
+        if p.start is None:
+            if start is not None or end is not None:
+                continue
+        elif (start is not None and p.end <= start) or (end is not None and p.start >= end):
+            continue
+        if by_ticker and ticker and p.subkey is not None and p.subkey != subkey(ticker):
+            continue
+        selected.append(p.name)
+    return selected
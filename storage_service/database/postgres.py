@@ -1,6 +1,7 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import Column, Integer, String, Float, Date, JSON, UniqueConstraint
+from sqlalchemy import Column, Index, Integer, String, Float, Date, JSON, UniqueConstraint, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.declarative import declarative_base
 from config.settings import settings
 import logging
@@ -8,6 +9,7 @@ from datetime import datetime
 from sqlalchemy.exc import IntegrityError
 import enum
 from api.models import FinancialData
+from .query_cache import QueryResultCache
 
 
 logging.basicConfig(level=logging.INFO)
@@ -40,6 +42,43 @@ class StockPrice(Base):
 
 
 
+### per-ticker daily news sentiment, aggregated from the articles' ticker_sentiment entries at ingest
+class NewsSentimentDaily(Base):
+    __tablename__ = "news_sentiment_daily"
+    __table_args__ = (
+        UniqueConstraint("ticker", "date", name="uix_news_sentiment_ticker_date"),
+        {"schema": "public"},
+    )
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    ticker = Column(String(20), nullable=False)
+    date = Column(Date, nullable=False)
+    article_count = Column(Integer, nullable=False)
+    mean_score = Column(Float)  # mean ticker_sentiment_score
+    weighted_score = Column(Float)  # mean ticker_sentiment_score weighted by relevance_score
+    relevance_sum = Column(Float, nullable=False)  # weight total behind weighted_score
+
+
+### what each article counts towards news_sentiment_daily, one row per (article, ticker)
+class NewsSentimentArticle(Base):
+    __tablename__ = "news_sentiment_articles"
+    __table_args__ = (
+        Index("ix_news_sentiment_articles_ticker_date", "ticker", "date"),
+        {"schema": "public"},
+    )
+    url = Column(String, primary_key=True)
+    ticker = Column(String(20), primary_key=True)
+    date = Column(Date, nullable=False)
+    score = Column(Float, nullable=False)
+    relevance = Column(Float, nullable=False)
+
+# pg_advisory_xact_lock key serialising news sentiment writes
+SENTIMENT_LOCK_KEY = 0x6E657773
+
+
+
+
+
+
 class ReportType(enum.Enum):
     QUARTERLY = "Quarterly"
     ANNUAL = "Annual"
@@ -77,6 +116,19 @@ class AnnualStatement(BaseFinancialStatement):
 
 
 
+### cache of SELECT results, tagged with the write versions of the tables above
+query_cache = QueryResultCache(
+    tables=[table.name for table in Base.metadata.sorted_tables],
+    max_bytes=settings.QUERY_CACHE_MAX_BYTES,
+    disk_dir=settings.QUERY_CACHE_DISK_DIR,
+    disk_max_bytes=settings.QUERY_CACHE_DISK_MAX_BYTES,
+    enabled=settings.QUERY_CACHE_ENABLED,
+    versions_path=settings.QUERY_CACHE_VERSIONS_PATH,
+)
+
+
+
+
 async def save_stocks(stock_data):
    """Save stock data to PostgreSQL"""
    async with AsyncSessionLocal() as session:
@@ -104,6 +156,7 @@ async def save_stocks(stock_data):
            except Exception as e:
                await session.rollback()
                logger.error(f"Error saving stock data: {str(e)}")
+   query_cache.bump(StockPrice.__tablename__)
 
 
  
@@ -139,9 +192,87 @@ async def save_financials(financial_data: FinancialData):
             await session.rollback()
             logger.error(f"Error saving financial data: {str(e)}")
             raise
+        finally:
+            query_cache.bump(QuarterlyStatement.__tablename__, AnnualStatement.__tablename__)
 
 
 
+async def save_news_sentiment(articles, batch_size: int = 1000):
+    """
+    Replace the rows of `articles` {url: [(ticker, date, score, relevance), ...]} in news_sentiment_articles
+    and recompute the news_sentiment_daily rows of every (ticker, date) they counted towards, before or after.
+    Saving an article again replaces what it counted, so a re-applied or changed article is never counted twice.
+    Returns the days recomputed.
+    """
+    if not articles:
+        return 0
+    rows = [
+        {"url": url, "ticker": ticker, "date": day, "score": score, "relevance": relevance}
+        for url, entries in articles.items()
+        for ticker, day, score, relevance in entries
+    ]
+    urls = list(articles)
+    counted = NewsSentimentArticle.__table__.c
+    daily = NewsSentimentDaily.__table__.c
+    async with AsyncSessionLocal() as session:
+        try:
+            # one writer at a time: two batches recomputing the same day must see each other's rows
+            await session.execute(select(func.pg_advisory_xact_lock(SENTIMENT_LOCK_KEY)))
+            days = set()
+            for start in range(0, len(urls), batch_size):
+                removed = await session.execute(
+                    NewsSentimentArticle.__table__.delete()
+                    .where(counted.url.in_(urls[start:start + batch_size]))
+                    .returning(counted.ticker, counted.date)
+                )
+                days.update((ticker, day) for ticker, day in removed)
+            for start in range(0, len(rows), batch_size):
+                await session.execute(pg_insert(NewsSentimentArticle).values(rows[start:start + batch_size]))
+            days.update((row["ticker"], row["date"]) for row in rows)
+
+            days = list(days)
+            relevance = func.sum(counted.relevance)
+            for start in range(0, len(days), batch_size):
+                page = days[start:start + batch_size]
+                await session.execute(
+                    NewsSentimentDaily.__table__.delete().where(tuple_(daily.ticker, daily.date).in_(page))
+                )
+                await session.execute(
+                    NewsSentimentDaily.__table__.insert().from_select(
+                        ["ticker", "date", "article_count", "mean_score", "weighted_score", "relevance_sum"],
+                        select(
+                            counted.ticker,
+                            counted.date,
+                            func.count(),
+                            func.avg(counted.score),
+                            func.sum(counted.relevance * counted.score) / func.nullif(relevance, 0),
+                            relevance,
+                        )
+                        .where(tuple_(counted.ticker, counted.date).in_(page))
+                        .group_by(counted.ticker, counted.date),
+                    )
+                )
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error saving news sentiment: {str(e)}")
+            raise
+        finally:
+            query_cache.bump(NewsSentimentDaily.__tablename__, NewsSentimentArticle.__tablename__)
+    return len(days)
 
 
-        
+async def news_sentiment_needs_rebuild() -> bool:
+    """Days stored by versions that kept no per-article rows can't be recomputed until they are rebuilt"""
+    async with AsyncSessionLocal() as session:
+        has_days = (await session.execute(select(NewsSentimentDaily.id).limit(1))).first() is not None
+        has_articles = (await session.execute(select(NewsSentimentArticle.url).limit(1))).first() is not None
+    return has_days and not has_articles
+
+
+async def clear_news_sentiment():
+    async with AsyncSessionLocal() as session:
+        await session.execute(NewsSentimentDaily.__table__.delete())
+        await session.execute(NewsSentimentArticle.__table__.delete())
+        await session.commit()
+    query_cache.bump(NewsSentimentDaily.__tablename__, NewsSentimentArticle.__tablename__)
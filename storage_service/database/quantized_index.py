@@ -0,0 +1,227 @@
+import os
+import json
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_MODES = ("int8", "binary")
+
+# popcount of every byte value, for Hamming distances over packed sign bits
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+# rows scored per block in the first pass, to bound temporary memory
+_BLOCK_ROWS = 65536
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-vector scalar quantization: codes in [-127, 127] and one float scale per row"""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    """One sign bit per dimension, packed 8 to a byte"""
+    return np.packbits(vectors > 0, axis=1)
+
+
+class _GrowableArray:
+    """Row-appendable array with amortised O(1) appends (capacity doubles when full)"""
+
+    def __init__(self, data: np.ndarray):
+        self._buf = data
+        self.n = len(data)
+
+    def append(self, rows: np.ndarray):
+        if self.n + len(rows) > len(self._buf):
+            capacity = max(self.n + len(rows), 2 * len(self._buf), 1024)
+            grown = np.empty((capacity, *self._buf.shape[1:]), dtype=self._buf.dtype)
+            grown[:self.n] = self._buf[:self.n]
+            self._buf = grown
+        self._buf[self.n:self.n + len(rows)] = rows
+        self.n += len(rows)
+
+    @property
+    def view(self) -> np.ndarray:
+        return self._buf[:self.n]
+
+
+
+###COMPACT FIRST-PASS CODES IN MEMORY, FULL FLOAT32 VECTORS MEMORY-MAPPED FROM DISK
+class QuantizedIndex:
+    """
+    Append-only files in `directory`:
+      full.f32   float32 vectors, row-major (memory-mapped; only re-scored rows are paged in)
+      codes.bin  int8 codes (dim bytes/row) or packed sign bits (dim/8 bytes/row), held in RAM
+      scales.f32 per-row int8 scale, norms.f32 per-row L2 norm
+      ids.txt    node id of every row
+    A search scores every allowed row on the codes, keeps the best `top_k * rescore_factor`,
+    and re-scores those exactly (cosine) against the full vectors.
+    """
+
+    def __init__(self, directory: str, mode: str = "int8", rescore_factor: int = 10):
+        if mode not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode '{mode}'")
+        self.directory = directory
+        self.mode = mode
+        self.rescore_factor = rescore_factor
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._meta_path = os.path.join(directory, "meta.json")
+        self.dim: Optional[int] = None
+        self.node_ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._codes = self._scales = self._norms = None
+        self._full = None
+        self._load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @property
+    def _code_width(self) -> int:
+        return self.dim if self.mode == "int8" else (self.dim + 7) // 8
+
+    def _load(self):
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path) as f:
+            meta = json.load(f)
+        if meta["mode"] != self.mode:
+            raise ValueError(
+                f"{self.directory} holds {meta['mode']} codes; remove it to rebuild as {self.mode}"
+            )
+        self.dim = meta["dim"]
+        widths = {"full.f32": 4 * self.dim, "codes.bin": self._code_width, "scales.f32": 4, "norms.f32": 4}
+        for name in (*widths, "ids.txt"):
+            open(self._path(name), "ab").close()
+        with open(self._path("ids.txt")) as f:
+            ids = f.read().splitlines()
+        # a crash can leave one file a few rows ahead; keep only rows present in all of them
+        n = min(len(ids), *(os.path.getsize(self._path(name)) // width for name, width in widths.items()))
+        for name, width in widths.items():
+            with open(self._path(name), "r+b") as f:
+                f.truncate(n * width)
+        if len(ids) != n:
+            ids = ids[:n]
+            with open(self._path("ids.txt"), "w") as f:
+                f.write("".join(f"{i}\n" for i in ids))
+        self.node_ids = ids
+        self._rows = {node_id: row for row, node_id in enumerate(ids)}
+        code_dtype = np.int8 if self.mode == "int8" else np.uint8
+        self._codes = _GrowableArray(np.fromfile(self._path("codes.bin"), dtype=code_dtype).reshape(n, self._code_width))
+        self._scales = _GrowableArray(np.fromfile(self._path("scales.f32"), dtype=np.float32))
+        self._norms = _GrowableArray(np.fromfile(self._path("norms.f32"), dtype=np.float32))
+        self._map_full()
+        logger.info(f"Loaded {n} {self.mode} codes from {self.directory}")
+
+    def _map_full(self):
+        n = len(self.node_ids)
+        self._full = np.memmap(self._path("full.f32"), dtype=np.float32, mode="r", shape=(n, self.dim)) if n else None
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def memory_bytes(self) -> int:
+        """RAM held by the first-pass structures (the full vectors are only mapped)"""
+        if self._codes is None:
+            return 0
+        return self._codes.view.nbytes + self._scales.view.nbytes + self._norms.view.nbytes
+
+    def add(self, items: Iterable[Tuple[str, List[float]]]) -> int:
+        """Append (node_id, embedding) pairs; ids already present are skipped"""
+        with self._lock:
+            fresh = [(node_id, vector) for node_id, vector in items if node_id not in self._rows]
+            fresh = list(dict(fresh).items())
+            if not fresh:
+                return 0
+            vectors = np.asarray([vector for _, vector in fresh], dtype=np.float32)
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                with open(self._meta_path, "w") as f:
+                    json.dump({"mode": self.mode, "dim": self.dim}, f)
+            norms = np.linalg.norm(vectors, axis=1).astype(np.float32)
+            if self.mode == "int8":
+                codes, scales = quantize_int8(vectors)
+            else:
+                codes, scales = quantize_binary(vectors), np.ones(len(vectors), dtype=np.float32)
+
+            # ids last: rows without an id are dropped on the next load
+            for name, data in (("full.f32", vectors), ("codes.bin", codes), ("scales.f32", scales), ("norms.f32", norms)):
+                with open(self._path(name), "ab") as f:
+                    f.write(data.tobytes())
+            with open(self._path("ids.txt"), "a") as f:
+                f.write("".join(f"{node_id}\n" for node_id, _ in fresh))
+
+            start = len(self.node_ids)
+            self.node_ids.extend(node_id for node_id, _ in fresh)
+            self._rows.update({node_id: start + i for i, (node_id, _) in enumerate(fresh)})
+            if self._codes is None:
+                self._codes, self._scales, self._norms = _GrowableArray(codes), _GrowableArray(scales), _GrowableArray(norms)
+            else:
+                self._codes.append(codes)
+                self._scales.append(scales)
+                self._norms.append(norms)
+            self._map_full()
+            return len(fresh)
+
+    def _first_pass(self, codes: np.ndarray, scales: np.ndarray, query: np.ndarray,
+                    rows: Optional[np.ndarray]) -> np.ndarray:
+        """Approximate scores (higher is better) of `rows` (all rows when None), block by block"""
+        total = len(codes) if rows is None else len(rows)
+        scores = np.empty(total, dtype=np.float32)
+        if self.mode == "int8":
+            q_codes, q_scale = quantize_int8(query[None, :])
+            q = q_codes[0].astype(np.float32)
+        else:
+            q_bits = quantize_binary(query[None, :])[0]
+        for start in range(0, total, _BLOCK_ROWS):
+            block = slice(start, start + _BLOCK_ROWS)
+            index = block if rows is None else rows[block]
+            if self.mode == "int8":
+                scores[block] = (codes[index].astype(np.float32) @ q) * scales[index] * q_scale[0]
+            else:
+                scores[block] = -_POPCOUNT[np.bitwise_xor(codes[index], q_bits)].sum(axis=1, dtype=np.int32)
+        return scores
+
+    def search(
+        self, query: List[float], top_k: int, allowed_ids: Optional[Iterable[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """Top `top_k` (node_id, cosine similarity), restricted to `allowed_ids` when given"""
+        with self._lock:
+            if self._codes is None or top_k <= 0:
+                return []
+            # consistent snapshot; appends after this point are not seen by this search
+            codes, scales, norms = self._codes.view, self._scales.view, self._norms.view
+            full, node_ids, row_of = self._full, self.node_ids, self._rows
+        rows = None
+        if allowed_ids is not None:
+            rows = np.fromiter((row_of[i] for i in allowed_ids if i in row_of), dtype=np.int64)
+            if not len(rows):
+                return []
+        q = np.asarray(query, dtype=np.float32)
+
+        approx = self._first_pass(codes, scales, q, rows)
+        shortlist = min(len(approx), top_k * self.rescore_factor)
+        best = np.argpartition(-approx, shortlist - 1)[:shortlist]
+        candidates = best if rows is None else rows[best]
+        candidates.sort()  # sequential reads from the memory map
+
+        exact = (full[candidates] @ q) / (norms[candidates] * (np.linalg.norm(q) or 1.0))
+        order = np.argsort(-exact)[:top_k]
+        return [(node_ids[candidates[i]], float(exact[i])) for i in order]
+
+    def summary(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "vectors": len(self),
+            "dim": self.dim,
+            "rescore_factor": self.rescore_factor,
+            "first_pass_bytes": self.memory_bytes(),
+            "full_vectors_bytes_on_disk": len(self) * (self.dim or 0) * 4,
+        }
@@ -0,0 +1,319 @@
+import os
+import re
+import pickle
+import hashlib
+import json
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# quoted literals / identifiers are kept verbatim when normalising SQL
+_QUOTED = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+
+# results of queries using these can change without any table write
+_VOLATILE = re.compile(
+    r"\b(now|random|clock_timestamp|statement_timestamp|timeofday|current_date|"
+    r"current_time|current_timestamp|localtime|localtimestamp|nextval|setval)\b"
+)
+
+
+# rows pickled to estimate a result's size; the others are taken to be alike
+SIZE_SAMPLE_ROWS = 256
+
+
+def estimate_size(columns: List[str], rows: List[Tuple[Any, ...]]) -> int:
+    """Pickled size of a result, extrapolated from its first SIZE_SAMPLE_ROWS rows"""
+    sample = rows[:SIZE_SAMPLE_ROWS]
+    size = len(pickle.dumps((list(columns), sample), protocol=pickle.HIGHEST_PROTOCOL))
+    return size * len(rows) // len(sample) if sample else size
+
+
+def normalize_sql(query: str) -> str:
+    """Canonical cache key for a SQL statement: whitespace collapsed, keywords and
+    unquoted identifiers lower-cased, trailing semicolons dropped."""
+    parts = _QUOTED.split(query.strip().rstrip(";").strip())
+    normalized = []
+    for i, part in enumerate(parts):
+        if i % 2:
+            normalized.append(part)
+        else:
+            normalized.append(re.sub(r"\s+", " ", part).lower())
+    return "".join(normalized).strip()
+
+
+@dataclass
+class CachedResult:
+    columns: List[str]
+    rows: List[Tuple[Any, ...]]
+    versions: Dict[str, int]
+    size: int = 0
+
+
+
+###LRU RESULT CACHE, INVALIDATED BY PER-TABLE WRITE VERSIONS
+class QueryResultCache:
+    """
+    `get` and `put` are thread-safe and may read or write the disk tier, so request
+    handlers call them through `asyncio.to_thread` rather than on the event loop.
+    """
+
+    def __init__(
+        self,
+        tables: Iterable[str],
+        max_bytes: int,
+        disk_dir: Optional[str] = None,
+        disk_max_bytes: int = 0,
+        enabled: bool = True,
+        versions_path: Optional[str] = None,
+    ):
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir or None
+        self.disk_max_bytes = disk_max_bytes
+
+        # "*" is bumped for statements we can't attribute to a table (DDL, ad-hoc DML)
+        self._versions: Dict[str, int] = {name: 0 for name in tables}
+        self._versions["*"] = 0
+
+        self._entries: "OrderedDict[str, CachedResult]" = OrderedDict()
+        self._bytes = 0
+        self._disk_index: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "stale": 0, "evictions": 0, "uncacheable": 0}
+        self._lock = threading.RLock()
+
+        if self.disk_dir:
+            self._load_disk_tier()
+
+        # with several worker processes, table versions live in a shared SQLite file so a write
+        # handled by one worker invalidates the cached results of all of them
+        self._shared = None
+        if versions_path:
+            self._open_shared_versions(versions_path)
+
+    ### which tracked tables a statement reads (over-approximated by name match)
+    def tables_for(self, key: str) -> List[str]:
+        return [name for name in self._versions if name != "*" and re.search(rf"\b{re.escape(name)}\b", key)]
+
+    def cacheable(self, key: str) -> bool:
+        return self.enabled and not _VOLATILE.search(key)
+
+    def snapshot(self, query: str) -> Dict[str, int]:
+        """Table versions to tag a result with. Taken *before* the query runs so a write
+        landing mid-query leaves the entry already stale."""
+        self._sync_versions()
+        key = normalize_sql(query)
+        versions = {name: self._versions[name] for name in self.tables_for(key)}
+        versions["*"] = self._versions["*"]
+        return versions
+
+    def _is_fresh(self, entry: CachedResult) -> bool:
+        return all(self._versions.get(name, 0) == version for name, version in entry.versions.items())
+
+    def get(self, query: str) -> Optional[CachedResult]:
+        key = normalize_sql(query)
+        if not self.cacheable(key):
+            self.stats["uncacheable"] += 1
+            return None
+        self._sync_versions()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._is_fresh(entry):
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry
+                self._drop(key)
+                self.stats["stale"] += 1
+
+            entry = self._read_disk(key)
+            if entry is not None:
+                if self._is_fresh(entry):
+                    self.stats["disk_hits"] += 1
+                    self._insert(key, entry)
+                    return entry
+                self._remove_disk(key)
+                self.stats["stale"] += 1
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, query: str, columns: List[str], rows: List[Tuple[Any, ...]], versions: Dict[str, int]):
+        key = normalize_sql(query)
+        if not self.cacheable(key):
+            return
+        entry = CachedResult(columns=list(columns), rows=rows, versions=versions)
+        self._sync_versions()
+        if not self._is_fresh(entry):
+            return  # a write landed while the query was running
+        entry.size = estimate_size(entry.columns, entry.rows)
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            self._insert(key, entry)
+
+    def bump(self, *tables: str):
+        """Record a write to the given tables, invalidating every cached result that reads them"""
+        if self._shared is not None:
+            with self._shared_lock:
+                self._shared.executemany(
+                    "INSERT INTO versions (name, version) VALUES (?, 1) "
+                    "ON CONFLICT (name) DO UPDATE SET version = version + 1",
+                    [(name,) for name in tables],
+                )
+                self._shared.commit()
+            self._sync_versions(force=True)
+        else:
+            for name in tables:
+                self._versions[name] = self._versions.get(name, 0) + 1
+        self._persist_versions()
+
+    def invalidate_all(self):
+        self.bump("*")
+
+    def table_versions(self) -> Dict[str, int]:
+        self._sync_versions()
+        return dict(self._versions)
+
+    ### versions shared between processes
+    def _open_shared_versions(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._shared = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._shared.execute("PRAGMA journal_mode=WAL")
+        self._shared.execute("CREATE TABLE IF NOT EXISTS versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+        # never move a version backwards (the disk tier may hold entries tagged with later ones)
+        self._shared.executemany(
+            "INSERT INTO versions (name, version) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET version = max(version, excluded.version)",
+            list(self._versions.items()),
+        )
+        self._shared.commit()
+        self._shared_lock = threading.Lock()
+        self._data_version = None
+        self._sync_versions(force=True)
+
+    def _sync_versions(self, force: bool = False):
+        """Pick up versions bumped by other processes; a no-op unless the file changed"""
+        if self._shared is None:
+            return
+        with self._shared_lock:
+            # data_version changes whenever another connection commits to the file
+            data_version = self._shared.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version and not force:
+                return
+            self._data_version = data_version
+            self._versions.update(self._shared.execute("SELECT name, version FROM versions").fetchall())
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "disk_entries": len(self._disk_index),
+            "disk_bytes": self._disk_bytes,
+            "table_versions": dict(self._versions),
+            **self.stats,
+        }
+
+    ### memory tier
+    def _insert(self, key: str, entry: CachedResult):
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes and self._entries:
+            old_key, old_entry = self._entries.popitem(last=False)
+            self._bytes -= old_entry.size
+            self.stats["evictions"] += 1
+            if self._is_fresh(old_entry):
+                self._write_disk(old_key, old_entry)
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    ### optional disk tier, filled with entries spilled from memory
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, hashlib.sha256(key.encode()).hexdigest() + ".pkl")
+
+    def _load_disk_tier(self):
+        os.makedirs(self.disk_dir, exist_ok=True)
+        versions_path = os.path.join(self.disk_dir, "versions.json")
+        if os.path.exists(versions_path):
+            with open(versions_path) as f:
+                self._versions.update(json.load(f))
+
+        files = [
+            os.path.join(self.disk_dir, name)
+            for name in os.listdir(self.disk_dir) if name.endswith(".pkl")
+        ]
+        for path in sorted(files, key=os.path.getmtime):
+            try:
+                with open(path, "rb") as f:
+                    key = pickle.load(f)
+            except Exception:
+                os.remove(path)
+                continue
+            size = os.path.getsize(path)
+            self._disk_index[key] = size
+            self._disk_bytes += size
+        logger.info(f"Loaded {len(self._disk_index)} cached query results from {self.disk_dir}")
+
+    def _persist_versions(self):
+        if not self.disk_dir:
+            return
+        path = os.path.join(self.disk_dir, "versions.json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._versions, f)
+        os.replace(tmp_path, path)
+
+    def _write_disk(self, key: str, entry: CachedResult):
+        if not self.disk_dir or entry.size > self.disk_max_bytes:
+            return
+        path = self._disk_path(key)
+        with open(path, "wb") as f:
+            # key goes first on its own so startup only has to read the header
+            pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump((entry.versions, entry.columns, entry.rows, entry.size), f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._remove_disk(key, delete_file=False)
+        size = os.path.getsize(path)
+        self._disk_index[key] = size
+        self._disk_bytes += size
+        while self._disk_bytes > self.disk_max_bytes and self._disk_index:
+            self._remove_disk(next(iter(self._disk_index)))
+
+    def _read_disk(self, key: str) -> Optional[CachedResult]:
+        if key not in self._disk_index:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                pickle.load(f)
+                versions, columns, rows, size = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Dropping unreadable cached query result: {str(e)}")
+            self._remove_disk(key)
+            return None
+        self._remove_disk(key)  # promoted back into memory
+        return CachedResult(columns=columns, rows=rows, versions=versions, size=size)
+
+    def _remove_disk(self, key: str, delete_file: bool = True):
+        size = self._disk_index.pop(key, None)
+        if size is None:
+            return
+        self._disk_bytes -= size
+        if delete_file:
+            try:
+                os.remove(self._disk_path(key))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,245 @@
+import re
+import time
+import json
+import asyncio
+import logging
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import text as sql_text
+
+from config.settings import settings
+from .postgres import AsyncSessionLocal, Base
+from .query_cache import normalize_sql
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# tables the index advisor looks at
+ADVISED_TABLES = ("stock_prices", "quarterly_statements", "annual_statements", "news_sentiment_daily")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w\"$])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_PREDICATE = re.compile(
+    r"\b(?:where|and|or|on)\s+\(?\s*(?:[a-z_]\w*\.)?(\"[^\"]+\"|[a-z_]\w*)\s*"
+    r"(=|<>|!=|<=|>=|<|>|between\b|in\b|like\b|ilike\b)"
+)
+_ORDER_BY = re.compile(r"\border by\s+(?:[a-z_]\w*\.)?(\"[^\"]+\"|[a-z_]\w*)")
+
+EQUALITY_OPS = {"=", "in"}
+RANGE_OPS = {"<", ">", "<=", ">=", "between"}
+
+
+def fingerprint(query: str) -> str:
+    """Normalised query with literals replaced by `?`, so runs differing only in
+    tickers, dates or numbers share one entry"""
+    fp = normalize_sql(query)
+    fp = _STRING_LITERAL.sub("?", fp)
+    fp = _NUMBER_LITERAL.sub("?", fp)
+    return _IN_LIST.sub("(?, ...)", fp)
+
+
+def _covers(index: List[str], equality: List[str], ranges: List[str]) -> bool:
+    """An index serves the predicates if its leading columns are the equality columns
+    (in any order) followed by the range column"""
+    lead = index[:len(equality)]
+    return set(lead) == set(equality) and index[len(equality):len(equality) + len(ranges)] == ranges
+
+
+@dataclass
+class FingerprintStats:
+    fingerprint: str
+    sample_query: str
+    tables: List[str]
+    calls: int = 0
+    cache_hits: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    rows: int = 0
+    slow_calls: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    last_error: Optional[str] = None
+    last_seen: float = 0.0
+    predicates: Counter = field(default_factory=Counter)
+    explain_sample: Optional[Dict[str, Any]] = None
+    explain_sampled_at: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        executed = self.calls - self.cache_hits
+        return {
+            "fingerprint": self.fingerprint,
+            "sample_query": self.sample_query,
+            "tables": self.tables,
+            "calls": self.calls,
+            "cache_hits": self.cache_hits,
+            "total_ms": round(self.total_ms, 2),
+            "mean_ms": round(self.total_ms / executed, 2) if executed else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "mean_rows": round(self.rows / self.calls, 1) if self.calls else 0.0,
+            "slow_calls": self.slow_calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "last_error": self.last_error,
+            "last_seen": self.last_seen,
+            "predicates": [
+                {"column": column, "op": op, "count": count}
+                for (column, op), count in self.predicates.most_common()
+            ],
+            "explain_sample": self.explain_sample,
+        }
+
+
+
+###PER-FINGERPRINT TIMING OF /search/sql AND INDEX SUGGESTIONS FROM OBSERVED PREDICATES
+class QueryLog:
+    def __init__(self, table_columns: Dict[str, List[str]], max_fingerprints: int = 1000):
+        self.table_columns = table_columns
+        self.max_fingerprints = max_fingerprints
+        self._stats: "OrderedDict[str, FingerprintStats]" = OrderedDict()
+        # running plan samples, referenced until they finish so they are not garbage-collected
+        self._samples: Set[asyncio.Task] = set()
+
+    def _tables_for(self, key: str) -> List[str]:
+        return [name for name in self.table_columns if re.search(rf"\b{name}\b", key)]
+
+    def _entry(self, query: str) -> FingerprintStats:
+        fp = fingerprint(query)
+        entry = self._stats.get(fp)
+        if entry is None:
+            key = normalize_sql(query)
+            entry = FingerprintStats(fingerprint=fp, sample_query=query, tables=self._tables_for(key))
+            for column, op in _PREDICATE.findall(key):
+                entry.predicates[(column.strip('"'), op.strip())] += 1
+            for column in _ORDER_BY.findall(key):
+                entry.predicates[(column.strip('"'), "order by")] += 1
+            self._stats[fp] = entry
+            while len(self._stats) > self.max_fingerprints:
+                self._stats.popitem(last=False)
+        self._stats.move_to_end(fp)
+        return entry
+
+    def record(self, query: str, latency_ms: float, rows: int, cache_hit: bool = False, error: Optional[str] = None):
+        """`error`: why the statement did not return rows ("query_timeout", a guard rejection or "error")"""
+        entry = self._entry(query)
+        entry.calls += 1
+        entry.rows += rows
+        entry.last_seen = time.time()
+        if cache_hit:
+            entry.cache_hits += 1
+            return
+        entry.total_ms += latency_ms
+        entry.max_ms = max(entry.max_ms, latency_ms)
+        if error:
+            entry.errors += 1
+            entry.timeouts += error == "query_timeout"
+            entry.last_error = error
+
+        if latency_ms >= settings.SLOW_QUERY_MS:
+            entry.slow_calls += 1
+            logger.warning(f"Slow query ({latency_ms:.0f} ms, {rows} rows{', ' + error if error else ''}): {entry.fingerprint}")
+            resample_after = entry.explain_sampled_at + settings.SLOW_QUERY_EXPLAIN_INTERVAL_S
+            # a failed or timed-out statement would only fail again under EXPLAIN ANALYZE
+            if settings.SLOW_QUERY_EXPLAIN_ANALYZE and not error and time.time() >= resample_after:
+                entry.explain_sampled_at = time.time()
+                task = asyncio.create_task(self._sample_plan(entry, query))
+                self._samples.add(task)
+                task.add_done_callback(self._samples.discard)
+
+    async def _sample_plan(self, entry: FingerprintStats, query: str):
+        """EXPLAIN (ANALYZE, BUFFERS) re-runs the query, so it is done off the request path,
+        read-only and under the same statement_timeout"""
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(sql_text("SET TRANSACTION READ ONLY"))
+                await session.execute(sql_text(f"SET LOCAL statement_timeout = {int(settings.SQL_STATEMENT_TIMEOUT_MS)}"))
+                result = await session.execute(
+                    sql_text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query.strip().rstrip(';')}")
+                )
+                plan = result.scalar()
+                await session.rollback()
+            entry.explain_sample = json.loads(plan)[0] if isinstance(plan, str) else plan[0]
+        except Exception as e:
+            logger.warning(f"Could not sample plan for slow query: {str(e)}")
+
+    def top(self, limit: int = 20, order_by: str = "total_ms") -> List[Dict[str, Any]]:
+        entries = [entry.to_dict() for entry in self._stats.values()]
+        return sorted(entries, key=lambda e: e.get(order_by, 0), reverse=True)[:limit]
+
+    def reset(self):
+        self._stats.clear()
+
+    async def _existing_indexes(self) -> Dict[str, List[List[str]]]:
+        """Column lists of the current indexes on the advised tables"""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                sql_text(
+                    "SELECT tablename, indexdef FROM pg_indexes "
+                    "WHERE schemaname = 'public' AND tablename = ANY(:tables)"
+                ),
+                {"tables": list(self.table_columns)},
+            )
+            indexes: Dict[str, List[List[str]]] = {}
+            for table, indexdef in result.fetchall():
+                columns = indexdef[indexdef.rindex("(") + 1:indexdef.rindex(")")]
+                indexes.setdefault(table, []).append([c.strip().strip('"') for c in columns.split(",")])
+            return indexes
+
+    async def suggest_indexes(self) -> List[Dict[str, Any]]:
+        """
+        Weight every (table, column, op) predicate by the time its fingerprints spent in Postgres,
+        and propose btree indexes with equality columns first and one range/order column last,
+        skipping any already covered by the leading columns of an existing index.
+        """
+        existing = await self._existing_indexes()
+        weights: Dict[str, Dict[str, Dict[str, float]]] = {}
+        supporting: Dict[str, List[str]] = {}
+        for entry in self._stats.values():
+            if not entry.total_ms:
+                continue
+            for table in entry.tables:
+                columns = self.table_columns[table]
+                for (column, op), _ in entry.predicates.items():
+                    if column not in columns:
+                        continue
+                    kind = "equality" if op in EQUALITY_OPS else "range" if op in RANGE_OPS or op == "order by" else None
+                    if kind is None:
+                        continue
+                    table_weights = weights.setdefault(table, {"equality": {}, "range": {}})
+                    table_weights[kind][column] = table_weights[kind].get(column, 0.0) + entry.total_ms
+                    supporting.setdefault(table, []).append(entry.fingerprint)
+
+        suggestions = []
+        for table, table_weights in weights.items():
+            equality = sorted(table_weights["equality"], key=table_weights["equality"].get, reverse=True)
+            ranges = [c for c in sorted(table_weights["range"], key=table_weights["range"].get, reverse=True) if c not in equality]
+            columns = equality + ranges[:1]
+            if not columns:
+                continue
+            if any(_covers(index, equality, ranges[:1]) for index in existing.get(table, [])):
+                continue
+            fingerprints = list(dict.fromkeys(supporting[table]))
+            suggestions.append({
+                "table": table,
+                "columns": columns,
+                "statement": (
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_{'_'.join(columns)} "
+                    f"ON public.{table} ({', '.join(columns)});"
+                ),
+                "weighted_ms": round(
+                    sum(table_weights["equality"].get(c, 0.0) + table_weights["range"].get(c, 0.0) for c in columns), 2
+                ),
+                "supporting_fingerprints": fingerprints[:10],
+            })
+        return sorted(suggestions, key=lambda s: s["weighted_ms"], reverse=True)
+
+
+query_log = QueryLog(
+    table_columns={
+        table.name: [column.name for column in table.columns]
+        for table in Base.metadata.sorted_tables if table.name in ADVISED_TABLES
+    },
+    max_fingerprints=settings.SLOW_QUERY_MAX_FINGERPRINTS,
+)
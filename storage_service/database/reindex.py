@@ -0,0 +1,234 @@
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+from config.settings import settings
+from .index_manager import index_manager, new_generation
+from .mongodb_atlas import article_document, legacy_news_collection, migrate_legacy_news, news_collection
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RUNNING = "running"
+SWITCHED = "switched"
+FAILED = "failed"
+
+# fields article_document reads (plus _id, the resume cursor)
+ARTICLE_FIELDS = {
+    "url": 1, "summary": 1, "title": 1, "source": 1, "time_published": 1,
+    "overall_sentiment_label": 1, "overall_sentiment_score": 1, "ticker_sentiment": 1,
+}
+
+
+
+###CHECKPOINTS OF NEWS INDEX REBUILDS, ONE ROW PER GENERATION
+class ReindexState:
+    """
+    `cursor` is the MongoDB _id of the last article of the last page that is fully written
+    together with every page before it; a resumed rebuild continues after it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                generation TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                status TEXT NOT NULL,
+                cursor TEXT,
+                articles INTEGER NOT NULL DEFAULT 0,
+                chunks INTEGER NOT NULL DEFAULT 0,
+                started_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                previous TEXT,
+                error TEXT
+            )
+            """
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def create(self, generation: str, model: str) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO runs (generation, model, status, started_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (generation, model, RUNNING, now, now),
+            )
+            self._conn.commit()
+        return self.get(generation)
+
+    def get(self, generation: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM runs WHERE generation = ?", (generation,)).fetchone()
+        return dict(row) if row else None
+
+    def checkpoint(self, generation: str, cursor: str, articles: int, chunks: int):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE runs SET cursor = ?, articles = ?, chunks = ?, updated_at = ? WHERE generation = ?",
+                (cursor, articles, chunks, time.time(), generation),
+            )
+            self._conn.commit()
+
+    def set_status(self, generation: str, status: str, previous: Optional[str] = None, error: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE runs SET status = ?, previous = coalesce(?, previous), error = ?, updated_at = ? "
+                "WHERE generation = ?",
+                (status, previous, error, time.time(), generation),
+            )
+            self._conn.commit()
+
+    def unfinished(self) -> Optional[Dict[str, Any]]:
+        """The latest run that was interrupted (still marked running)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM runs WHERE status = ? ORDER BY started_at DESC LIMIT 1", (RUNNING,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def latest(self, limit: int = 10) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM runs ORDER BY started_at DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+
+
+###REBUILDS THE NEWS VECTOR INDEX FROM MONGODB INTO A NEW GENERATION, THEN SWITCHES TO IT
+class Reindexer:
+    """
+    Articles are streamed from MongoDB in _id order, REINDEX_PAGE_SIZE at a time; up to
+    REINDEX_WORKERS pages are chunked and embedded concurrently (REINDEX_BATCH_SIZE texts per
+    embedding request) and written to the new generation's collections. Searches and ingest
+    keep using the live generation until the rebuild is complete.
+    """
+
+    def __init__(self, state: ReindexState):
+        self.state = state
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, model: Optional[str] = None, batch_size: Optional[int] = None,
+              workers: Optional[int] = None) -> Dict[str, Any]:
+        if self.running:
+            raise RuntimeError("A reindex is already running")
+        run = self.state.create(new_generation(), model or settings.EMBEDDING_MODEL)
+        self._task = asyncio.create_task(self._run(run, batch_size, workers, fresh=True))
+        logger.info(f"Started reindex into generation {run['generation']} with {run['model']}")
+        return run
+
+    def resume(self, generation: Optional[str] = None, batch_size: Optional[int] = None,
+               workers: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Continue an interrupted run (or the given failed one) from its checkpoint"""
+        if self.running:
+            raise RuntimeError("A reindex is already running")
+        run = self.state.get(generation) if generation else self.state.unfinished()
+        if run is None or run["status"] == SWITCHED:
+            return None
+        self.state.set_status(run["generation"], RUNNING)
+        self._task = asyncio.create_task(self._run(run, batch_size, workers, fresh=False))
+        logger.info(f"Resuming reindex of generation {run['generation']} after {run['articles']} articles")
+        return run
+
+    async def stop(self):
+        """Pause: the run stays marked running and resumes from its checkpoint on the next start"""
+        if self.running:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self, run: Dict[str, Any], batch_size: Optional[int], workers: Optional[int], fresh: bool):
+        generation, model = run["generation"], run["model"]
+        try:
+            if fresh and await legacy_news_collection.estimated_document_count():
+                # articles stored before they were flattened would otherwise be missed
+                await migrate_legacy_news()
+            embed_model = index_manager.embedding_model(model, batch_size or settings.REINDEX_BATCH_SIZE)
+            quantized = index_manager.quantized_index(generation)
+            await self._copy(generation, embed_model, quantized, workers or settings.REINDEX_WORKERS)
+
+            async def catch_up():
+                # articles stored while the rebuild ran; ingest is paused by the write lock meanwhile
+                await self._copy(generation, embed_model, quantized, 1)
+
+            previous = await index_manager.switch_generation(generation, model, quantized, catch_up)
+            self.state.set_status(generation, SWITCHED, previous=previous)
+            logger.info(f"Reindex of generation {generation} complete; previous generation '{previous}' kept")
+        except asyncio.CancelledError:
+            logger.info(f"Reindex of generation {generation} paused; it resumes from its checkpoint")
+            raise
+        except Exception as e:
+            logger.error(f"Reindex of generation {generation} failed: {str(e)}")
+            self.state.set_status(generation, FAILED, error=str(e))
+
+    async def _copy(self, generation: str, embed_model, quantized, workers: int):
+        """Copy every article after the checkpoint into the generation, checkpointing in page order"""
+        saved = self.state.get(generation)
+        cursor, articles, chunks = saved["cursor"], saved["articles"], saved["chunks"]
+        query = {"_id": {"$gt": ObjectId(cursor)}} if cursor else {}
+        page_size = settings.REINDEX_PAGE_SIZE
+        pages: asyncio.Queue = asyncio.Queue(maxsize=2 * workers)
+        write_lock = asyncio.Lock()
+        done = {}
+        next_page = 0
+
+        async def read():
+            number, page = 0, []
+            async for article in news_collection.find(query, ARTICLE_FIELDS).sort("_id", 1).batch_size(page_size):
+                page.append(article)
+                if len(page) == page_size:
+                    await pages.put((number, page))
+                    number, page = number + 1, []
+            if page:
+                await pages.put((number, page))
+            for _ in range(workers):
+                await pages.put(None)
+
+        async def work():
+            nonlocal next_page, cursor, articles, chunks
+            while (item := await pages.get()) is not None:
+                number, page = item
+                nodes = await index_manager.embed_documents([article_document(a) for a in page], embed_model)
+                async with write_lock:
+                    await asyncio.to_thread(index_manager.write_generation, generation, nodes, quantized)
+                done[number] = (str(page[-1]["_id"]), len(page), len(nodes))
+                # pages finish out of order; the checkpoint only moves past a contiguous prefix
+                if next_page in done:
+                    while next_page in done:
+                        cursor, page_articles, page_chunks = done.pop(next_page)
+                        articles, chunks, next_page = articles + page_articles, chunks + page_chunks, next_page + 1
+                    self.state.checkpoint(generation, cursor, articles, chunks)
+
+        tasks = [asyncio.create_task(read()), *[asyncio.create_task(work()) for _ in range(workers)]]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def summary(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "live": {"generation": index_manager.generation, "model": index_manager.model},
+            "articles_in_mongodb": await news_collection.estimated_document_count(),
+            "runs": self.state.latest(),
+            "generations": await asyncio.to_thread(index_manager.generations),
+        }
+
+
+reindexer = Reindexer(ReindexState(settings.REINDEX_STATE_PATH))
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text as sql_text
+
+from .postgres import AsyncSessionLocal, query_cache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_ROWS = 3
+DATE_COLUMNS = ("date", "report_date")
+# bookkeeping tables the agents have no use for (news_sentiment_batches: left over from earlier versions)
+INTERNAL_TABLES = ("news_sentiment_articles", "news_sentiment_batches")
+
+
+
+###PRECOMPUTED DESCRIPTION OF THE PUBLIC SCHEMA, SERVED FROM MEMORY
+class SchemaCatalog:
+    def __init__(self, schema: str = "public"):
+        self.schema = schema
+        self._catalog: Dict[str, Any] = {}
+        self._versions: Optional[Dict[str, int]] = None
+        self._lock = asyncio.Lock()
+
+    def is_stale(self) -> bool:
+        """Stale until first built, and after any write bumps a table version"""
+        return self._versions != query_cache.table_versions()
+
+    def invalidate(self):
+        """Force a rebuild on next access (e.g. after a schema change)"""
+        self._versions = None
+
+    async def get(self, tables: Optional[List[str]] = None) -> Dict[str, Any]:
+        if self.is_stale():
+            async with self._lock:
+                if self.is_stale():
+                    await self.rebuild()
+        if not tables:
+            return self._catalog
+        return {
+            **self._catalog,
+            "tables": {name: info for name, info in self._catalog["tables"].items() if name in tables},
+        }
+
+    async def rebuild(self):
+        versions = query_cache.table_versions()
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                sql_text(
+                    """
+                    SELECT table_name, column_name, data_type, is_nullable
+                    FROM information_schema.columns
+                    WHERE table_schema = :schema AND table_name <> ALL(:internal)
+                    ORDER BY table_name, ordinal_position
+                    """
+                ),
+                {"schema": self.schema, "internal": list(INTERNAL_TABLES)},
+            )
+            tables: Dict[str, Dict[str, Any]] = {}
+            for table_name, column_name, data_type, is_nullable in result.fetchall():
+                table = tables.setdefault(table_name, {"columns": []})
+                table["columns"].append(
+                    {"name": column_name, "type": data_type, "nullable": is_nullable == "YES"}
+                )
+
+            for table_name, table in tables.items():
+                qualified = f'"{self.schema}"."{table_name}"'
+                column_names = [c["name"] for c in table["columns"]]
+
+                count = await session.execute(sql_text(f"SELECT count(*) FROM {qualified}"))
+                table["row_count"] = count.scalar()
+
+                sample = await session.execute(sql_text(f"SELECT * FROM {qualified} LIMIT {SAMPLE_ROWS}"))
+                table["sample_rows"] = [dict(r._mapping) for r in sample.fetchall()]
+
+                date_column = next((c for c in DATE_COLUMNS if c in column_names), None)
+                if "ticker" in column_names and date_column:
+                    ranges = await session.execute(
+                        sql_text(
+                            f'SELECT ticker, min("{date_column}"), max("{date_column}"), count(*) '
+                            f"FROM {qualified} GROUP BY ticker ORDER BY ticker"
+                        )
+                    )
+                    table["date_column"] = date_column
+                    table["ticker_ranges"] = {
+                        ticker: {"min_date": min_date, "max_date": max_date, "rows": rows}
+                        for ticker, min_date, max_date, rows in ranges.fetchall()
+                    }
+
+        self._catalog = {
+            "schema": self.schema,
+            "built_at": datetime.utcnow().isoformat(),
+            "tables": tables,
+        }
+        self._versions = versions
+        logger.info(f"Schema catalog rebuilt with {len(tables)} tables")
+
+
+schema_catalog = SchemaCatalog()
@@ -0,0 +1,155 @@
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text as sql_text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUERY_CANCELED = "57014"
+READ_ONLY_TRANSACTION = "25006"
+READ_KEYWORDS = ("select", "with", "table", "values")
+
+
+class QueryRejected(Exception):
+    """Raised when a statement is refused by the guard; `detail` is returned to the caller as-is"""
+
+    def __init__(self, status_code: int, detail: Dict[str, Any]):
+        super().__init__(detail.get("message", "Query rejected"))
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass
+class GuardedResult:
+    columns: List[str]
+    rows: List[Tuple[Any, ...]]
+    estimated_cost: Optional[float] = None
+    estimated_rows: Optional[int] = None
+    notes: List[str] = field(default_factory=list)
+
+    @property
+    def downgraded(self) -> bool:
+        return bool(self.notes)
+
+
+
+### walk an EXPLAIN (FORMAT JSON) plan and suggest what the agent should narrow
+def _plan_nodes(plan: Dict[str, Any]):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def narrowing_hints(plan: Dict[str, Any], max_rows: int) -> List[str]:
+    hints = []
+    for node in _plan_nodes(plan):
+        node_type = node.get("Node Type", "")
+        relation = node.get("Relation Name")
+        rows = node.get("Plan Rows", 0)
+        if node_type == "Seq Scan" and relation and "Filter" not in node:
+            hints.append(f"Add a WHERE filter on {relation} (e.g. ticker = '...' and a date range) instead of scanning the whole table.")
+        elif node_type == "Seq Scan" and relation and rows > max_rows:
+            hints.append(f"The filter on {relation} still matches ~{rows} rows; narrow the tickers or date range.")
+        elif node_type == "Nested Loop" and "Join Filter" not in node and rows > max_rows:
+            hints.append(f"A join produces ~{rows} rows; check that every JOIN has an ON condition (possible cross join).")
+    if plan.get("Plan Rows", 0) > max_rows:
+        hints.append("Aggregate in SQL (GROUP BY, date_trunc, AVG/SUM) instead of returning raw rows.")
+    hints.append("Only select the columns you need.")
+    # keep order, drop repeats
+    return list(dict.fromkeys(hints))
+
+
+async def explain(session: AsyncSession, query: str) -> Dict[str, Any]:
+    """Planner estimate for a statement (EXPLAIN without ANALYZE, so nothing is executed)"""
+    result = await session.execute(sql_text(f"EXPLAIN (FORMAT JSON) {query}"))
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+
+async def run_guarded_query(session: AsyncSession, query: str) -> GuardedResult:
+    """
+    Execute an agent-written statement in a read-only transaction with a statement_timeout,
+    after checking the planner's cost and row estimates against the configured limits.
+    """
+    query = query.strip().rstrip(";")
+    if query.split(None, 1)[0].lower() not in READ_KEYWORDS:
+        raise QueryRejected(403, {
+            "error": "read_only",
+            "message": "Only read-only queries (SELECT) are allowed on this endpoint.",
+        })
+
+    max_cost = settings.SQL_MAX_ESTIMATED_COST
+    max_rows = settings.SQL_MAX_ESTIMATED_ROWS
+
+    try:
+        await session.execute(sql_text("SET TRANSACTION READ ONLY"))
+        await session.execute(sql_text(f"SET LOCAL statement_timeout = {int(settings.SQL_STATEMENT_TIMEOUT_MS)}"))
+
+        estimated_cost = estimated_rows = None
+        notes = []
+        if settings.SQL_GUARD_ENABLED:
+            plan = await explain(session, query)
+            estimated_cost = plan.get("Total Cost", 0.0)
+            estimated_rows = plan.get("Plan Rows", 0)
+
+            too_costly = estimated_cost > max_cost
+            too_many_rows = estimated_rows > max_rows
+            if too_costly or (too_many_rows and settings.SQL_GUARD_ON_EXCESS_ROWS == "reject"):
+                logger.warning(f"Rejected query (cost={estimated_cost}, rows={estimated_rows}): {query}")
+                raise QueryRejected(422, {
+                    "error": "query_too_expensive",
+                    "message": "Query rejected: estimated cost or row count is above the allowed limit. Narrow it and retry.",
+                    "estimated_cost": estimated_cost,
+                    "estimated_rows": estimated_rows,
+                    "max_cost": max_cost,
+                    "max_rows": max_rows,
+                    "hints": narrowing_hints(plan, max_rows),
+                })
+            if too_many_rows:
+                query = f"SELECT * FROM ({query}) AS guarded_query LIMIT {int(max_rows)}"
+                notes.append(
+                    f"Result truncated to {max_rows} rows (planner estimated {estimated_rows}); "
+                    f"filter or aggregate to get complete data."
+                )
+
+        result = await session.execute(sql_text(query))
+        if not result.returns_rows:
+            return GuardedResult(columns=[], rows=[], estimated_cost=estimated_cost, estimated_rows=estimated_rows)
+
+        return GuardedResult(
+            columns=list(result.keys()),
+            rows=[tuple(r) for r in result.fetchall()],
+            estimated_cost=estimated_cost,
+            estimated_rows=estimated_rows,
+            notes=notes,
+        )
+
+    except DBAPIError as e:
+        code = getattr(e.orig, "sqlstate", None) or getattr(e.orig, "pgcode", None)
+        if code == QUERY_CANCELED:
+            raise QueryRejected(422, {
+                "error": "query_timeout",
+                "message": f"Query cancelled after {settings.SQL_STATEMENT_TIMEOUT_MS} ms. Narrow it and retry.",
+                "hints": [
+                    "Filter by ticker and a date range.",
+                    "Aggregate in SQL instead of returning raw rows.",
+                ],
+            })
+        if code == READ_ONLY_TRANSACTION:
+            raise QueryRejected(403, {
+                "error": "read_only",
+                "message": "Only read-only queries (SELECT) are allowed on this endpoint.",
+            })
+        raise
+    finally:
+        await session.rollback()
@@ -0,0 +1,141 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from llama_index.core.storage.kvstore.types import (
+    BaseKVStore,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_COLLECTION,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+
+###LLAMAINDEX KV STORE ON A LOCAL SQLITE FILE (BACKS THE DOCSTORE AND INDEX STORE)
+class SQLiteKVStore(BaseKVStore):
+    """
+    Each (collection, key) is one row, so adding nodes appends rows instead of re-serialising
+    the whole store. Writes inside `transaction()` are committed together or not at all.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # autocommit mode; transactions are opened explicitly in `transaction()`
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS kv (
+                collection TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (collection, key)
+            ) WITHOUT ROWID
+            """
+        )
+        self._lock = threading.RLock()
+        self._depth = 0
+
+    @contextmanager
+    def transaction(self):
+        """Group writes into one atomic commit; nested uses join the outer transaction"""
+        with self._lock:
+            outer = self._depth == 0
+            if outer:
+                self._conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield self
+            except Exception:
+                self._depth -= 1
+                if outer:
+                    self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._depth -= 1
+                if outer:
+                    self._conn.execute("COMMIT")
+
+    def put(self, key: str, val: dict, collection: str = DEFAULT_COLLECTION) -> None:
+        self.put_all([(key, val)], collection=collection)
+
+    async def aput(self, key: str, val: dict, collection: str = DEFAULT_COLLECTION) -> None:
+        self.put(key, val, collection=collection)
+
+    def put_all(
+        self,
+        kv_pairs: List[Tuple[str, dict]],
+        collection: str = DEFAULT_COLLECTION,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> None:
+        with self.transaction():
+            self._conn.executemany(
+                "INSERT INTO kv (collection, key, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (collection, key) DO UPDATE SET value = excluded.value",
+                [(collection, key, json.dumps(val)) for key, val in kv_pairs],
+            )
+
+    async def aput_all(
+        self,
+        kv_pairs: List[Tuple[str, dict]],
+        collection: str = DEFAULT_COLLECTION,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> None:
+        self.put_all(kv_pairs, collection=collection, batch_size=batch_size)
+
+    def get(self, key: str, collection: str = DEFAULT_COLLECTION) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM kv WHERE collection = ? AND key = ?", (collection, key)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def aget(self, key: str, collection: str = DEFAULT_COLLECTION) -> Optional[dict]:
+        return self.get(key, collection=collection)
+
+    def get_all(self, collection: str = DEFAULT_COLLECTION) -> Dict[str, dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM kv WHERE collection = ?", (collection,)
+            ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    async def aget_all(self, collection: str = DEFAULT_COLLECTION) -> Dict[str, dict]:
+        return self.get_all(collection=collection)
+
+    def delete(self, key: str, collection: str = DEFAULT_COLLECTION) -> bool:
+        with self.transaction():
+            cursor = self._conn.execute(
+                "DELETE FROM kv WHERE collection = ? AND key = ?", (collection, key)
+            )
+        return cursor.rowcount > 0
+
+    async def adelete(self, key: str, collection: str = DEFAULT_COLLECTION) -> bool:
+        return self.delete(key, collection=collection)
+
+    def import_json_store(self, json_path: str) -> int:
+        """
+        One-off migration of a SimpleKVStore JSON file ({collection: {key: value}}), as written by
+        the old `storage_context.persist()`. The file is renamed afterwards so it is never parsed again.
+        """
+        if not os.path.exists(json_path) or os.path.getsize(json_path) == 0:
+            return 0
+        with open(json_path) as f:
+            data = json.load(f)
+        count = 0
+        with self.transaction():
+            for collection, items in data.items():
+                if isinstance(items, dict) and items:
+                    self.put_all(list(items.items()), collection=collection)
+                    count += len(items)
+        os.replace(json_path, json_path + ".migrated")
+        logger.info(f"Migrated {count} entries from {json_path} into {self.path}")
+        return count
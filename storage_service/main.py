@@ -1,10 +1,23 @@
 # storage_service/main.py
 from fastapi import FastAPI
 from api.routes import router
-from database.mongodb_atlas import test_mongodb_connection, save_news
-from database.postgres import Base, engine
+from config.settings import settings
+from database.mongodb_atlas import test_mongodb_connection, save_news, ensure_news_indexes, rebuild_news_sentiment
+from database.postgres import Base, engine, news_sentiment_needs_rebuild
+from database.schema_catalog import schema_catalog
 import logging
 
+# the news vector index is owned by exactly one process; API workers (serve.py) forward to it
+OWNS_INDEX = not settings.INDEX_OWNER_URL
+if OWNS_INDEX:
+    from api.news_routes import router as news_router
+    from database.index_manager import index_manager
+    from database.embedding_queue import embedding_worker
+    from database.reindex import reindexer
+else:
+    from api.index_proxy import router as news_router
+    from database.index_client import index_client
+
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -16,12 +29,39 @@ async def lifespan(app: FastAPI):
             await conn.run_sync(Base.metadata.create_all)
         logger.info("PostgreSQL tables created successfully")
 
+        # build the schema catalog once the schema is in place
+        schema_catalog.invalidate()
+        await schema_catalog.rebuild()
+
         # test MongoDB connection
         await test_mongodb_connection()
         logger.info("MongoDB connection tested successfully")
+        await ensure_news_indexes()
+        logger.info("MongoDB news indexes ensured")
+
+        if OWNS_INDEX:
+            # news_sentiment_daily rows written before per-article rows were kept: recount them once
+            if await news_sentiment_needs_rebuild():
+                logger.info("Rebuilding news sentiment from the stored articles")
+                await rebuild_news_sentiment()
+
+            # load the vector index once; searches reuse it until the next write swaps it
+            await index_manager.warm()
+
+            # drain the embedding queue (including anything left over from a previous run)
+            embedding_worker.start()
+
+            # continue a news reindex that was interrupted by the last shutdown
+            reindexer.resume()
 
         yield  # control is passed to the application
 
+        if OWNS_INDEX:
+            await reindexer.stop()
+            await embedding_worker.stop()
+        else:
+            await index_client.close()
+
     except Exception as e:
         logger.error(f"Failed to initialize services: {str(e)}")
         raise
@@ -34,6 +74,7 @@ app = FastAPI(
 )
 
 app.include_router(router)
+app.include_router(news_router)
 
 
 
@@ -0,0 +1,93 @@
+# storage_service/serve.py
+"""
+Start the storage service on one or several cores.
+
+    python serve.py                 # STORAGE_WORKERS=1: the plain single-process service
+    python serve.py --workers 4
+
+With more than one worker, one index-owner process (a single uvicorn worker on 127.0.0.1:INDEX_OWNER_PORT)
+holds Chroma, the docstore, the keyword index and the embedding queue, and creates the Postgres
+tables and MongoDB indexes. Then N uvicorn workers on HOST:PORT handle the PostgreSQL/MongoDB
+requests and forward news vector reads and writes to the owner over HTTP. Only the owner writes
+the index, so writes stay serialised while searches run concurrently there.
+SQL result-cache invalidations are shared between the workers through QUERY_CACHE_VERSIONS_PATH.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+from config.settings import settings
+
+DEFAULT_VERSIONS_PATH = "/app/storage/query_cache_versions.sqlite"
+
+
+def wait_healthy(url: str, process: subprocess.Popen, timeout_s: float):
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Index owner exited during startup (code {process.returncode})")
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"Index owner at {url} did not become healthy within {timeout_s:.0f}s")
+
+
+def uvicorn_command(host: str, port: int, workers: int):
+    return [sys.executable, "-m", "uvicorn", "main:app", "--host", host, "--port", str(port), "--workers", str(workers)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=settings.STORAGE_WORKERS)
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--owner-port", type=int, default=settings.INDEX_OWNER_PORT)
+    parser.add_argument("--startup-timeout", type=float, default=600.0, help="seconds to wait for the index owner")
+    args = parser.parse_args()
+
+    if args.workers <= 1:
+        os.execv(sys.executable, uvicorn_command(args.host, args.port, 1))
+
+    versions_path = settings.QUERY_CACHE_VERSIONS_PATH or DEFAULT_VERSIONS_PATH
+    owner_env = {**os.environ, "INDEX_OWNER_URL": "", "QUERY_CACHE_VERSIONS_PATH": versions_path}
+    owner_url = f"http://127.0.0.1:{args.owner_port}"
+    owner = subprocess.Popen(uvicorn_command("127.0.0.1", args.owner_port, 1), env=owner_env)
+    processes = [owner]
+
+    def shutdown(signum=None, frame=None):
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: (shutdown(), sys.exit(0)))
+    try:
+        # the owner creates tables/indexes and warms the index before any worker starts
+        wait_healthy(owner_url, owner, args.startup_timeout)
+        worker_env = {**os.environ, "INDEX_OWNER_URL": owner_url, "QUERY_CACHE_VERSIONS_PATH": versions_path}
+        processes.append(subprocess.Popen(uvicorn_command(args.host, args.port, args.workers), env=worker_env))
+        print(f"Storage service: {args.workers} workers on {args.host}:{args.port}, index owner on {owner_url}", flush=True)
+        # if either side exits, stop the other
+        while all(process.poll() is None for process in processes):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shutdown()
+    sys.exit(max(process.returncode or 0 for process in processes))
+
+
+if __name__ == "__main__":
+    main()
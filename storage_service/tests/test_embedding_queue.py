@@ -0,0 +1,109 @@
+import time
+
+from llama_index.core import Document
+
+from database.embedding_queue import FAILED, IN_PROGRESS, PENDING, EmbeddingQueue
+
+
+def make_queue(tmp_path) -> EmbeddingQueue:
+    return EmbeddingQueue(str(tmp_path / "embedding_queue.sqlite"))
+
+
+def doc(doc_id: str) -> Document:
+    return Document(id_=doc_id, text=f"summary of {doc_id}")
+
+
+def state(queue: EmbeddingQueue, doc_id: str):
+    """(status, attempts, seconds until the next attempt)"""
+    status, attempts, next_attempt_at = queue._conn.execute(
+        "SELECT status, attempts, next_attempt_at FROM queue WHERE doc_id = ?", (doc_id,)
+    ).fetchone()
+    return status, attempts, next_attempt_at - time.time()
+
+
+def test_documents_are_queued_once_and_claimed_once(tmp_path):
+    queue = make_queue(tmp_path)
+
+    assert queue.enqueue([doc("a"), doc("b")]) == 2
+    assert queue.enqueue([doc("a")]) == 0
+
+    claimed = queue.claim(10)
+    assert sorted(doc_id for doc_id, _ in claimed) == ["a", "b"]
+    assert claimed[0][1].text.startswith("summary of")
+    assert queue.claim(10) == []
+    assert queue.summary()["in_progress"] == 2
+
+    queue.complete(["a", "b"])
+    assert queue.summary()["in_progress"] == 0
+
+
+def test_failures_back_off_exponentially_then_park_as_failed(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.enqueue([doc("a")])
+    retry_base_s = 0.05
+
+    queue.claim(1)
+    queue.fail(["a"], "rate limited", max_attempts=3, retry_base_s=retry_base_s)
+    status, attempts, wait = state(queue, "a")
+    assert (status, attempts) == (PENDING, 1)
+    assert 0 < wait <= retry_base_s
+    # not due yet
+    assert queue.claim(1) == []
+
+    time.sleep(retry_base_s)
+    assert [doc_id for doc_id, _ in queue.claim(1)] == ["a"]
+    queue.fail(["a"], "rate limited", max_attempts=3, retry_base_s=retry_base_s)
+    status, attempts, wait = state(queue, "a")
+    assert (status, attempts) == (PENDING, 2)
+    assert retry_base_s < wait <= 2 * retry_base_s
+
+    time.sleep(2 * retry_base_s)
+    queue.claim(1)
+    queue.fail(["a"], "still rate limited", max_attempts=3, retry_base_s=retry_base_s)
+    assert state(queue, "a")[:2] == (FAILED, 3)
+    summary = queue.summary()
+    assert summary["failed"] == 1
+    assert summary["last_error"] == "still rate limited"
+
+    time.sleep(4 * retry_base_s)
+    # parked documents are never claimed again on their own
+    assert queue.claim(1) == []
+
+
+def test_failed_documents_are_revived_by_retry_or_by_being_sent_again(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.enqueue([doc("a"), doc("b")])
+    queue.claim(2)
+    queue.fail(["a", "b"], "boom", max_attempts=1, retry_base_s=60)
+    assert queue.summary()["failed"] == 2
+
+    assert queue.enqueue([doc("a")]) == 1
+    assert state(queue, "a")[:2] == (PENDING, 0)
+
+    assert queue.retry_failed() == 1
+    assert sorted(doc_id for doc_id, _ in queue.claim(10)) == ["a", "b"]
+
+
+def test_claimed_documents_go_back_to_pending_after_a_crash(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.enqueue([doc("a")])
+    queue.claim(1)
+    assert state(queue, "a")[0] == IN_PROGRESS
+
+    reopened = make_queue(tmp_path)
+
+    assert state(reopened, "a")[0] == PENDING
+    assert [doc_id for doc_id, _ in reopened.claim(1)] == ["a"]
+
+
+def test_documents_removed_while_in_progress_are_reported_on_completion(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.enqueue([doc("a"), doc("b"), doc("c")])
+    queue.claim(3)
+
+    queue.remove(["b", "c"])
+
+    assert queue.complete(["a", "b"]) == ["b"]
+    # a failure of a removed document is ignored rather than re-queueing it
+    queue.fail(["c"], "boom", max_attempts=5, retry_base_s=1)
+    assert queue.summary()["pending"] == 0
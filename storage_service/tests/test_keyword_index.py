@@ -0,0 +1,100 @@
+import pytest
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores import FilterOperator, MetadataFilter, MetadataFilters
+
+from database.keyword_index import KeywordIndex, match_expression
+from database.news_filters import build_news_filters, ticker_metadata
+
+
+def make_node(node_id: str, text: str, published_at: int, source: str, sentiment: float, tickers):
+    node = TextNode(
+        id_=node_id,
+        text=text,
+        metadata={
+            "published_at": published_at,
+            "source": source,
+            "overall_sentiment_score": sentiment,
+            **ticker_metadata({"ticker_sentiment": [{"ticker": t} for t in tickers]}),
+        },
+    )
+    node.relationships[NodeRelationship.SOURCE] = RelatedNodeInfo(node_id=node_id.split("-")[0])
+    return node
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = KeywordIndex(str(tmp_path / "keyword_index.sqlite"))
+    index.add([
+        make_node("a-0", "Apple beats earnings expectations on iPhone sales", 1_700_000_000, "Reuters", 0.4, ["AAPL"]),
+        make_node("b-0", "Microsoft cloud revenue grows; Apple supplier warns", 1_700_100_000, "Benzinga", -0.1, ["MSFT", "AAPL"]),
+        make_node("c-0", "Oil prices fall as supply rises", 1_700_200_000, "Reuters", -0.3, ["XOM"]),
+    ])
+    return index
+
+
+def test_match_expression_quotes_and_ors_unique_tokens():
+    assert match_expression('Apple "earnings" apple?') == '"apple" OR "earnings"'
+    assert match_expression("  ?! ") is None
+
+
+def test_where_translates_filters_into_sql(index):
+    filters = MetadataFilters(filters=[
+        MetadataFilter(key="published_at", value=1_700_050_000, operator=FilterOperator.GTE),
+        MetadataFilter(key="source", value=["Reuters", "Benzinga"], operator=FilterOperator.IN),
+        MetadataFilter(key="overall_sentiment_score", value=0.0, operator=FilterOperator.LT),
+        MetadataFilter.model_construct(key="ticker_AAPL", value=True, operator=FilterOperator.EQ),
+    ])
+
+    clauses, params = index._where(filters)
+
+    assert clauses == [
+        "c.published_at >= ?",
+        "c.source IN (?,?)",
+        "c.sentiment < ?",
+        "c.tickers LIKE ?",
+    ]
+    assert params == [1_700_050_000, "Reuters", "Benzinga", 0.0, "%,AAPL,%"]
+    assert index._where(None) == ([], [])
+
+
+def test_where_refuses_filters_it_cannot_express(index):
+    with pytest.raises(ValueError):
+        index._where(MetadataFilters(filters=[MetadataFilter(key="title", value="x")]))
+    with pytest.raises(ValueError):
+        index._where(MetadataFilters(filters=[MetadataFilters(filters=[])]))
+
+
+def test_search_ranks_by_bm25(index):
+    hits = index.search("apple earnings", top_k=10)
+
+    assert [node_id for node_id, *_ in hits] == ["a-0", "b-0"]
+    assert hits[0][3] > hits[1][3]
+    node_id, text, metadata, _ = hits[0]
+    assert text.startswith("Apple beats")
+    assert metadata["source"] == "Reuters"
+
+
+def test_search_applies_the_same_filters_as_the_vector_search(index):
+    assert [h[0] for h in index.search("apple", 10, build_news_filters(ticker="MSFT"))] == ["b-0"]
+    assert [h[0] for h in index.search("apple", 10, build_news_filters(sources=["Reuters"]))] == ["a-0"]
+    assert [h[0] for h in index.search("apple", 10, build_news_filters(min_sentiment=0.0))] == ["a-0"]
+    assert index.search("apple", 10, build_news_filters(ticker="XOM")) == []
+
+
+def test_chunks_are_added_once(index):
+    node = make_node("a-0", "Apple beats earnings expectations on iPhone sales", 1_700_000_000, "Reuters", 0.4, ["AAPL"])
+
+    assert index.add([node]) == 0
+    assert index.count() == 3
+    assert index.node_ids(build_news_filters(ticker="AAPL")) == ["a-0", "b-0"]
+
+
+def test_removing_a_document_deletes_its_chunks_from_search(index):
+    index.add([make_node("a-1", "Apple earnings call transcript", 1_700_000_000, "Reuters", 0.4, ["AAPL"])])
+
+    assert index.remove(["a", "unknown"]) == 2
+
+    assert [h[0] for h in index.search("apple earnings", 10)] == ["b-0"]
+    assert index.count() == 2
+    # the same content can be indexed again later
+    assert index.add([make_node("a-0", "Apple beats earnings", 1_700_000_000, "Reuters", 0.4, ["AAPL"])]) == 1
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from llama_index.core.vector_stores import FilterOperator
+
+from database.news_filters import (
+    PUBLISHED_AT_KEY,
+    build_news_filters,
+    parse_date,
+    published_at,
+    ticker_metadata,
+)
+
+
+def epoch(*args) -> int:
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp())
+
+
+def as_tuples(filters):
+    return [(f.key, f.operator, f.value) for f in filters.filters]
+
+
+def test_no_parameters_means_no_filters():
+    assert build_news_filters() is None
+
+
+def test_bare_end_date_includes_the_whole_day():
+    filters = build_news_filters(start_date="2024-01-01", end_date="2024-01-31")
+
+    assert as_tuples(filters) == [
+        (PUBLISHED_AT_KEY, FilterOperator.GTE, epoch(2024, 1, 1)),
+        (PUBLISHED_AT_KEY, FilterOperator.LT, epoch(2024, 2, 1)),
+    ]
+
+
+def test_end_timestamp_is_inclusive():
+    filters = build_news_filters(end_date="20240131T120000")
+
+    assert as_tuples(filters) == [(PUBLISHED_AT_KEY, FilterOperator.LTE, epoch(2024, 1, 31, 12))]
+
+
+def test_days_narrows_an_older_start_date():
+    filters = build_news_filters(start_date="2000-01-01", days=7)
+
+    (key, operator, value), = as_tuples(filters)
+    week_ago = datetime.now(timezone.utc) - timedelta(days=7)
+    assert (key, operator) == (PUBLISHED_AT_KEY, FilterOperator.GTE)
+    assert abs(value - week_ago.timestamp()) < 5
+
+
+def test_sources_sentiment_and_ticker_filters():
+    filters = build_news_filters(sources=["Reuters", "Benzinga"], min_sentiment=-0.2, max_sentiment=0.5, ticker=" aapl ")
+
+    assert as_tuples(filters) == [
+        ("source", FilterOperator.IN, ["Reuters", "Benzinga"]),
+        ("overall_sentiment_score", FilterOperator.GTE, -0.2),
+        ("overall_sentiment_score", FilterOperator.LTE, 0.5),
+        ("ticker_AAPL", FilterOperator.EQ, True),
+    ]
+
+
+def test_bad_dates_raise_value_error():
+    with pytest.raises(ValueError):
+        build_news_filters(start_date="last tuesday")
+
+
+def test_alpha_vantage_and_iso_dates_parse_as_utc():
+    assert parse_date("20240115T123000") == datetime(2024, 1, 15, 12, 30, tzinfo=timezone.utc)
+    assert parse_date("2024-01-15T12:30:00+02:00") == datetime(2024, 1, 15, 10, 30, tzinfo=timezone.utc)
+    assert published_at("not a date") == 0
+    assert published_at(None) == 0
+
+
+def test_ticker_metadata_has_one_flag_per_ticker():
+    feed_item = {"ticker_sentiment": [{"ticker": "msft"}, {"ticker": "AAPL"}, {"ticker": ""}, {"ticker": "AAPL"}]}
+
+    assert ticker_metadata(feed_item) == {"tickers": "AAPL,MSFT", "ticker_AAPL": True, "ticker_MSFT": True}
@@ -0,0 +1,73 @@
+from datetime import datetime, timezone
+
+from database.news_filters import build_news_filters
+from database.news_partitions import (
+    LEGACY_COLLECTION,
+    parse_partition,
+    partition_names,
+    plan_partitions,
+    yearly_name,
+)
+
+
+def epoch(*args) -> int:
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp())
+
+
+def partitions(*names):
+    return [parse_partition(name) for name in names]
+
+
+def test_chunks_are_routed_to_their_month_and_tickers():
+    metadata = {"published_at": epoch(2024, 3, 15), "tickers": "AAPL,CRYPTO:BTC"}
+
+    assert partition_names(metadata) == ["news_2024_03"]
+    assert partition_names(metadata, by_ticker=True) == ["news_2024_03__AAPL", "news_2024_03__CRYPTO-BTC"]
+    assert partition_names({"published_at": 0, "tickers": ""}, by_ticker=True) == ["news_undated"]
+
+
+def test_partition_names_encode_their_time_range():
+    month = parse_partition("news_2024_12__AAPL")
+    assert (month.start, month.end, month.subkey) == (epoch(2024, 12, 1), epoch(2025, 1, 1), "AAPL")
+
+    year = parse_partition("news_2023")
+    assert (year.start, year.end, year.subkey) == (epoch(2023, 1, 1), epoch(2024, 1, 1), None)
+
+    assert parse_partition("news_undated").start is None
+    assert parse_partition(LEGACY_COLLECTION).name == LEGACY_COLLECTION
+    assert parse_partition("something_else") is None
+    assert yearly_name(month) == "news_2024__AAPL"
+
+
+def test_a_date_window_only_visits_overlapping_partitions():
+    known = partitions("news_2023", "news_2024_01", "news_2024_02", "news_2024_03", "news_undated", LEGACY_COLLECTION)
+    filters = build_news_filters(start_date="2024-02-10", end_date="2024-02-29")
+
+    assert sorted(plan_partitions(known, filters)) == ["main_collection", "news_2024_02"]
+
+
+def test_an_end_date_on_a_month_boundary_does_not_visit_the_next_month():
+    known = partitions("news_2024_01", "news_2024_02")
+    filters = build_news_filters(start_date="2024-01-01", end_date="2024-01-31")
+
+    assert plan_partitions(known, filters) == ["news_2024_01"]
+
+
+def test_without_a_date_window_every_partition_is_visited():
+    known = partitions("news_2023", "news_2024_01", "news_undated")
+
+    assert sorted(plan_partitions(known, None)) == ["news_2023", "news_2024_01", "news_undated"]
+    assert sorted(plan_partitions(known, build_news_filters(sources=["Reuters"]))) == [
+        "news_2023", "news_2024_01", "news_undated",
+    ]
+
+
+def test_ticker_searches_only_visit_that_tickers_partitions():
+    known = partitions("news_2024_01__AAPL", "news_2024_01__MSFT", "news_2024_02__AAPL", "news_2023")
+    filters = build_news_filters(start_date="2024-01-01", ticker="aapl")
+
+    assert sorted(plan_partitions(known, filters, by_ticker=True)) == ["news_2024_01__AAPL", "news_2024_02__AAPL"]
+    # partitions without a sub-key (e.g. merged from before sub-partitioning) are still searched
+    assert sorted(plan_partitions(known, build_news_filters(ticker="AAPL"), by_ticker=True)) == [
+        "news_2023", "news_2024_01__AAPL", "news_2024_02__AAPL",
+    ]
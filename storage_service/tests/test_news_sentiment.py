@@ -0,0 +1,42 @@
+from datetime import date
+
+from database.mongodb_atlas import sentiment_entries
+
+
+def test_one_entry_per_scored_ticker_on_the_publication_day():
+    article = {
+        "time_published": "20240115T233000",
+        "ticker_sentiment": [
+            {"ticker": "aapl", "ticker_sentiment_score": "0.25", "relevance_score": "0.8"},
+            {"ticker": "MSFT", "ticker_sentiment_score": "-0.1", "relevance_score": None},
+            # unscored and unnamed entries are skipped
+            {"ticker": "XOM", "relevance_score": "0.4"},
+            {"ticker": "", "ticker_sentiment_score": "0.5"},
+            {"ticker": "TSLA", "ticker_sentiment_score": "n/a"},
+        ],
+    }
+
+    assert sentiment_entries(article) == [
+        ("AAPL", date(2024, 1, 15), 0.25, 0.8),
+        ("MSFT", date(2024, 1, 15), -0.1, 0.0),
+    ]
+
+
+def test_a_ticker_listed_twice_counts_once():
+    article = {
+        "time_published": "20240115T100000",
+        "ticker_sentiment": [
+            {"ticker": "AAPL", "ticker_sentiment_score": "0.1", "relevance_score": "0.2"},
+            {"ticker": "AAPL", "ticker_sentiment_score": "0.3", "relevance_score": "0.4"},
+        ],
+    }
+
+    assert sentiment_entries(article) == [("AAPL", date(2024, 1, 15), 0.3, 0.4)]
+
+
+def test_articles_without_a_usable_date_count_nothing():
+    entries = [{"ticker": "AAPL", "ticker_sentiment_score": "0.1"}]
+
+    assert sentiment_entries({"time_published": "someday", "ticker_sentiment": entries}) == []
+    assert sentiment_entries({"ticker_sentiment": entries}) == []
+
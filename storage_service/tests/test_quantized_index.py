@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from database.quantized_index import QuantizedIndex, quantize_binary, quantize_int8
+
+DIM = 256
+TOP_K = 10
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    """Clustered vectors, closer to real embeddings than uniform noise"""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, DIM))
+    vectors = (centers[rng.integers(0, 20, 3000)] + 0.5 * rng.normal(size=(3000, DIM))).astype(np.float32)
+    queries = (centers[rng.integers(0, 20, 50)] + 0.5 * rng.normal(size=(50, DIM))).astype(np.float32)
+    return vectors, queries
+
+
+def build(directory, vectors, mode: str) -> QuantizedIndex:
+    index = QuantizedIndex(str(directory), mode=mode, rescore_factor=10)
+    index.add((f"n{i}", vector.tolist()) for i, vector in enumerate(vectors))
+    return index
+
+
+def brute_force(vectors, query, top_k: int):
+    scores = (vectors @ query) / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+    best = np.argsort(-scores)[:top_k]
+    return [(f"n{i}", float(scores[i])) for i in best]
+
+
+def test_int8_codes_round_trip_within_one_step():
+    vectors = np.random.default_rng(1).normal(size=(10, DIM)).astype(np.float32)
+    codes, scales = quantize_int8(vectors)
+
+    assert codes.dtype == np.int8
+    assert np.all(np.abs(codes * scales[:, None] - vectors) <= scales[:, None] / 2 + 1e-6)
+    assert quantize_binary(vectors).shape == (10, DIM // 8)
+
+
+@pytest.mark.parametrize("mode, min_recall", [("int8", 0.9), ("binary", 0.75)])
+def test_recall_against_brute_force(tmp_path, corpus, mode, min_recall):
+    vectors, queries = corpus
+    index = build(tmp_path, vectors, mode)
+
+    recalls = []
+    for query in queries:
+        expected = brute_force(vectors, query, TOP_K)
+        hits = index.search(query.tolist(), TOP_K)
+        recalls.append(len({i for i, _ in expected} & {i for i, _ in hits}) / TOP_K)
+        # the shortlist is re-scored exactly: returned scores are true cosine similarities
+        exact = dict(brute_force(vectors, query, len(vectors)))
+        assert all(score == pytest.approx(exact[node_id], abs=1e-5) for node_id, score in hits)
+
+    assert np.mean(recalls) >= min_recall
+
+
+def test_search_is_restricted_to_allowed_ids(tmp_path, corpus):
+    vectors, queries = corpus
+    index = build(tmp_path, vectors, "int8")
+    allowed = [f"n{i}" for i in range(0, len(vectors), 7)]
+
+    hits = index.search(queries[0].tolist(), TOP_K, allowed_ids=allowed + ["unknown"])
+
+    assert len(hits) == TOP_K
+    assert {node_id for node_id, _ in hits} <= set(allowed)
+    assert index.search(queries[0].tolist(), TOP_K, allowed_ids=["unknown"]) == []
+
+
+def test_rows_survive_a_restart_and_duplicates_are_skipped(tmp_path, corpus):
+    vectors, queries = corpus
+    build(tmp_path, vectors[:100], "binary")
+
+    reopened = QuantizedIndex(str(tmp_path), mode="binary")
+    assert len(reopened) == 100
+    assert reopened.add([("n0", vectors[0].tolist()), ("n100", vectors[100].tolist())]) == 1
+    assert reopened.search(vectors[100].tolist(), 1)[0][0] == "n100"
+
+    with pytest.raises(ValueError):
+        QuantizedIndex(str(tmp_path), mode="int8")
+
+
+def test_rows_a_crash_left_without_an_id_are_dropped_on_load(tmp_path, corpus):
+    vectors, _ = corpus
+    build(tmp_path, vectors[:10], "int8")
+    # as if the process died after appending a vector but before writing its id
+    with open(tmp_path / "full.f32", "ab") as f:
+        f.write(vectors[10].tobytes())
+
+    reopened = QuantizedIndex(str(tmp_path), mode="int8")
+
+    assert len(reopened) == 10
+    assert reopened.add([("n10", vectors[10].tolist())]) == 1
+    assert reopened.search(vectors[10].tolist(), 1)[0] == ("n10", pytest.approx(1.0, abs=1e-5))
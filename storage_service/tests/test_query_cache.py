@@ -0,0 +1,96 @@
+from database.query_cache import QueryResultCache, estimate_size, normalize_sql
+
+QUERY = "SELECT close FROM stock_prices WHERE ticker = 'AAPL'"
+COLUMNS = ["close"]
+
+
+def make_rows(n: int):
+    return [(float(i),) for i in range(n)]
+
+
+def cache_query(cache: QueryResultCache, query: str, rows):
+    cache.put(query, COLUMNS, rows, cache.snapshot(query))
+
+
+def test_normalize_sql_collapses_whitespace_and_case_but_keeps_literals():
+    assert normalize_sql("  SELECT *\n  FROM Stock_Prices WHERE ticker = 'AaPl' ;") == (
+        "select * from stock_prices where ticker = 'AaPl'"
+    )
+
+
+def test_cached_result_is_served_until_its_table_is_bumped():
+    cache = QueryResultCache(["stock_prices", "news_sentiment_daily"], max_bytes=10**6)
+    cache_query(cache, QUERY, make_rows(3))
+
+    assert cache.get(QUERY).rows == make_rows(3)
+
+    # a write to another table leaves the entry alone
+    cache.bump("news_sentiment_daily")
+    assert cache.get(QUERY) is not None
+
+    cache.bump("stock_prices")
+    assert cache.get(QUERY) is None
+    assert cache.stats["stale"] == 1
+
+
+def test_result_is_not_cached_when_a_write_lands_mid_query():
+    cache = QueryResultCache(["stock_prices"], max_bytes=10**6)
+    versions = cache.snapshot(QUERY)
+    cache.bump("stock_prices")
+    cache.put(QUERY, COLUMNS, make_rows(3), versions)
+
+    assert cache.get(QUERY) is None
+
+
+def test_queries_using_volatile_functions_are_never_cached():
+    cache = QueryResultCache(["stock_prices"], max_bytes=10**6)
+    query = "SELECT * FROM stock_prices WHERE date > NOW() - interval '7 days'"
+    assert not cache.cacheable(normalize_sql(query))
+
+    cache_query(cache, query, make_rows(3))
+
+    assert cache.get(query) is None
+    assert cache.summary()["entries"] == 0
+    assert cache.stats["uncacheable"] == 1
+
+
+def test_eviction_keeps_memory_under_budget_and_spills_to_disk(tmp_path):
+    rows = make_rows(100)
+    entry_size = estimate_size(COLUMNS, rows)
+    cache = QueryResultCache(
+        ["stock_prices"], max_bytes=entry_size * 2, disk_dir=str(tmp_path), disk_max_bytes=10**6
+    )
+    queries = [f"{QUERY} AND close > {i}" for i in range(5)]
+    for query in queries:
+        cache_query(cache, query, rows)
+
+    summary = cache.summary()
+    assert summary["bytes"] <= cache.max_bytes
+    assert summary["entries"] == 2
+    assert summary["disk_entries"] == 3
+    assert cache.stats["evictions"] == 3
+
+    # the oldest entry comes back from the disk tier
+    assert cache.get(queries[0]).rows == rows
+    assert cache.stats["disk_hits"] == 1
+
+
+def test_stale_entries_are_not_spilled(tmp_path):
+    rows = make_rows(100)
+    cache = QueryResultCache(
+        ["stock_prices"], max_bytes=estimate_size(COLUMNS, rows), disk_dir=str(tmp_path), disk_max_bytes=10**6
+    )
+    cache_query(cache, QUERY, rows)
+    cache.bump("stock_prices")
+    cache_query(cache, f"{QUERY} AND close > 1", rows)
+
+    assert cache.summary()["disk_entries"] == 0
+
+
+def test_results_larger_than_the_budget_are_skipped():
+    rows = make_rows(1000)
+    cache = QueryResultCache(["stock_prices"], max_bytes=estimate_size(COLUMNS, rows) // 2)
+    cache_query(cache, QUERY, rows)
+
+    assert cache.get(QUERY) is None
+    assert cache.summary()["bytes"] == 0
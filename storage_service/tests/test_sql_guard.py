@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import DBAPIError
+
+from config.settings import settings
+from database.sql_guard import QueryRejected, READ_ONLY_TRANSACTION, narrowing_hints, run_guarded_query
+
+
+class FakeResult:
+    def __init__(self, value=None, rows=None, columns=None):
+        self.value = value
+        self.rows = rows or []
+        self.columns = columns or []
+        self.returns_rows = rows is not None
+
+    def scalar(self):
+        return self.value
+
+    def keys(self):
+        return self.columns
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeSession:
+    """Answers EXPLAIN with `plan`; the statement itself returns `rows` or raises `error`"""
+
+    def __init__(self, plan=None, rows=None, error=None):
+        self.plan = plan or {"Node Type": "Index Scan", "Total Cost": 10.0, "Plan Rows": 5}
+        self.rows = rows
+        self.error = error
+        self.statements = []
+        self.rolled_back = False
+
+    async def execute(self, statement):
+        sql = str(statement)
+        self.statements.append(sql)
+        if sql.startswith("EXPLAIN"):
+            return FakeResult(value=[{"Plan": self.plan}])
+        if sql.startswith("SET"):
+            return FakeResult()
+        if self.error is not None:
+            raise self.error
+        return FakeResult(rows=self.rows or [], columns=["ticker"])
+
+    async def rollback(self):
+        self.rolled_back = True
+
+
+class PgError(Exception):
+    def __init__(self, sqlstate):
+        super().__init__(sqlstate)
+        self.sqlstate = sqlstate
+
+
+def test_hints_point_at_unfiltered_scans_and_cross_joins():
+    plan = {
+        "Node Type": "Nested Loop",
+        "Plan Rows": 5_000_000,
+        "Plans": [
+            {"Node Type": "Seq Scan", "Relation Name": "stock_prices", "Plan Rows": 2_000_000},
+            {"Node Type": "Seq Scan", "Relation Name": "news_sentiment_daily", "Filter": "(ticker = 'AAPL')", "Plan Rows": 300_000},
+        ],
+    }
+
+    hints = narrowing_hints(plan, max_rows=200_000)
+
+    assert any("WHERE filter on stock_prices" in hint for hint in hints)
+    assert any("news_sentiment_daily still matches ~300000 rows" in hint for hint in hints)
+    assert any("cross join" in hint for hint in hints)
+    assert any("GROUP BY" in hint for hint in hints)
+    assert hints[-1] == "Only select the columns you need."
+    assert len(hints) == len(set(hints))
+
+
+def test_hints_for_a_narrow_plan_only_ask_for_fewer_columns():
+    plan = {"Node Type": "Index Scan", "Relation Name": "stock_prices", "Plan Rows": 20}
+
+    assert narrowing_hints(plan, max_rows=200_000) == ["Only select the columns you need."]
+
+
+@pytest.mark.parametrize("query", [
+    "DELETE FROM stock_prices",
+    "  update stock_prices SET close = 0",
+    "DROP TABLE stock_prices;",
+])
+def test_statements_that_are_not_reads_are_refused_before_running(query):
+    session = FakeSession()
+
+    with pytest.raises(QueryRejected) as rejected:
+        asyncio.run(run_guarded_query(session, query))
+
+    assert rejected.value.status_code == 403
+    assert rejected.value.detail["error"] == "read_only"
+    assert session.statements == []
+
+
+def test_writes_hidden_in_a_read_are_refused_by_the_read_only_transaction():
+    session = FakeSession(error=DBAPIError("WITH ...", {}, PgError(READ_ONLY_TRANSACTION)))
+
+    with pytest.raises(QueryRejected) as rejected:
+        asyncio.run(run_guarded_query(session, "WITH gone AS (DELETE FROM stock_prices RETURNING *) SELECT 1"))
+
+    assert rejected.value.status_code == 403
+    assert rejected.value.detail["error"] == "read_only"
+    assert session.statements[0] == "SET TRANSACTION READ ONLY"
+    assert session.rolled_back
+
+
+def test_expensive_queries_are_rejected_with_hints():
+    plan = {"Node Type": "Seq Scan", "Relation Name": "stock_prices",
+            "Total Cost": settings.SQL_MAX_ESTIMATED_COST * 2, "Plan Rows": 10}
+    session = FakeSession(plan=plan)
+
+    with pytest.raises(QueryRejected) as rejected:
+        asyncio.run(run_guarded_query(session, "SELECT * FROM stock_prices"))
+
+    assert rejected.value.status_code == 422
+    assert rejected.value.detail["error"] == "query_too_expensive"
+    assert any("stock_prices" in hint for hint in rejected.value.detail["hints"])
+    assert not any(sql.startswith("SELECT") for sql in session.statements)
+
+
+def test_reads_run_in_a_read_only_transaction_with_a_timeout():
+    session = FakeSession(rows=[("AAPL",)])
+
+    result = asyncio.run(run_guarded_query(session, "SELECT ticker FROM stock_prices LIMIT 1;"))
+
+    assert result.rows == [("AAPL",)]
+    assert not result.downgraded
+    assert session.statements[:2] == [
+        "SET TRANSACTION READ ONLY",
+        f"SET LOCAL statement_timeout = {settings.SQL_STATEMENT_TIMEOUT_MS}",
+    ]
+    assert session.statements[-1] == "SELECT ticker FROM stock_prices LIMIT 1"
+    assert session.rolled_back
+
+
+def test_reads_estimated_over_the_row_limit_are_truncated_with_a_note():
+    plan = {"Node Type": "Seq Scan", "Relation Name": "stock_prices", "Filter": "(close > 0)",
+            "Total Cost": 100.0, "Plan Rows": settings.SQL_MAX_ESTIMATED_ROWS * 10}
+    session = FakeSession(plan=plan, rows=[("AAPL",)])
+
+    result = asyncio.run(run_guarded_query(session, "SELECT ticker FROM stock_prices WHERE close > 0"))
+
+    assert result.downgraded
+    assert session.statements[-1] == (
+        f"SELECT * FROM (SELECT ticker FROM stock_prices WHERE close > 0) AS guarded_query "
+        f"LIMIT {settings.SQL_MAX_ESTIMATED_ROWS}"
+    )
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from database.sqlite_kvstore import SQLiteKVStore
+
+
+class Boom(Exception):
+    pass
+
+
+def make_store(tmp_path) -> SQLiteKVStore:
+    return SQLiteKVStore(str(tmp_path / "kvstore.sqlite"))
+
+
+def test_writes_in_a_failed_transaction_are_rolled_back(tmp_path):
+    store = make_store(tmp_path)
+    store.put("kept", {"v": 1})
+
+    with pytest.raises(Boom):
+        with store.transaction():
+            store.put("lost", {"v": 2})
+            store.put("kept", {"v": 3})
+            store.delete("kept", collection="other")
+            raise Boom()
+
+    assert store.get("lost") is None
+    assert store.get("kept") == {"v": 1}
+
+
+def test_nested_transactions_commit_or_roll_back_with_the_outer_one(tmp_path):
+    store = make_store(tmp_path)
+
+    with store.transaction():
+        store.put("a", {"v": 1})
+        with store.transaction():
+            store.put("b", {"v": 2})
+    assert store.get_all() == {"a": {"v": 1}, "b": {"v": 2}}
+
+    with pytest.raises(Boom):
+        with store.transaction():
+            store.put("c", {"v": 3})
+            with store.transaction():
+                store.put("d", {"v": 4})
+                raise Boom()
+    assert store.get("c") is None
+    assert store.get("d") is None
+
+    # the store is usable again after a rollback
+    store.put("e", {"v": 5})
+    assert store.get("e") == {"v": 5}
+
+
+def test_committed_writes_are_seen_by_a_new_connection(tmp_path):
+    store = make_store(tmp_path)
+    with store.transaction():
+        store.put_all([("x", {"v": 1}), ("y", {"v": 2})], collection="docs")
+
+    assert make_store(tmp_path).get_all(collection="docs") == {"x": {"v": 1}, "y": {"v": 2}}
+
+
+def test_json_store_is_imported_once(tmp_path):
+    json_path = tmp_path / "docstore.json"
+    json_path.write_text(json.dumps({"docstore/metadata": {"doc-1": {"doc_hash": "h1"}}}))
+    store = make_store(tmp_path)
+
+    assert store.import_json_store(str(json_path)) == 1
+    assert store.get("doc-1", collection="docstore/metadata") == {"doc_hash": "h1"}
+    assert not json_path.exists()
+    assert store.import_json_store(str(json_path)) == 0